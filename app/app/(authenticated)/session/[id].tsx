@@ -21,6 +21,8 @@ import {
   AntDesign,
 } from '@expo/vector-icons';
 import * as ContextMenu from 'zeego/context-menu';
+import { isAxiosError } from 'axios';
+import { formatDistanceToNow } from 'date-fns';
 
 import { axiosClient } from '@/lib/axios';
 import { Colors } from '@/constants/Colors';
@@ -28,15 +30,42 @@ import {
   AnalysisStatus,
   analysisStatusLabels,
   analysisStatusColors,
+  type AnalysisProgress,
   type GaitSession,
+  type GaitSessionAnalyzeResponse,
 } from '@/types';
 import { toast } from 'sonner-native';
 import GaitAnalysisGraph from '@/components/sessions/gait-analysis-graph';
 import DetailedAnalysisSheet from '@/components/sessions/detailed-analysis-sheet';
+import { useReportStream } from '@/hooks/use-report-stream';
+import { useAnalysisProgress } from '@/hooks/use-analysis-progress';
 
 const { width } = Dimensions.get('window');
 const VIDEO_HEIGHT = width * 1.5;
 
+const analysisStageLabels: Record<string, string> = {
+  download: 'Downloading video',
+  pose: 'Detecting poses',
+  signal: 'Computing gait metrics',
+  render: 'Rendering annotated video',
+  upload: 'Uploading annotated video',
+  report: 'Generating AI report',
+};
+
+function formatAnalysisProgress(progress: AnalysisProgress) {
+  let text = analysisStageLabels[progress.stage ?? ''] ?? progress.stage;
+  if (progress.framesProcessed != null && progress.framesTotal) {
+    text += ` · ${Math.min(
+      100,
+      Math.round((progress.framesProcessed / progress.framesTotal) * 100)
+    )}%`;
+  }
+  if (progress.etaSeconds != null) {
+    text += ` · about ${Math.max(1, Math.ceil(progress.etaSeconds / 60))} min left`;
+  }
+  return text;
+}
+
 export default function GaitSessionDetails() {
   const { id } = useLocalSearchParams();
   const navigation = useNavigation();
@@ -65,21 +94,63 @@ export default function GaitSessionDetails() {
 
   const { mutate, isPending } = useMutation({
     mutationFn: async () => {
-      return await axiosClient.patch<GaitSession>(
+      return await axiosClient.patch<GaitSessionAnalyzeResponse>(
         `gait-sessions/${id}/analyze`
       );
     },
-    onSuccess: () => {
+    onSuccess: ({ data }) => {
       queryClient.invalidateQueries({ queryKey: [`gait_session_${id}`] });
+      const estimate = data.analysisEstimate;
       return toast.success(
-        'AI analysis started successfully, we will notify you when it is ready.'
+        estimate
+          ? `AI analysis started, expected to be ready ${formatDistanceToNow(
+              new Date(estimate.estimatedFinishAt),
+              { addSuffix: true }
+            )}.`
+          : 'AI analysis started successfully, we will notify you when it is ready.'
       );
     },
-    onError: () => {
+    onError: (error) => {
+      if (isAxiosError(error) && error.response?.status === 429) {
+        return toast.error(
+          'The analysis queue is full right now. Please try again later.'
+        );
+      }
       return toast.error('Failed to start AI analysis. Please try again.');
     },
   });
 
+  const { mutate: cancelAnalysis, isPending: isCancelling } = useMutation({
+    mutationFn: async () => {
+      return await axiosClient.patch<GaitSession>(
+        `gait-sessions/${id}/cancel`
+      );
+    },
+    onSuccess: () => {
+      queryClient.invalidateQueries({ queryKey: [`gait_session_${id}`] });
+      return toast.success('AI analysis cancelled.');
+    },
+    onError: () => {
+      return toast.error('Failed to cancel AI analysis. Please try again.');
+    },
+  });
+
+  const { text: streamedAnalysis } = useReportStream({
+    id: id as string,
+    enabled: gaitSession?.analysisStatus === AnalysisStatus.MetricsReady,
+    onDone: () =>
+      queryClient.invalidateQueries({ queryKey: [`gait_session_${id}`] }),
+  });
+
+  const analysisProgress = useAnalysisProgress({
+    id: id as string,
+    enabled:
+      gaitSession?.analysisStatus === AnalysisStatus.Pending ||
+      gaitSession?.analysisStatus === AnalysisStatus.InProgress,
+    onStatusChange: () =>
+      queryClient.invalidateQueries({ queryKey: [`gait_session_${id}`] }),
+  });
+
   useEffect(() => {
     if (gaitSession) {
       navigation.setOptions({
@@ -133,7 +204,10 @@ export default function GaitSessionDetails() {
   };
 
   const renderAnalysisButton = () => {
-    if (gaitSession.analysisStatus === AnalysisStatus.Initial) {
+    if (
+      gaitSession.analysisStatus === AnalysisStatus.Initial ||
+      gaitSession.analysisStatus === AnalysisStatus.Cancelled
+    ) {
       return (
         <TouchableOpacity
           style={styles.analysisButton}
@@ -172,6 +246,54 @@ export default function GaitSessionDetails() {
               ? 'Analysis is pending. We will notify you when it starts.'
               : 'Analysis is in progress. We will notify you when it completes.'}
           </Text>
+          {analysisProgress?.stage && (
+            <Text style={styles.analysisLoadingText}>
+              {formatAnalysisProgress(analysisProgress)}
+            </Text>
+          )}
+          <TouchableOpacity
+            onPress={() => cancelAnalysis()}
+            disabled={isCancelling}
+            style={styles.viewDetailedButton}
+          >
+            {isCancelling ? (
+              <ActivityIndicator size='small' color={Colors.destructive} />
+            ) : (
+              <Text
+                style={[styles.viewDetailedText, { color: Colors.destructive }]}
+              >
+                Cancel Analysis
+              </Text>
+            )}
+          </TouchableOpacity>
+        </View>
+      );
+    }
+    return null;
+  };
+
+  const renderReportLoading = () => {
+    if (gaitSession.analysisStatus === AnalysisStatus.MetricsReady) {
+      return (
+        <View style={styles.analysisLoadingContainer}>
+          <ActivityIndicator size='large' color={Colors.primary} />
+          <Text style={styles.analysisLoadingText}>
+            Gait metrics are ready. The AI report is being generated.
+          </Text>
+          {streamedAnalysis.length > 0 && (
+            <TouchableOpacity
+              onPress={() => setShowDetailedAnalysis(true)}
+              style={styles.viewDetailedButton}
+            >
+              <Text style={styles.viewDetailedText}>View Live Analysis</Text>
+              <FontAwesome5
+                name='external-link-alt'
+                size={14}
+                color={Colors.primary}
+                style={styles.viewDetailedIcon}
+              />
+            </TouchableOpacity>
+          )}
         </View>
       );
     }
@@ -188,7 +310,8 @@ export default function GaitSessionDetails() {
             color={Colors.destructive}
           />
           <Text style={styles.analysisErrorText}>
-            Failed to analyze the gait session. Please try again.
+            {gaitSession.analysisError ??
+              'Failed to analyze the gait session. Please try again.'}
           </Text>
           <TouchableOpacity
             style={styles.retryAnalysisButton}
@@ -376,6 +499,11 @@ export default function GaitSessionDetails() {
                   </View>
                 </TouchableOpacity>
               )}
+              {gaitSession.processingAdjustments.length > 0 && (
+                <Text style={styles.videoNote}>
+                  {gaitSession.processingAdjustments.join('. ')}.
+                </Text>
+              )}
             </View>
           )}
         </View>
@@ -427,10 +555,12 @@ export default function GaitSessionDetails() {
         {/* Analysis Button or Loading or Error */}
         {renderAnalysisButton()}
         {renderAnalysisLoading()}
+        {renderReportLoading()}
         {renderAnalysisError()}
 
-        {/* Analysis Results (only if completed) */}
-        {gaitSession.analysisStatus === AnalysisStatus.Completed && (
+        {/* Analysis Results (once metrics are available) */}
+        {(gaitSession.analysisStatus === AnalysisStatus.MetricsReady ||
+          gaitSession.analysisStatus === AnalysisStatus.Completed) && (
           <>
             {/* AI Analysis */}
             {gaitSession.summarizedAiAnalysis && (
@@ -702,9 +832,9 @@ export default function GaitSessionDetails() {
           </>
         )}
       </ScrollView>
-      {gaitSession?.detailedAiAnalysis && (
+      {(gaitSession?.detailedAiAnalysis || streamedAnalysis.length > 0) && (
         <DetailedAnalysisSheet
-          analysis={gaitSession.detailedAiAnalysis}
+          analysis={gaitSession.detailedAiAnalysis || streamedAnalysis}
           isVisible={showDetailedAnalysis}
           onClose={() => setShowDetailedAnalysis(false)}
         />
@@ -835,6 +965,11 @@ const styles = StyleSheet.create({
     color: '#2c3e50',
     marginBottom: 10,
   },
+  videoNote: {
+    fontSize: 12,
+    color: Colors.dark,
+    marginTop: 8,
+  },
   video: {
     width: '100%',
     height: VIDEO_HEIGHT,
@@ -0,0 +1,71 @@
+import { useEffect, useState } from 'react';
+
+import { axiosClient } from '@/lib/axios';
+import type { AnalysisProgress, AnalysisStatus } from '@/types';
+
+interface AnalysisProgressProps {
+  id?: number | string;
+  enabled: boolean;
+  onStatusChange?: (status: AnalysisStatus) => void;
+}
+
+export function useAnalysisProgress({
+  id,
+  enabled,
+  onStatusChange,
+}: AnalysisProgressProps) {
+  const [progress, setProgress] = useState<AnalysisProgress | null>(null);
+
+  useEffect(() => {
+    if (!id || !enabled) return;
+
+    const xhr = new XMLHttpRequest();
+    let processed = 0;
+    let lastStatus: AnalysisStatus | undefined;
+
+    const handleEvent = (block: string) => {
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (event !== 'progress' || !data) return;
+
+      const payload = JSON.parse(data);
+      const next: AnalysisProgress = {
+        status: payload.status,
+        stage: payload.stage,
+        framesProcessed: payload.frames_processed,
+        framesTotal: payload.frames_total,
+        etaSeconds: payload.eta_seconds,
+      };
+      setProgress(next);
+      if (lastStatus !== undefined && next.status !== lastStatus) {
+        onStatusChange?.(next.status);
+      }
+      lastStatus = next.status;
+    };
+
+    xhr.onprogress = () => {
+      const chunk = xhr.responseText.slice(processed);
+      const boundary = chunk.lastIndexOf('\n\n');
+      if (boundary === -1) return;
+
+      processed += boundary + 2;
+      chunk.slice(0, boundary).split('\n\n').forEach(handleEvent);
+    };
+
+    setProgress(null);
+    xhr.open(
+      'GET',
+      `${axiosClient.defaults.baseURL}gait-sessions/${id}/progress/stream`
+    );
+    xhr.setRequestHeader('Accept', 'text/event-stream');
+    xhr.send();
+
+    return () => xhr.abort();
+  }, [id, enabled]);
+
+  return progress;
+}
@@ -0,0 +1,62 @@
+import { useEffect, useState } from 'react';
+
+import { axiosClient } from '@/lib/axios';
+
+interface ReportStreamProps {
+  id?: number | string;
+  enabled: boolean;
+  onDone?: () => void;
+}
+
+export function useReportStream({ id, enabled, onDone }: ReportStreamProps) {
+  const [text, setText] = useState('');
+  const [isStreaming, setIsStreaming] = useState(false);
+
+  useEffect(() => {
+    if (!id || !enabled) return;
+
+    const xhr = new XMLHttpRequest();
+    let processed = 0;
+
+    const handleEvent = (block: string) => {
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      }
+      if (!data) return;
+
+      const payload = JSON.parse(data);
+      if (event === 'reset') setText('');
+      else if (event === 'token') setText((prev) => prev + payload.text);
+      else if (event === 'done') onDone?.();
+    };
+
+    xhr.onprogress = () => {
+      const chunk = xhr.responseText.slice(processed);
+      const boundary = chunk.lastIndexOf('\n\n');
+      if (boundary === -1) return;
+
+      processed += boundary + 2;
+      chunk.slice(0, boundary).split('\n\n').forEach(handleEvent);
+    };
+    xhr.onloadend = () => setIsStreaming(false);
+
+    setText('');
+    setIsStreaming(true);
+    xhr.open(
+      'GET',
+      `${axiosClient.defaults.baseURL}gait-sessions/${id}/report/stream`
+    );
+    xhr.setRequestHeader('Accept', 'text/event-stream');
+    xhr.send();
+
+    return () => xhr.abort();
+  }, [id, enabled]);
+
+  return {
+    text,
+    isStreaming,
+  };
+}
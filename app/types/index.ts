@@ -46,10 +46,13 @@ import {
   userAdaptationLabels,
 } from './prosthetic.type';
 import {
+  type AnalysisEstimate,
+  type AnalysisProgress,
   AnalysisStatus,
   analysisStatusColors,
   analysisStatusLabels,
   type GaitSession,
+  type GaitSessionAnalyzeResponse,
   type GaitSessionListItem,
 } from './session.type';
 
@@ -106,7 +109,10 @@ export {
   UserAdaptation,
   userAdaptationLabels,
   GaitSession,
+  GaitSessionAnalyzeResponse,
   GaitSessionListItem,
+  AnalysisEstimate,
+  AnalysisProgress,
   AnalysisStatus,
   analysisStatusLabels,
   analysisStatusColors,
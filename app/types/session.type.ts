@@ -2,24 +2,38 @@ export enum AnalysisStatus {
   Initial = 'Initial',
   Pending = 'Pending',
   InProgress = 'InProgress',
+  MetricsReady = 'MetricsReady',
   Completed = 'Completed',
   Error = 'Error',
+  Cancelled = 'Cancelled',
 }
 
 export const analysisStatusLabels: Record<AnalysisStatus, string> = {
   [AnalysisStatus.Initial]: 'Initial',
   [AnalysisStatus.Pending]: 'Pending for Analysis',
   [AnalysisStatus.InProgress]: 'Analysis In Progress',
+  [AnalysisStatus.MetricsReady]: 'Generating AI Report',
   [AnalysisStatus.Completed]: 'Analysis Completed',
   [AnalysisStatus.Error]: 'Analysis Error',
+  [AnalysisStatus.Cancelled]: 'Analysis Cancelled',
 };
 
 export const analysisStatusColors: Record<AnalysisStatus, string> = {
   [AnalysisStatus.Initial]: '#9E9E9E',
   [AnalysisStatus.Pending]: '#FFC107',
   [AnalysisStatus.InProgress]: '#2196F3',
+  [AnalysisStatus.MetricsReady]: '#00BCD4',
   [AnalysisStatus.Completed]: '#4CAF50',
   [AnalysisStatus.Error]: '#F44336',
+  [AnalysisStatus.Cancelled]: '#795548',
+};
+
+export type AnalysisProgress = {
+  status: AnalysisStatus;
+  stage: string | null;
+  framesProcessed: number | null;
+  framesTotal: number | null;
+  etaSeconds: number | null;
 };
 
 export type GaitMetric = {
@@ -76,6 +90,11 @@ export type GaitSessionListItem = GaitSessionBase & {
 export type GaitSession = GaitSessionListItem & {
   annotatedVideoUrl: string | null;
   frameRate: number | null;
+  videoWidth: number | null;
+  videoHeight: number | null;
+  videoDurationSeconds: number | null;
+  processingAdjustments: string[];
+  analysisError: string | null;
   summarizedAiAnalysis: string | null;
   detailedAiAnalysis: string | null;
   recommendations: string[];
@@ -86,3 +105,13 @@ export type GaitSession = GaitSessionListItem & {
   gaitMetrics: GaitMetric[];
   gaitPlotData: GaitPlotData[];
 };
+
+export type AnalysisEstimate = {
+  queuePosition: number;
+  estimatedStartAt: string;
+  estimatedFinishAt: string;
+};
+
+export type GaitSessionAnalyzeResponse = GaitSession & {
+  analysisEstimate: AnalysisEstimate | null;
+};
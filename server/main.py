@@ -9,6 +9,7 @@ from src.injuries.routes import injuries_router
 from src.medical_conditions.routes import medical_conditions_router
 from src.prosthetics.routes import prosthetics_router
 from src.gait_sessions.routes import gait_sessions_router
+from src.gait_sessions.celery_jobs import job_runner
 
 version = "v1"
 
@@ -17,8 +18,11 @@ version = "v1"
 async def lifespan(app: FastAPI):
     print("Server is starting...")
     await init_db()
+    # Only the local job runner executes jobs in the API process
+    await job_runner.start()
     yield
     print("Server is stopping...")
+    await job_runner.stop()
 
 
 app = FastAPI(
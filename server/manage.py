@@ -0,0 +1,271 @@
+import argparse
+import asyncio
+import json
+from datetime import datetime
+
+from src.config import Config
+from src.gait_sessions.cpu_topology import run_topology_benchmark
+from src.db.main import get_session
+from src.db.model.enum import AnalysisStatus
+from src.gait_sessions.celery_jobs import CPU_QUEUE, IO_QUEUE
+from src.gait_sessions.gait_analysis_pipeline import GaitAnalysisPipeline
+from src.gait_sessions.queue_benchmark import (
+    run_overlap_benchmark,
+    run_queue_benchmark,
+    run_runner_benchmark,
+    run_scheduling_benchmark,
+    run_worker_stress,
+)
+from src.gait_sessions.report_batch import generate_reports_batch
+from src.gait_sessions.schema import GaitSessionReanalysisModel
+from src.gait_sessions.service import GaitSessionsService
+
+
+def generate_reports(args: argparse.Namespace) -> dict:
+    return asyncio.run(
+        generate_reports_batch(
+            GaitAnalysisPipeline(),
+            session_ids=args.session_ids,
+            include_completed=args.include_completed,
+            concurrency=args.concurrency,
+            limit=args.limit,
+            use_cache=not args.no_cache,
+        )
+    )
+
+
+def benchmark_queues(args: argparse.Namespace) -> dict:
+    return run_queue_benchmark(
+        cpu_jobs=args.cpu_jobs,
+        io_jobs=args.io_jobs,
+        cpu_seconds=args.cpu_seconds,
+        io_seconds=args.io_seconds,
+        single_queue=args.single_queue,
+    )
+
+
+def benchmark_scheduling(args: argparse.Namespace) -> dict:
+    return run_scheduling_benchmark(
+        short_jobs=args.short_jobs,
+        long_jobs=args.long_jobs,
+        short_seconds=args.short_seconds,
+        long_seconds=args.long_seconds,
+        fifo=args.fifo,
+        cost_scale=args.cost_scale,
+    )
+
+
+def benchmark_overlap(args: argparse.Namespace) -> dict:
+    return run_overlap_benchmark(
+        jobs=args.jobs,
+        io_seconds=args.io_seconds,
+        cpu_seconds=args.cpu_seconds,
+        inline_cpu=args.inline_cpu,
+        queue=args.queue,
+    )
+
+
+def benchmark_topology(args: argparse.Namespace) -> dict:
+    return run_topology_benchmark(
+        cores=args.cores, frames=args.frames, video_path=args.video
+    )
+
+
+def benchmark_runner(args: argparse.Namespace) -> dict:
+    return run_runner_benchmark(
+        runner=args.runner,
+        jobs=args.jobs,
+        seconds=args.seconds,
+        kind=args.kind,
+    )
+
+
+def reanalyze(args: argparse.Namespace) -> dict:
+    filters = GaitSessionReanalysisModel(
+        session_ids=args.session_ids,
+        patient_id=args.patient_id,
+        created_after=args.created_after,
+        created_before=args.created_before,
+        limit=args.limit,
+        rate_per_minute=args.rate_per_minute,
+        max_in_flight=args.max_in_flight,
+        **({"statuses": args.statuses} if args.statuses else {}),
+    )
+
+    def print_progress(progress: dict) -> None:
+        print(
+            f"[{progress['elapsed_seconds']:>8.1f}s] "
+            f"{progress['submitted']}/{progress['total']} started, "
+            f"{progress['in_flight']} in flight, {progress['succeeded']} succeeded, "
+            f"{progress['failed']} failed, {progress['cancelled']} cancelled, "
+            f"{progress['skipped']} skipped"
+        )
+
+    async def run() -> dict:
+        async for session in get_session():
+            return await GaitSessionsService().reanalyze_sessions(
+                filters, session, on_progress=print_progress
+            )
+
+    return asyncio.run(run())
+
+
+def stress_worker(args: argparse.Namespace) -> dict:
+    return run_worker_stress(tasks=args.tasks, queue=args.queue)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hermes management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reports = commands.add_parser(
+        "generate-reports",
+        help="Generate AI reports for sessions whose metrics are ready",
+    )
+    reports.add_argument(
+        "--session-ids", type=int, nargs="*", help="Only report on these sessions"
+    )
+    reports.add_argument(
+        "--include-completed",
+        action="store_true",
+        help="Regenerate reports for sessions that already have one",
+    )
+    reports.add_argument(
+        "--concurrency",
+        type=int,
+        default=Config.REPORT_BATCH_CONCURRENCY,
+        help="Maximum number of concurrent LLM requests",
+    )
+    reports.add_argument("--limit", type=int, help="Maximum number of sessions")
+    reports.add_argument(
+        "--no-cache", action="store_true", help="Ignore cached LLM answers"
+    )
+    reports.set_defaults(handler=generate_reports)
+
+    benchmark = commands.add_parser(
+        "benchmark-queues",
+        help="Measure queue latency and throughput with a mixed CPU/I/O workload",
+    )
+    benchmark.add_argument("--cpu-jobs", type=int, default=8)
+    benchmark.add_argument("--io-jobs", type=int, default=40)
+    benchmark.add_argument("--cpu-seconds", type=float, default=10.0)
+    benchmark.add_argument("--io-seconds", type=float, default=1.0)
+    benchmark.add_argument(
+        "--single-queue",
+        action="store_true",
+        help="Send every job to the CPU queue to compare with a single worker",
+    )
+    benchmark.set_defaults(handler=benchmark_queues)
+
+    scheduling = commands.add_parser(
+        "benchmark-scheduling",
+        help="Compare mean completion time of shortest job first against FIFO",
+    )
+    scheduling.add_argument("--short-jobs", type=int, default=16)
+    scheduling.add_argument("--long-jobs", type=int, default=4)
+    scheduling.add_argument("--short-seconds", type=float, default=2.0)
+    scheduling.add_argument("--long-seconds", type=float, default=20.0)
+    scheduling.add_argument(
+        "--fifo",
+        action="store_true",
+        help="Give every job the same priority to measure FIFO scheduling",
+    )
+    scheduling.add_argument(
+        "--cost-scale",
+        type=float,
+        default=30.0,
+        help="Analysis seconds each benchmark second stands for when ranking jobs",
+    )
+    scheduling.set_defaults(handler=benchmark_scheduling)
+
+    overlap = commands.add_parser(
+        "benchmark-overlap",
+        help="Measure how one worker process overlaps I/O waits with compute",
+    )
+    overlap.add_argument("--jobs", type=int, default=8)
+    overlap.add_argument("--io-seconds", type=float, default=4.0)
+    overlap.add_argument("--cpu-seconds", type=float, default=2.0)
+    overlap.add_argument(
+        "--inline-cpu",
+        action="store_true",
+        help="Compute on the event loop, as the pipeline stages used to",
+    )
+    overlap.add_argument(
+        "--queue", default=CPU_QUEUE, help="Queue of the worker under test"
+    )
+    overlap.set_defaults(handler=benchmark_overlap)
+
+    topology = commands.add_parser(
+        "benchmark-topology",
+        help="Sweep worker children against threads per child for a core count",
+    )
+    topology.add_argument(
+        "--cores", type=int, help="Cores to lay out (default: all available)"
+    )
+    topology.add_argument("--frames", type=int, default=400)
+    topology.add_argument(
+        "--video", help="Short clip to measure pose inference instead of a stand-in"
+    )
+    topology.set_defaults(handler=benchmark_topology)
+
+    runner = commands.add_parser(
+        "benchmark-runner",
+        help="Measure end-to-end job latency of the Celery or local job runner",
+    )
+    runner.add_argument(
+        "--runner", choices=["celery", "local"], default=Config.JOB_RUNNER
+    )
+    runner.add_argument("--jobs", type=int, default=200)
+    runner.add_argument("--seconds", type=float, default=0.0)
+    runner.add_argument("--kind", choices=["cpu", "io"], default="io")
+    runner.set_defaults(handler=benchmark_runner)
+
+    reanalysis = commands.add_parser(
+        "reanalyze",
+        help="Analyze existing sessions again, e.g. after a pipeline upgrade",
+    )
+    reanalysis.add_argument(
+        "--session-ids", type=int, nargs="*", help="Only re-analyze these sessions"
+    )
+    reanalysis.add_argument(
+        "--statuses",
+        nargs="*",
+        type=AnalysisStatus,
+        choices=list(AnalysisStatus),
+        help="Only re-analyze sessions with these statuses "
+        "(default: Completed, MetricsReady and Error)",
+    )
+    reanalysis.add_argument("--patient-id", type=int)
+    reanalysis.add_argument("--created-after", type=datetime.fromisoformat)
+    reanalysis.add_argument("--created-before", type=datetime.fromisoformat)
+    reanalysis.add_argument("--limit", type=int, help="Maximum number of sessions")
+    reanalysis.add_argument(
+        "--rate-per-minute",
+        type=float,
+        default=Config.REANALYSIS_RATE_PER_MINUTE,
+        help="Maximum number of analyses started per minute",
+    )
+    reanalysis.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=Config.REANALYSIS_MAX_IN_FLIGHT,
+        help="Maximum number of analyses queued or running at once",
+    )
+    reanalysis.set_defaults(handler=reanalyze)
+
+    stress = commands.add_parser(
+        "stress-worker",
+        help="Run many short tasks and check worker processes reuse their resources",
+    )
+    stress.add_argument("--tasks", type=int, default=500)
+    stress.add_argument(
+        "--queue", default=IO_QUEUE, help="Queue of the worker under test"
+    )
+    stress.set_defaults(handler=stress_worker)
+
+    args = parser.parse_args()
+    print(json.dumps(args.handler(args), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""add metrics ready status
+
+Revision ID: 1eef6371737d
+Revises: fca50937048a
+Create Date: 2026-10-19 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1eef6371737d'
+down_revision: Union[str, None] = 'fca50937048a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE analysisstatus ADD VALUE IF NOT EXISTS 'MetricsReady' AFTER 'InProgress'")
+
+
+def downgrade() -> None:
+    # Postgres cannot drop enum values, so recreate the type without it
+    op.execute("UPDATE gait_session SET analysis_status = 'Completed' WHERE analysis_status = 'MetricsReady'")
+    op.execute("ALTER TYPE analysisstatus RENAME TO analysisstatus_old")
+    op.execute("CREATE TYPE analysisstatus AS ENUM ('Initial', 'Pending', 'InProgress', 'Completed', 'Error')")
+    op.execute(
+        "ALTER TABLE gait_session ALTER COLUMN analysis_status TYPE analysisstatus "
+        "USING analysis_status::text::analysisstatus"
+    )
+    op.execute("DROP TYPE analysisstatus_old")
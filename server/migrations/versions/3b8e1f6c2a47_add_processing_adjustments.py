@@ -0,0 +1,35 @@
+"""add processing adjustments
+
+Revision ID: 3b8e1f6c2a47
+Revises: 7c3f9a2d5b81
+Create Date: 2026-10-19 16:02:41.518207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e1f6c2a47'
+down_revision: Union[str, None] = '7c3f9a2d5b81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'gait_session',
+        sa.Column(
+            'processing_adjustments',
+            sa.ARRAY(sa.TEXT()),
+            nullable=False,
+            server_default='{}',
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('gait_session', 'processing_adjustments')
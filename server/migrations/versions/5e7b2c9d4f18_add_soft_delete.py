@@ -0,0 +1,33 @@
+"""add soft delete
+
+Revision ID: 5e7b2c9d4f18
+Revises: 9d4a6e2f7c13
+Create Date: 2026-10-19 18:04:37.912655
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7b2c9d4f18'
+down_revision: Union[str, None] = '9d4a6e2f7c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('gait_session', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_gait_session_deleted_at'), 'gait_session', ['deleted_at'], unique=False)
+    op.add_column('patient', sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_patient_deleted_at'), 'patient', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_patient_deleted_at'), table_name='patient')
+    op.drop_column('patient', 'deleted_at')
+    op.drop_index(op.f('ix_gait_session_deleted_at'), table_name='gait_session')
+    op.drop_column('gait_session', 'deleted_at')
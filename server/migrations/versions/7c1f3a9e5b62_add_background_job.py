@@ -0,0 +1,55 @@
+"""add background job
+
+Revision ID: 7c1f3a9e5b62
+Revises: 5e7b2c9d4f18
+Create Date: 2026-10-19 19:12:05.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1f3a9e5b62'
+down_revision: Union[str, None] = '5e7b2c9d4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'background_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('task_name', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('args', sa.JSON(), nullable=False),
+        sa.Column('queue', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False),
+        sa.Column(
+            'status',
+            sa.Enum('Queued', 'Running', 'Succeeded', 'Failed', 'Revoked', name='jobstatus'),
+            nullable=False,
+        ),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=True),
+        sa.Column('error', sa.TEXT(), nullable=True),
+        sa.Column('enqueued_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_background_job_id'), 'background_job', ['id'], unique=False)
+    op.create_index(op.f('ix_background_job_status'), 'background_job', ['status'], unique=False)
+    op.create_index(op.f('ix_background_job_task_id'), 'background_job', ['task_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_background_job_task_id'), table_name='background_job')
+    op.drop_index(op.f('ix_background_job_status'), table_name='background_job')
+    op.drop_index(op.f('ix_background_job_id'), table_name='background_job')
+    op.drop_table('background_job')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
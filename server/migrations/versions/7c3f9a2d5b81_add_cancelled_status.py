@@ -0,0 +1,35 @@
+"""add cancelled status
+
+Revision ID: 7c3f9a2d5b81
+Revises: 1eef6371737d
+Create Date: 2026-10-19 14:27:05.913842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3f9a2d5b81'
+down_revision: Union[str, None] = '1eef6371737d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TYPE analysisstatus ADD VALUE IF NOT EXISTS 'Cancelled' AFTER 'Error'")
+
+
+def downgrade() -> None:
+    # Postgres cannot drop enum values, so recreate the type without it
+    op.execute("UPDATE gait_session SET analysis_status = 'Error' WHERE analysis_status = 'Cancelled'")
+    op.execute("ALTER TYPE analysisstatus RENAME TO analysisstatus_old")
+    op.execute("CREATE TYPE analysisstatus AS ENUM ('Initial', 'Pending', 'InProgress', 'MetricsReady', 'Completed', 'Error')")
+    op.execute(
+        "ALTER TABLE gait_session ALTER COLUMN analysis_status TYPE analysisstatus "
+        "USING analysis_status::text::analysisstatus"
+    )
+    op.execute("DROP TYPE analysisstatus_old")
@@ -0,0 +1,35 @@
+"""add video properties
+
+Revision ID: 9d4a6e2f7c13
+Revises: 3b8e1f6c2a47
+Create Date: 2026-10-19 17:21:09.304118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a6e2f7c13'
+down_revision: Union[str, None] = '3b8e1f6c2a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('gait_session', sa.Column('video_width', sa.Integer(), nullable=True))
+    op.add_column('gait_session', sa.Column('video_height', sa.Integer(), nullable=True))
+    op.add_column('gait_session', sa.Column('video_frame_rate', sa.Float(), nullable=True))
+    op.add_column('gait_session', sa.Column('video_frame_count', sa.Integer(), nullable=True))
+    op.add_column('gait_session', sa.Column('video_duration_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('gait_session', 'video_duration_seconds')
+    op.drop_column('gait_session', 'video_frame_count')
+    op.drop_column('gait_session', 'video_frame_rate')
+    op.drop_column('gait_session', 'video_height')
+    op.drop_column('gait_session', 'video_width')
@@ -0,0 +1,30 @@
+"""add analysis error
+
+Revision ID: 9d4a6e2f8c13
+Revises: 7c1f3a9e5b62
+Create Date: 2026-10-19 20:41:37.205816
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a6e2f8c13'
+down_revision: Union[str, None] = '7c1f3a9e5b62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'gait_session',
+        sa.Column('analysis_error', sa.TEXT(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('gait_session', 'analysis_error')
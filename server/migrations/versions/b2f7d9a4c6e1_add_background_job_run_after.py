@@ -0,0 +1,30 @@
+"""add background job run after
+
+Revision ID: b2f7d9a4c6e1
+Revises: 9d4a6e2f8c13
+Create Date: 2026-10-19 21:34:12.604839
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2f7d9a4c6e1'
+down_revision: Union[str, None] = '9d4a6e2f8c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'background_job',
+        sa.Column('run_after', sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('background_job', 'run_after')
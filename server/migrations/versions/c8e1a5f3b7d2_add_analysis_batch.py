@@ -0,0 +1,37 @@
+"""add analysis batch
+
+Revision ID: c8e1a5f3b7d2
+Revises: b2f7d9a4c6e1
+Create Date: 2026-10-19 22:08:51.337164
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8e1a5f3b7d2'
+down_revision: Union[str, None] = 'b2f7d9a4c6e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analysis_batch',
+        sa.Column('id', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('group_id', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('session_ids', sa.ARRAY(sa.Integer()), nullable=False),
+        sa.Column('rejected', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_analysis_batch_created_at'), 'analysis_batch', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_analysis_batch_created_at'), table_name='analysis_batch')
+    op.drop_table('analysis_batch')
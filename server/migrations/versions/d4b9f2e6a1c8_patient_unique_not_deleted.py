@@ -0,0 +1,32 @@
+"""patient unique not deleted
+
+Revision ID: d4b9f2e6a1c8
+Revises: c8e1a5f3b7d2
+Create Date: 2026-10-19 23:41:07.518293
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b9f2e6a1c8'
+down_revision: Union[str, None] = 'c8e1a5f3b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UNIQUE_COLUMNS = ('ssn', 'email', 'phone_number')
+
+
+def upgrade() -> None:
+    for column in UNIQUE_COLUMNS:
+        op.drop_constraint(f'patient_{column}_key', 'patient', type_='unique')
+        op.create_index(f'uq_patient_{column}', 'patient', [column], unique=True, postgresql_where=sa.text('deleted_at IS NULL'))
+
+
+def downgrade() -> None:
+    for column in UNIQUE_COLUMNS:
+        op.drop_index(f'uq_patient_{column}', table_name='patient', postgresql_where=sa.text('deleted_at IS NULL'))
+        op.create_unique_constraint(f'patient_{column}_key', 'patient', [column])
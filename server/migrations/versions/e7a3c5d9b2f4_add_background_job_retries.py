@@ -0,0 +1,30 @@
+"""add background job retries
+
+Revision ID: e7a3c5d9b2f4
+Revises: d4b9f2e6a1c8
+Create Date: 2026-10-20 10:12:47.280516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c5d9b2f4'
+down_revision: Union[str, None] = 'd4b9f2e6a1c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'background_job',
+        sa.Column('retries', sa.Integer(), server_default='0', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('background_job', 'retries')
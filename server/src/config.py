@@ -1,3 +1,5 @@
+from typing import Optional
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,13 +7,168 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str
-    CELERY_BROKER_URL: str
-    CELERY_RESULT_BACKEND: str
+    # Required by the Celery job runner, the local one keeps Celery in memory
+    CELERY_BROKER_URL: Optional[str] = None
+    CELERY_RESULT_BACKEND: Optional[str] = None
     CLOUD_NAME: str
     UPLOAD_PRESET: str
-    GOOGLE_API_KEY: str
+    # Signed Admin API access, only needed to delete stored files
+    CLOUDINARY_API_KEY: Optional[str] = None
+    CLOUDINARY_API_SECRET: Optional[str] = None
+    GOOGLE_API_KEY: str = ""
+
+    # Shared Redis used for caches and coordination (optional)
+    REDIS_URL: Optional[str] = None
+
+    # LLM client
+    LLM_PROVIDER: str = "gemini"  # "gemini" or "local"
+    LLM_TIMEOUT_SECONDS: float = 120.0
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BACKOFF_SECONDS: float = 2.0
+    LLM_RETRY_BACKOFF_MAX_SECONDS: float = 30.0
+    LLM_JSON_REPAIR_ATTEMPTS: int = 2
+
+    # Global LLM limits shared by every worker (through Redis when available)
+    LLM_MAX_CONCURRENT_REQUESTS: int = 4
+    LLM_REQUESTS_PER_MINUTE: int = 15
+    LLM_TOKENS_PER_MINUTE: int = 1000000
+    LLM_EXPECTED_OUTPUT_TOKENS: int = 2048
+    LLM_LIMITER_LEASE_SECONDS: int = 300
+
+    # Resumable analysis pipeline checkpoints
+    PIPELINE_CHECKPOINT_DIR: str = "src/gait_sessions/runtime/checkpoints"
+    PIPELINE_CHECKPOINT_TTL_SECONDS: int = 2 * 24 * 60 * 60
+    PIPELINE_POSE_CHECKPOINT_FRAMES: int = 300
+    PIPELINE_MAX_ATTEMPTS: int = 3
+
+    # Shortest job first on the CPU queue: analyses up to this estimated run
+    # time get the top priority, one level less per doubling, and waiting
+    # analyses gain one level per aging period
+    SJF_SHORTEST_JOB_SECONDS: float = 30.0
+    SJF_AGING_SECONDS: float = 300.0
+    # Reading the properties of a video when its session is created
+    VIDEO_PROBE_TIMEOUT_SECONDS: float = 10.0
+    # Download the video and extract its pose as soon as a session is
+    # created, at the lowest priority (needs Redis)
+    PREFETCH_ENABLED: bool = False
+
+    # Analysis progress pub/sub
+    PROGRESS_TTL_SECONDS: int = 24 * 60 * 60
+    PROGRESS_MIN_INTERVAL_SECONDS: float = 0.5
+    PROGRESS_STREAM_TIMEOUT_SECONDS: int = 60 * 60
+
+    # How often running analyses check whether they were cancelled
+    CANCEL_CHECK_INTERVAL_SECONDS: float = 0.5
+
+    # Deduplication of analysis submissions and stage tasks
+    SUBMIT_LOCK_TIMEOUT_SECONDS: int = 30
+    SUBMIT_LOCK_WAIT_SECONDS: float = 5.0
+    IDEMPOTENCY_TTL_SECONDS: int = 60 * 60 * 24
+    PROCESSING_LOCK_TTL_SECONDS: int = 60
+
+    # Budgets per analysis, larger videos are downscaled or sampled
+    ANALYSIS_MAX_PIXELS_PER_SECOND: int = 1280 * 720 * 30
+    ANALYSIS_MAX_FRAMES: int = 9000
+    ANALYSIS_MAX_MEMORY_MB: int = 1536
+    ANALYSIS_MIN_FPS: float = 15.0
+
+    # Pose check on a few sampled frames before the full analysis: videos
+    # where the patient, or a hip or foot, is out of view in too many frames
+    # are rejected, borderline ones analyzed with a warning
+    QUALITY_GATE_ENABLED: bool = True
+    QUALITY_SAMPLE_FRAMES: int = 12
+    QUALITY_MIN_DETECTION_RATE: float = 0.5
+    QUALITY_MIN_VISIBLE_RATE: float = 0.5
+    QUALITY_WARN_RATE: float = 0.8
+    QUALITY_MIN_LANDMARK_VISIBILITY: float = 0.5
+
+    # Admission control of new analyses, over the backlog they get a 429
+    ADMISSION_MAX_BACKLOG_PER_WORKER: int = 10
+    # Used when no CPU worker answers the capacity inspection
+    ANALYSIS_WORKER_CAPACITY: int = 2
+    WORKER_CAPACITY_CACHE_SECONDS: int = 60
+    # Weight of the latest analysis in the stage duration averages
+    THROUGHPUT_EMA_ALPHA: float = 0.2
+
+    # Bulk re-analysis of existing sessions
+    REANALYSIS_RATE_PER_MINUTE: float = 30.0
+    REANALYSIS_MAX_IN_FLIGHT: int = 4
+    REANALYSIS_POLL_SECONDS: float = 5.0
+    REANALYSIS_TTL_SECONDS: int = 60 * 60 * 24 * 7
+
+    # Background purge of deleted sessions and patients
+    PURGE_SESSION_BATCH_SIZE: int = 100
+    PURGE_ROW_BATCH_SIZE: int = 5000
+    PURGE_MAX_RETRIES: int = 5
+    PURGE_RETRY_SECONDS: int = 300
+
+    # Background job runner: "celery" for Celery workers behind Redis, or
+    # "local" for process pools inside the API fed by a job table, for
+    # single-node deployments without Redis and Celery
+    JOB_RUNNER: str = "celery"
+    LOCAL_RUNNER_CPU_WORKERS: int = 2
+    LOCAL_RUNNER_IO_WORKERS: int = 4
+    LOCAL_RUNNER_POLL_SECONDS: float = 0.5
+    # Running jobs whose runner stopped renewing them are queued again
+    LOCAL_RUNNER_LEASE_SECONDS: int = 60
+    LOCAL_RUNNER_MAX_ATTEMPTS: int = 3
+    LOCAL_RUNNER_KEEP_FINISHED_SECONDS: int = 60 * 60 * 24 * 7
+
+    # Threads running the CPU-bound analysis stages in each worker process
+    INFERENCE_THREADS: int = 1
+    # Threads of OpenCV, BLAS and OpenMP in each worker child, library
+    # defaults (one per core) when unset, and whether each child is pinned
+    # to that many cores of its own. See `manage.py benchmark-topology`.
+    WORKER_CPU_THREADS: Optional[int] = None
+    WORKER_CPU_AFFINITY: bool = False
+
+    # Database pool of each Celery worker process
+    WORKER_DB_POOL_SIZE: int = 2
+    WORKER_DB_MAX_OVERFLOW: int = 3
+    # Fail analyses that hold a connection while downloading, computing,
+    # uploading or waiting for the LLM, instead of only logging it
+    ASSERT_NO_DB_CONNECTIONS_DURING_COMPUTE: bool = False
+
+    # Local LLM stand-in and replay fixtures
+    LLM_LOCAL_LATENCY_SECONDS: float = 2.0
+    LLM_LOCAL_ERROR_RATE: float = 0.0
+    LLM_FIXTURES_DIR: str = "src/gait_sessions/assets/llm_fixtures"
+    LLM_RECORD_FIXTURES: bool = False
+
+    # AI report task
+    REPORT_TASK_MAX_RETRIES: int = 5
+    REPORT_TASK_RETRY_BACKOFF_SECONDS: int = 30
+    REPORT_TASK_RETRY_BACKOFF_MAX_SECONDS: int = 600
+    REPORT_BATCH_CONCURRENCY: int = 8
+
+    # AI report streaming
+    REPORT_STREAM_TTL_SECONDS: int = 60 * 60
+    REPORT_STREAM_MAX_EVENTS: int = 10000
+    REPORT_STREAM_TIMEOUT_SECONDS: int = 15 * 60
+
+    # LLM response cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    LLM_CACHE_MAX_ENTRIES: int = 1000
+    LLM_CACHE_DIR: str = "src/gait_sessions/runtime/llm_cache"
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
+    @model_validator(mode="after")
+    def check_celery_broker(self) -> "Settings":
+        """
+        Refuse to start the Celery runner without a broker, where analyses
+        would be queued in memory with no worker to run them.
+        """
+        if self.JOB_RUNNER == "local":
+            self.CELERY_BROKER_URL = self.CELERY_BROKER_URL or "memory://"
+            self.CELERY_RESULT_BACKEND = self.CELERY_RESULT_BACKEND or "cache+memory://"
+        elif not self.CELERY_BROKER_URL or not self.CELERY_RESULT_BACKEND:
+            raise ValueError(
+                "CELERY_BROKER_URL and CELERY_RESULT_BACKEND are required "
+                'when JOB_RUNNER is "celery"'
+            )
+        return self
+
 
 Config = Settings()
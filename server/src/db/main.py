@@ -4,11 +4,24 @@ from sqlalchemy.ext.asyncio import AsyncEngine
 from src.config import Config
 from sqlalchemy.orm import sessionmaker
 
-async_engine = AsyncEngine(
-    create_engine(
-        url=Config.DATABASE_URL,
+
+
+def create_async_db_engine(**pool_options) -> AsyncEngine:
+    return AsyncEngine(
+        create_engine(
+            url=Config.DATABASE_URL,
+            **pool_options,
+        )
     )
-)
+
+
+async_engine = create_async_db_engine()
+
+
+def use_engine(engine: AsyncEngine) -> None:
+    """Make `get_session` use `engine`, e.g. one owned by a worker process."""
+    global async_engine
+    async_engine = engine
 
 
 async def init_db() -> None:
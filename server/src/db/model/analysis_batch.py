@@ -0,0 +1,33 @@
+from sqlalchemy import ARRAY, JSON, Column, DateTime, Integer
+from sqlmodel import SQLModel, Field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+class AnalysisBatch(SQLModel, table=True):
+    """The sessions of a batch of analyses started in one request."""
+
+    __tablename__ = "analysis_batch"
+
+    id: str = Field(primary_key=True, description="Unique identifier for the batch.")
+    group_id: Optional[str] = Field(
+        default=None, description="ID of the group of tasks the analyses run as."
+    )
+    session_ids: List[int] = Field(
+        default_factory=list,
+        sa_column=Column(ARRAY(Integer), nullable=False, default=[]),
+        description="Sessions whose analysis was started.",
+    )
+    rejected: Dict[str, str] = Field(
+        default_factory=dict,
+        sa_column=Column(JSON, nullable=False),
+        description="Reason each session that could not be started was rejected.",
+    )
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), index=True),
+        description="Timestamp when the batch was submitted.",
+    )
+
+    def __repr__(self):
+        return f"<AnalysisBatch(id={self.id}, sessions={len(self.session_ids)})>"
@@ -0,0 +1,75 @@
+from sqlalchemy import JSON, TEXT, Column, DateTime
+from sqlmodel import SQLModel, Field
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+from src.db.model.enum import JobStatus
+
+
+class BackgroundJob(SQLModel, table=True):
+    """A task queued or run by the local job runner."""
+
+    __tablename__ = "background_job"
+
+    id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        index=True,
+        description="Unique identifier for the job, in order of submission.",
+    )
+    task_id: str = Field(
+        unique=True, index=True, description="Unique ID of the task run by the job."
+    )
+    task_name: str = Field(description="Registered name of the task.")
+    args: List[Any] = Field(
+        default_factory=list,
+        sa_column=Column(JSON, nullable=False),
+        description="Positional arguments of the task.",
+    )
+    queue: str = Field(description="Queue of the task, which picks its process pool.")
+    priority: int = Field(description="Priority of the job, lower runs first.")
+    status: JobStatus = Field(
+        default=JobStatus.Queued, index=True, description="Status of the job."
+    )
+    attempts: int = Field(default=0, description="Number of times the job started.")
+    retries: int = Field(
+        default=0, description="Number of times the task asked to be retried."
+    )
+    result: Optional[Any] = Field(
+        default=None,
+        sa_column=Column(JSON, nullable=True),
+        description="Return value of the task.",
+    )
+    error: Optional[str] = Field(
+        default=None,
+        sa_column=Column(TEXT, nullable=True),
+        description="Error of the last failed attempt.",
+    )
+
+    enqueued_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True)),
+        description="Timestamp when the job was queued.",
+    )
+    run_after: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+        description="Timestamp before which a deferred job is not run.",
+    )
+    started_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+        description="Timestamp when the last attempt started.",
+    )
+    heartbeat_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+        description="Timestamp when the runner last renewed the running job.",
+    )
+    finished_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True),
+        description="Timestamp when the job finished.",
+    )
+
+    def __repr__(self):
+        return f"<BackgroundJob(id={self.id}, task={self.task_name}, status={self.status})>"
@@ -7,8 +7,10 @@ class AnalysisStatus(str, Enum):
     Initial = "Initial"
     Pending = "Pending"
     InProgress = "InProgress"
+    MetricsReady = "MetricsReady"
     Completed = "Completed"
     Error = "Error"
+    Cancelled = "Cancelled"
 
 
 class Sex(str, Enum):
@@ -401,3 +403,13 @@ class ToePosition(str, Enum):
     MiddleToe = "MiddleToe"  # Toe 3
     FourthToe = "FourthToe"  # Toe 4
     LittleToe = "LittleToe"  # Toe 5
+
+
+class JobStatus(str, Enum):
+    """Status of a job of the local job runner."""
+
+    Queued = "Queued"
+    Running = "Running"
+    Succeeded = "Succeeded"
+    Failed = "Failed"
+    Revoked = "Revoked"
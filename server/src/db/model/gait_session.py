@@ -49,6 +49,21 @@ class GaitSession(SQLModel, table=True):
         default=None,
         description="Frame rate of the video (calculated during analysis, optional).",
     )
+    video_width: Optional[int] = Field(
+        default=None, description="Width of the input video in pixels (probed)."
+    )
+    video_height: Optional[int] = Field(
+        default=None, description="Height of the input video in pixels (probed)."
+    )
+    video_frame_rate: Optional[float] = Field(
+        default=None, description="Frame rate of the input video (probed)."
+    )
+    video_frame_count: Optional[int] = Field(
+        default=None, description="Number of frames of the input video (probed)."
+    )
+    video_duration_seconds: Optional[float] = Field(
+        default=None, description="Duration of the input video in seconds (probed)."
+    )
     detailed_ai_analysis: Optional[str] = Field(
         default=None,
         sa_column=Column(TEXT, nullable=True),
@@ -79,6 +94,16 @@ class GaitSession(SQLModel, table=True):
         sa_column=Column(ARRAY(TEXT), nullable=False, default=[]),
         description="Array of long-term risks associated with the gait analysis.",
     )
+    processing_adjustments: List[str] = Field(
+        default_factory=list,
+        sa_column=Column(ARRAY(TEXT), nullable=False, default=[]),
+        description="Downscaling or sampling applied to fit the analysis budgets.",
+    )
+    analysis_error: Optional[str] = Field(
+        default=None,
+        sa_column=Column(TEXT, nullable=True),
+        description="Why the video was rejected by the last failed analysis.",
+    )
     analysis_status: AnalysisStatus = Field(
         default=AnalysisStatus.Initial, description="Status of the gait analysis."
     )
@@ -94,6 +119,11 @@ class GaitSession(SQLModel, table=True):
         ),
         description="Timestamp when the record was last updated.",
     )
+    deleted_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True, index=True),
+        description="Timestamp when the session was deleted, until it is purged.",
+    )
 
     patient: Patient = Relationship(
         back_populates="gait_sessions",
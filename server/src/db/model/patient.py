@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime
+from sqlalchemy import Column, DateTime, Index, text
 from sqlmodel import Field, Relationship, SQLModel
 from datetime import datetime, date, timezone
 from typing import List, Optional
@@ -11,6 +11,17 @@ class Patient(SQLModel, table=True):
     """Database model representing a patient and their medical details."""
 
     __tablename__ = "patient"
+    # Unique among patients not deleted, a deleted patient can be registered
+    # again before it is purged
+    __table_args__ = tuple(
+        Index(
+            f"uq_patient_{column}",
+            column,
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+        )
+        for column in ("ssn", "email", "phone_number")
+    )
 
     id: int = Field(
         default=None,
@@ -28,14 +39,13 @@ class Patient(SQLModel, table=True):
     ssn: Optional[str] = Field(
         None,
         max_length=20,
-        unique=True,
         description="Social Security Number (SSN) or national ID, if applicable.",
     )
     email: Optional[str] = Field(
-        None, max_length=255, unique=True, description="Patient's unique email address."
+        None, max_length=255, description="Patient's unique email address."
     )
     phone_number: Optional[str] = Field(
-        None, max_length=20, unique=True, description="Patient's unique phone number."
+        None, max_length=20, description="Patient's unique phone number."
     )
 
     sex: Sex = Field(
@@ -85,6 +95,11 @@ class Patient(SQLModel, table=True):
         ),
         description="Timestamp when the record was last updated.",
     )
+    deleted_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column(DateTime(timezone=True), nullable=True, index=True),
+        description="Timestamp when the patient was deleted, until it is purged.",
+    )
 
     def __repr__(self) -> str:
         """String representation of a Patient record for debugging and logging."""
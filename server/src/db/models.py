@@ -4,3 +4,5 @@ from src.db.model.medical_condition import *
 from src.db.model.injury import *
 from src.db.model.prosthetic import *
 from src.db.model.gait_session import *
+from src.db.model.background_job import *
+from src.db.model.analysis_batch import *
@@ -0,0 +1,53 @@
+from typing import Optional
+
+import redis
+from redis import asyncio as aioredis
+
+from src.config import Config
+
+_redis_client: Optional[redis.Redis] = None
+_async_redis_client: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """
+    Return a shared Redis client, or None when Redis is not configured.
+
+    Callers are expected to fall back to a local implementation when this
+    returns None.
+    """
+    global _redis_client
+    if not Config.REDIS_URL:
+        return None
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(Config.REDIS_URL, decode_responses=True)
+    return _redis_client
+
+
+def get_async_redis() -> Optional[aioredis.Redis]:
+    """Return a shared asyncio Redis client, or None when Redis is not configured."""
+    global _async_redis_client
+    if not Config.REDIS_URL:
+        return None
+    if _async_redis_client is None:
+        _async_redis_client = aioredis.Redis.from_url(
+            Config.REDIS_URL, decode_responses=True
+        )
+    return _async_redis_client
+
+
+def reset_redis_clients() -> None:
+    """
+    Forget the clients without closing them, so a forked process opens its
+    own connections instead of sharing the parent's sockets.
+    """
+    global _redis_client, _async_redis_client
+    _redis_client = None
+    _async_redis_client = None
+
+
+async def close_async_redis() -> None:
+    global _async_redis_client
+    if _async_redis_client is not None:
+        await _async_redis_client.aclose()
+        _async_redis_client = None
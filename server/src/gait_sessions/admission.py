@@ -0,0 +1,119 @@
+import asyncio
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pydantic import BaseModel
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import Config
+from src.db.model.enum import AnalysisStatus
+from src.db.models import GaitSession
+from src.db.redis import get_async_redis
+from src.gait_sessions.schema import AnalysisEstimateModel
+from src.gait_sessions.celery_jobs import CPU_QUEUE, celery_app
+from src.gait_sessions.throughput import ThroughputStats, load_throughput
+
+WORKER_CAPACITY_KEY = "gait_analysis_worker_capacity"
+
+# Statuses of analyses waiting for or holding a CPU worker
+QUEUED_STATUSES = (AnalysisStatus.Pending, AnalysisStatus.InProgress)
+
+
+class QueueSnapshot(BaseModel):
+    """Analyses ahead of a new submission and the capacity to run them."""
+
+    backlog: int
+    capacity: int
+    throughput: ThroughputStats
+
+    @property
+    def max_backlog(self) -> int:
+        return self.capacity * Config.ADMISSION_MAX_BACKLOG_PER_WORKER
+
+    @property
+    def accepts(self) -> bool:
+        return self.backlog < self.max_backlog
+
+    def _drain_seconds(self, analyses: int) -> float:
+        """Time for the workers to get through `analyses` queued analyses."""
+        return analyses / self.capacity * self.throughput.analysis_seconds()
+
+    def retry_after_seconds(self) -> int:
+        """Time until the backlog drops back under the admission threshold."""
+        excess = self.backlog - self.max_backlog + 1
+        return max(1, math.ceil(self._drain_seconds(excess)))
+
+    def estimate(self, cost_seconds: Optional[float] = None) -> AnalysisEstimateModel:
+        """Expected start and finish, for an analysis of unknown cost by default."""
+        if cost_seconds is None:
+            cost_seconds = self.throughput.analysis_seconds()
+        now = datetime.now(timezone.utc)
+        # Analyses ahead that cannot start right away wait for a free worker
+        waiting = max(0, self.backlog - self.capacity + 1)
+        start = now + timedelta(seconds=self._drain_seconds(waiting))
+        finish = start + timedelta(seconds=cost_seconds)
+        return AnalysisEstimateModel(
+            queue_position=self.backlog + 1,
+            estimated_start_at=start,
+            estimated_finish_at=finish,
+        )
+
+
+def _inspect_worker_capacity() -> int:
+    """Sum the concurrency of the workers consuming the CPU queue."""
+    stats = celery_app.control.inspect(timeout=1.0).stats() or {}
+    return sum(
+        worker.get("pool", {}).get("max-concurrency", 0)
+        for hostname, worker in stats.items()
+        if hostname.startswith(f"{CPU_QUEUE}@")
+    )
+
+
+async def worker_capacity() -> int:
+    """
+    Number of analyses the CPU workers can run at once.
+
+    Inspecting the workers is a broadcast that waits for their replies, so
+    the result is cached. Falls back to `ANALYSIS_WORKER_CAPACITY` when no
+    worker answers. Jobs run by the local runner have a fixed pool.
+    """
+    if Config.JOB_RUNNER == "local":
+        return Config.LOCAL_RUNNER_CPU_WORKERS
+
+    redis = get_async_redis()
+    if redis is not None:
+        cached = await redis.get(WORKER_CAPACITY_KEY)
+        if cached is not None:
+            return int(cached)
+
+    try:
+        capacity = await asyncio.to_thread(_inspect_worker_capacity)
+    except Exception as e:
+        print(f"Failed to inspect Celery workers: {str(e)}")
+        capacity = 0
+    capacity = capacity or Config.ANALYSIS_WORKER_CAPACITY
+
+    if redis is not None:
+        await redis.set(
+            WORKER_CAPACITY_KEY, capacity, ex=Config.WORKER_CAPACITY_CACHE_SECONDS
+        )
+    return capacity
+
+
+async def queue_snapshot(session: AsyncSession) -> QueueSnapshot:
+    result = await session.exec(
+        select(func.count())
+        .select_from(GaitSession)
+        .where(
+            GaitSession.analysis_status.in_(QUEUED_STATUSES),
+            GaitSession.deleted_at.is_(None),
+        )
+    )
+    return QueueSnapshot(
+        backlog=result.one(),
+        capacity=await worker_capacity(),
+        throughput=await load_throughput(),
+    )
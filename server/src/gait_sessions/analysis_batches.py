@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import Config
+from src.db.models import AnalysisBatch
+
+
+def _expired_before() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(seconds=Config.PROGRESS_TTL_SECONDS)
+
+
+async def save_analysis_batch(batch: Dict, session: AsyncSession) -> None:
+    """
+    Store the sessions of a batch analysis so its progress can be polled.
+    Batches are kept for `PROGRESS_TTL_SECONDS`, older ones are dropped here.
+    """
+    await session.execute(
+        delete(AnalysisBatch).where(AnalysisBatch.created_at < _expired_before())
+    )
+    session.add(
+        AnalysisBatch(
+            id=batch["batch_id"],
+            group_id=batch["group_id"],
+            session_ids=batch["session_ids"],
+            rejected=batch["rejected"],
+            created_at=batch["created_at"],
+        )
+    )
+    await session.commit()
+
+
+async def load_analysis_batch(
+    batch_id: str, session: AsyncSession
+) -> Optional[Dict]:
+    batch = await session.get(AnalysisBatch, batch_id)
+    if batch is None or batch.created_at < _expired_before():
+        return None
+    return {
+        "batch_id": batch.id,
+        "group_id": batch.group_id,
+        "session_ids": batch.session_ids,
+        "rejected": batch.rejected,
+        "created_at": batch.created_at,
+    }
@@ -0,0 +1,124 @@
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from redis.exceptions import LockError
+
+from src.config import Config
+from src.db.redis import get_async_redis, get_redis
+
+SUBMIT_LOCK_PREFIX = "gait_submit_lock"
+PROCESSING_LOCK_PREFIX = "gait_processing"
+CHECKPOINT_LOCK_NAME = "checkpoints"
+IDEMPOTENCY_KEY_PREFIX = "gait_idempotency"
+
+
+def idempotency_key(session_id: int, key: str) -> str:
+    return f"{IDEMPOTENCY_KEY_PREFIX}:{session_id}:{key}"
+
+
+@asynccontextmanager
+async def submission_lock(session_id: int) -> AsyncIterator[bool]:
+    """
+    Serialize analysis submissions of a session across API replicas.
+
+    Yields whether the lock was acquired within `SUBMIT_LOCK_WAIT_SECONDS`.
+    Without Redis there is nothing to coordinate with and it always is.
+    """
+    redis = get_async_redis()
+    if redis is None:
+        yield True
+        return
+
+    lock = redis.lock(
+        f"{SUBMIT_LOCK_PREFIX}:{session_id}",
+        timeout=Config.SUBMIT_LOCK_TIMEOUT_SECONDS,
+        blocking_timeout=Config.SUBMIT_LOCK_WAIT_SECONDS,
+    )
+    acquired = await lock.acquire()
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            try:
+                await lock.release()
+            except LockError:
+                # Expired while held, another submission may own it now
+                pass
+
+
+async def is_duplicate_submission(session_id: int, key: str) -> bool:
+    """Whether a submission with this idempotency key was already accepted."""
+    redis = get_async_redis()
+    if redis is None:
+        return False
+    return bool(await redis.exists(idempotency_key(session_id, key)))
+
+
+async def record_submission(session_id: int, key: str, task_id: str) -> None:
+    redis = get_async_redis()
+    if redis is not None:
+        await redis.set(
+            idempotency_key(session_id, key),
+            task_id,
+            ex=Config.IDEMPOTENCY_TTL_SECONDS,
+        )
+
+
+class ProcessingLock:
+    """
+    Held by the worker running one stage of a session's analysis, so the
+    same stage never runs twice at once, e.g. when the broker redelivers a
+    long task that is still running.
+
+    The lock expires after `PROCESSING_LOCK_TTL_SECONDS` and is renewed from
+    a background thread while held, so a crashed worker only blocks the
+    stage briefly.
+    """
+
+    def __init__(self, session_id: int, stage_task: str):
+        redis = get_redis()
+        self.ttl = Config.PROCESSING_LOCK_TTL_SECONDS
+        self.lock = (
+            redis.lock(
+                f"{PROCESSING_LOCK_PREFIX}:{session_id}:{stage_task}",
+                timeout=self.ttl,
+                thread_local=False,
+            )
+            if redis is not None
+            else None
+        )
+        self._released = threading.Event()
+
+    def acquire(self) -> bool:
+        if self.lock is None:
+            return True
+        if not self.lock.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._renew, daemon=True).start()
+        return True
+
+    def _renew(self) -> None:
+        while not self._released.wait(self.ttl / 3):
+            try:
+                self.lock.extend(self.ttl, replace_ttl=True)
+            except Exception as e:
+                print(f"Failed to renew analysis processing lock: {str(e)}")
+                return
+
+    def release(self) -> None:
+        if self.lock is None:
+            return
+        self._released.set()
+        try:
+            self.lock.release()
+        except LockError:
+            pass
+
+
+def checkpoint_lock(session_id: int) -> ProcessingLock:
+    """
+    Held by whichever task writes a session's pipeline checkpoints, a stage
+    of its analysis or its prefetch, so they never write them at once.
+    """
+    return ProcessingLock(session_id, CHECKPOINT_LOCK_NAME)
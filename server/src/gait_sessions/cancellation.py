@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import Awaitable, Optional, TypeVar
+
+from src.config import Config
+from src.db.redis import get_async_redis, get_redis
+
+CANCEL_KEY_PREFIX = "gait_cancel"
+TASK_KEY_PREFIX = "gait_task"
+
+T = TypeVar("T")
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside the pipeline when the analysis has been cancelled."""
+
+
+def cancel_key(session_id: int) -> str:
+    return f"{CANCEL_KEY_PREFIX}:{session_id}"
+
+
+def task_key(session_id: int) -> str:
+    return f"{TASK_KEY_PREFIX}:{session_id}"
+
+
+async def request_cancellation(session_id: int) -> Optional[str]:
+    """
+    Flag a session's analysis as cancelled for the workers running it, and
+    return the task currently registered for it.
+    """
+    redis = get_async_redis()
+    if redis is None:
+        return None
+    pipe = redis.pipeline()
+    pipe.set(cancel_key(session_id), 1, ex=Config.PROGRESS_TTL_SECONDS)
+    pipe.get(task_key(session_id))
+    _, task_id = await pipe.execute()
+    return task_id
+
+
+async def clear_cancellation(session_id: int) -> None:
+    redis = get_async_redis()
+    if redis is not None:
+        await redis.delete(cancel_key(session_id))
+
+
+async def remember_task(session_id: int, task_id: str) -> None:
+    """Record the task currently queued or running for a session's analysis."""
+    redis = get_async_redis()
+    if redis is not None:
+        await redis.set(task_key(session_id), task_id, ex=Config.PROGRESS_TTL_SECONDS)
+
+
+def current_task_id(session_id: int) -> Optional[str]:
+    redis = get_redis()
+    return redis.get(task_key(session_id)) if redis is not None else None
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation check for one session's analysis.
+
+    The Redis flag is polled at most every `CANCEL_CHECK_INTERVAL_SECONDS`,
+    so the check is cheap enough to call for every frame.
+    """
+
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.redis = get_redis()
+        self.cancelled = False
+        self.last_checked_at = 0.0
+
+    def is_cancelled(self, force: bool = False) -> bool:
+        if self.cancelled or self.redis is None:
+            return self.cancelled
+        now = time.monotonic()
+        if not force and now - self.last_checked_at < Config.CANCEL_CHECK_INTERVAL_SECONDS:
+            return False
+        self.last_checked_at = now
+        try:
+            self.cancelled = self._check()
+        except Exception as e:
+            print(f"Failed to check analysis cancellation: {str(e)}")
+        return self.cancelled
+
+    def _check(self) -> bool:
+        return bool(self.redis.exists(cancel_key(self.session_id)))
+
+    def raise_if_cancelled(self, force: bool = False) -> None:
+        if self.is_cancelled(force):
+            raise AnalysisCancelled(f"Analysis of session {self.session_id} was cancelled")
+
+    async def run(self, awaitable: Awaitable[T]) -> T:
+        """Await a long I/O operation, aborting it as soon as the analysis is cancelled."""
+        task = asyncio.ensure_future(awaitable)
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    {task}, timeout=Config.CANCEL_CHECK_INTERVAL_SECONDS
+                )
+                if done:
+                    return task.result()
+                self.raise_if_cancelled(force=True)
+        finally:
+            if not task.done():
+                task.cancel()
@@ -1,15 +1,64 @@
+from billiard.process import current_process
 from celery import Celery
-import asyncio
-import billiard
+from celery.signals import (
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
+import time
+
+from celery.utils import uuid
+from typing import List, Optional, Tuple
 import pandas as pd
+from sqlalchemy import delete, update
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.db.main import get_session
 from src.db.models import GaitSession, GaitMetric, GaitPlotData, AnalysisStatus
-from src.gait_sessions.gait_analysis_pipeline import (
-    GaitAnalysisOutput,
-    GaitAnalysisPipeline,
+from src.gait_sessions.analysis_locks import ProcessingLock, checkpoint_lock
+from src.gait_sessions.gait_analysis_pipeline import GaitAnalysisPipeline
+from src.gait_sessions.job_runner import JobDeferred, RunnerTask, create_job_runner
+from src.gait_sessions.cancellation import (
+    AnalysisCancelled,
+    CancellationToken,
+    current_task_id,
+    remember_task,
+    request_cancellation,
+)
+from src.gait_sessions.cpu_topology import apply_worker_topology
+from src.gait_sessions.prefetch import PrefetchToken, mark_prefetch
+from src.gait_sessions.pipeline_checkpoints import (
+    PipelineCheckpointStore,
+    clear_session_checkpoints,
+    prune_stale_checkpoints,
+)
+from src.gait_sessions.progress import ProgressPublisher, publish_status
+from src.gait_sessions.purge import purge_deleted
+from src.gait_sessions.reanalysis import finish_reanalysis
+from src.gait_sessions.report_batch import generate_reports_batch
+from src.gait_sessions.report_stream import ReportStreamPublisher
+from src.gait_sessions.scheduling import (
+    PRIORITY_BATCH,
+    PRIORITY_DEFAULT,
+    PRIORITY_PREFETCH,
+    WaitingJob,
+    add_waiting_job,
+    claim_waiting_job,
+    job_priority,
+    promote_waiting_job,
+    remove_waiting_job,
+    waiting_jobs,
+)
+from src.gait_sessions.throughput import load_throughput
+from src.gait_sessions.video_quality import VideoRejected
+from src.gait_sessions.video_budget import VideoProbe
+from src.gait_sessions.worker_resources import (
+    init_worker_resources,
+    run_async,
+    run_cpu_bound,
+    shutdown_worker_resources,
+    warn_if_connections_held,
 )
 from src.config import Config
 
@@ -18,11 +67,75 @@ celery_app = Celery(
     "gait_analysis_tasks",
     broker=Config.CELERY_BROKER_URL,
     backend=Config.CELERY_RESULT_BACKEND,
+    task_cls=RunnerTask,
+    include=[
+        "src.gait_sessions.queue_benchmark",
+        "src.gait_sessions.reanalysis_tasks",
+    ],
 )
 
+# Pose estimation and rendering keep a CPU core busy for minutes, while
+# downloads, uploads, LLM calls and DB writes mostly wait. Each kind of work
+# has its own queue so a long pose job never blocks the quick ones.
+CPU_QUEUE = "cpu"
+IO_QUEUE = "io"
+
+# How long an analysis stage waits for a cancelled prefetch to let go of the
+# session's checkpoints
+PREFETCH_HANDOVER_SECONDS = 1
+
+celery_app.conf.update(
+    task_default_queue=IO_QUEUE,
+    task_routes={
+        "src.gait_sessions.celery_jobs.extract_gait_task": {"queue": CPU_QUEUE},
+        "src.gait_sessions.celery_jobs.prefetch_pose_task": {"queue": CPU_QUEUE},
+        "src.gait_sessions.queue_benchmark.benchmark_cpu_task": {"queue": CPU_QUEUE},
+    },
+    task_default_priority=PRIORITY_DEFAULT,
+    broker_transport_options={
+        "priority_steps": list(range(10)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+    # Reserve one task at a time so priorities apply to every waiting task
+    worker_prefetch_multiplier=1,
+)
+
+# Process pool size per queue when jobs run inside the API, see job_runner
+LOCAL_RUNNER_POOLS = {
+    CPU_QUEUE: Config.LOCAL_RUNNER_CPU_WORKERS,
+    IO_QUEUE: Config.LOCAL_RUNNER_IO_WORKERS,
+}
+
+job_runner = create_job_runner(celery_app, LOCAL_RUNNER_POOLS)
+
+
+# Each worker process owns its event loop and database pool, see worker_resources
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    layout = apply_worker_topology(getattr(current_process(), "index", None))
+    if layout:
+        print(f"Worker process layout: {layout}")
+    init_worker_resources()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def shutdown_worker_process(**kwargs):
+    shutdown_worker_resources()
+
+
 pipeline = None
 
 
+def get_pipeline() -> GaitAnalysisPipeline:
+    """Return the worker's shared pipeline, creating it on first use."""
+    global pipeline
+    if pipeline is None:
+        pipeline = GaitAnalysisPipeline()
+    return pipeline
+
+
 async def get_gait_session_by_id(session_id: int, session: AsyncSession):
     """Get a gait session by ID."""
     result = await session.exec(select(GaitSession).where(GaitSession.id == session_id))
@@ -32,37 +145,345 @@ async def get_gait_session_by_id(session_id: int, session: AsyncSession):
     return gait_session
 
 
-@celery_app.task
-def run_gait_analysis_task(session_id: int):
+def _run_analysis_step(task, session_id: int, step, *args):
+    """
+    Run one stage task of the analysis, setting the session status to Error
+    if it fails, or cleaning up if it was cancelled.
+
+    Only the task registered as the session's current one runs, duplicates
+    enqueued by racing submissions are skipped. A stage already running
+    elsewhere, e.g. a long task the broker redelivered, is retried later.
+    """
+    registered_task_id = current_task_id(session_id)
+    if registered_task_id is not None and registered_task_id != task.request.id:
+        print(f"Skipping duplicate {task.name} for session {session_id}")
+        return {"status": "duplicate", "session_id": session_id}
+
+    processing_lock = ProcessingLock(session_id, task.name)
+    if not processing_lock.acquire():
+        _retry_later(task, Config.PROCESSING_LOCK_TTL_SECONDS)
+    # A prefetch of the session cancelled by the submission lets go of its
+    # checkpoints within `CANCEL_CHECK_INTERVAL_SECONDS`
+    checkpoints_lock = checkpoint_lock(session_id)
+    if not checkpoints_lock.acquire():
+        processing_lock.release()
+        _retry_later(task, PREFETCH_HANDOVER_SECONDS)
+
+    try:
+        return run_async(step(session_id, get_pipeline(), *args))
+    except AnalysisCancelled:
+        print(f"Gait analysis for session {session_id} was cancelled")
+        run_async(_handle_analysis_cancelled(session_id))
+        return {"status": "cancelled", "session_id": session_id}
+    except VideoRejected as e:
+        # Retrying cannot help, the video has to be recorded again
+        print(f"Video of session {session_id} rejected: {str(e)}")
+        run_async(_handle_analysis_error(session_id, str(e), rejection=str(e)))
+        clear_session_checkpoints(session_id)
+        return {"status": "rejected", "session_id": session_id}
+    except Exception as e:
+        print(f"Critical error in gait analysis task: {str(e)}")
+        run_async(_handle_analysis_error(session_id, str(e)))
+        raise e
+    finally:
+        checkpoints_lock.release()
+        processing_lock.release()
+
+
+def _retry_later(task, countdown: float):
+    """Run a stage task again after `countdown` seconds."""
+    if task.request.is_eager:
+        # Run by the local runner, where a retry would not wait
+        raise JobDeferred(countdown)
+    raise task.retry(countdown=countdown, max_retries=None)
+
+
+async def submit_analysis(
+    session_id: int,
+    priority: int = PRIORITY_DEFAULT,
+    cost_seconds: Optional[float] = None,
+) -> str:
+    """
+    Enqueue the analysis of a session already set to Pending.
+
+    `priority` is the base priority of the analysis, the broker priority is
+    derived from it and the estimated cost, see `job_priority`.
+
+    The task is registered as the session's current one before it is sent,
+    so the worker can tell it apart from duplicates.
     """
-    Celery task to run gait analysis in the background.
+    return await job_runner.enqueue(
+        *await _analysis_job(session_id, priority, cost_seconds)
+    )
+
+
+async def stop_analysis(session_id: int) -> None:
+    """
+    Stop the queued or running analysis of a session: running stages notice
+    the cancellation flag, the queued task is revoked and the scheduler stops
+    enqueueing it again under a new task id.
+    """
+    task_id = await request_cancellation(session_id)
+    await remove_waiting_job(session_id)
+    if task_id:
+        await job_runner.revoke(task_id)
+
+
+async def submit_analysis_group(jobs: List[Tuple[int, int, Optional[float]]]) -> str:
+    """
+    Enqueue the analyses of several sessions already set to Pending as one
+    group.
 
     Args:
-        session_id (int): The ID of the gait session to analyze
+        jobs (list): (session ID, base priority, estimated cost) per session
 
     Returns:
-        dict: Status information about the completed analysis
+        str: The ID of the group
     """
-    # Create event loop for async operations
-    loop = asyncio.get_event_loop()
+    return await job_runner.enqueue_group(
+        [await _analysis_job(*job) for job in jobs]
+    )
+
+
+async def _analysis_job(
+    session_id: int, priority: int, cost_seconds: Optional[float]
+):
+    """Job of a session's analysis, registered as its current task."""
+    task_id = uuid()
+    await remember_task(session_id, task_id)
+    return (
+        run_gait_analysis_task.name,
+        (session_id, priority),
+        task_id,
+        job_priority(priority, cost_seconds),
+    )
+
+
+async def _enqueue_stage(
+    session_id: int, stage_task, priority: Optional[int] = None
+) -> None:
+    """Register the next stage task of a session before enqueueing it."""
+    task_id = uuid()
+    await remember_task(session_id, task_id)
+    await job_runner.enqueue(stage_task.name, (session_id,), task_id, priority)
+
+
+async def _schedule_extraction(
+    session_id: int, base_priority: int, cost_seconds: Optional[float]
+) -> None:
+    """Enqueue the CPU stage of a session, ranked by its estimated cost."""
+    job = WaitingJob(
+        base_priority=base_priority,
+        cost_seconds=cost_seconds,
+        priority=job_priority(base_priority, cost_seconds),
+        enqueued_at=time.time(),
+    )
+    await add_waiting_job(session_id, job)
+    await _enqueue_stage(session_id, extract_gait_task, priority=job.priority)
+
+
+async def _promote_waiting_jobs() -> None:
+    """
+    Age the analyses waiting on the CPU queue.
+
+    Broker priorities cannot be changed once a message is queued, so a job
+    whose priority improved with its wait is enqueued again under a new task
+    id, and the old message is skipped as a duplicate.
+    """
+    now = time.time()
     try:
-        global pipeline
-        if pipeline is None:
-            pipeline = GaitAnalysisPipeline()
-        return loop.run_until_complete(_run_analysis(session_id, pipeline))
+        for session_id, job in (await waiting_jobs()).items():
+            if now - job.enqueued_at > Config.PROGRESS_TTL_SECONDS:
+                await remove_waiting_job(session_id)
+                continue
+            priority = job.aged_priority(now)
+            if priority >= job.priority:
+                continue
+            task_id = uuid()
+            promoted = job.model_copy(update={"priority": priority})
+            if await promote_waiting_job(session_id, task_id, promoted):
+                await job_runner.enqueue(
+                    extract_gait_task.name, (session_id,), task_id, priority
+                )
     except Exception as e:
-        print(f"Critical error in gait analysis task: {str(e)}")
-        loop.run_until_complete(_handle_analysis_error(session_id, str(e)))
-        raise e
-    except billiard.exceptions.WorkerLostError as wle:
-        print(f"Worker lost error in gait analysis task: {str(wle)}")
-        loop.run_until_complete(_handle_analysis_error(session_id, str(wle)))
-        raise
+        print(f"Failed to promote waiting analyses: {str(e)}")
+
+
+async def submit_prefetch(session_id: int, video_url: Optional[str]) -> None:
+    """
+    Speculatively download a session's video and extract its pose, at the
+    lowest priority, so the heavy part is done when the analysis is
+    requested. A prefetch of the session's previous video is cancelled.
+    """
+    if not Config.PREFETCH_ENABLED or not video_url:
+        return
+    if await mark_prefetch(session_id, video_url):
+        await job_runner.enqueue(
+            prefetch_video_task.name, (session_id, video_url), None, PRIORITY_PREFETCH
+        )
+
+
+def _record_attempt(checkpoints: PipelineCheckpointStore, task: str) -> None:
+    """Stop redelivering tasks whose video keeps killing the worker."""
+    attempts = checkpoints.record_attempt(task)
+    if attempts > Config.PIPELINE_MAX_ATTEMPTS:
+        checkpoints.clear()
+        raise RuntimeError(
+            f"Analysis did not finish after {Config.PIPELINE_MAX_ATTEMPTS} attempts"
+        )
+    if attempts > 1:
+        print(f"Resuming {task} at stage {checkpoints.first_incomplete_stage()}")
+
+
+async def _load_running_session(session_id: int, session: AsyncSession, task: str):
+    """
+    Load a session whose analysis is in progress, with its checkpoints.
+
+    Returns (None, None) when the analysis is no longer running, e.g. for a
+    redelivered task whose results were already persisted.
+    """
+    gait_session = await get_gait_session_by_id(session_id, session)
+    if (
+        gait_session.analysis_status != AnalysisStatus.InProgress
+        or gait_session.deleted_at is not None
+    ):
+        if gait_session.analysis_status == AnalysisStatus.Cancelled:
+            clear_session_checkpoints(session_id)
+        return None, None
+    checkpoints = PipelineCheckpointStore(session_id, gait_session.video_url)
+    _record_attempt(checkpoints, task)
+    return gait_session, checkpoints
+
+
+# Analysis tasks are acknowledged only once they finish, so if a worker process
+# dies the message is redelivered and the stage resumes from its checkpoint.
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def run_gait_analysis_task(
+    self, session_id: int, priority: int = PRIORITY_DEFAULT
+):
+    """
+    Celery task to start gait analysis in the background.
+
+    Downloads the video on the I/O queue, then hands the session over to
+    `extract_gait_task` on the CPU queue. There the shortest videos run
+    first, and waiting ones gain priority over time, see `job_priority`.
+
+    Args:
+        session_id (int): The ID of the gait session to analyze
+        priority (int): Base priority of the analysis, lower runs first
+
+    Returns:
+        dict: Status information about the started analysis
+    """
+    prune_stale_checkpoints()
+    return _run_analysis_step(self, session_id, _start_analysis, priority)
+
+
+async def _start_analysis(
+    session_id: int, pipeline: GaitAnalysisPipeline, priority: int
+):
+    async for session in get_session():
+        gait_session = await get_gait_session_by_id(session_id, session)
+        checkpoints = PipelineCheckpointStore(session_id, gait_session.video_url)
+
+        # A redelivered task may find its results already persisted, and a
+        # cancelled analysis or deleted session must not be restarted
+        if (
+            gait_session.analysis_status
+            not in (AnalysisStatus.Pending, AnalysisStatus.InProgress)
+            or gait_session.deleted_at is not None
+        ):
+            checkpoints.clear()
+            return {"status": "skipped", "session_id": session_id}
+
+        _record_attempt(checkpoints, "run_gait_analysis_task")
+
+        gait_session.analysis_status = AnalysisStatus.InProgress
+        video_url = gait_session.video_url
+        await session.commit()
+        warn_if_connections_held("download")
+
+        progress = ProgressPublisher(session_id)
+        progress.status(AnalysisStatus.InProgress)
+        await pipeline.run_download_stage(
+            video_url, checkpoints, progress, CancellationToken(session_id)
+        )
+        plan = pipeline.run_probe_stage(checkpoints)
+
+        # Keep what the downloaded file says for later estimates
+        await _store_probe(session, session_id, plan.source)
+
+        # Fail within seconds, before the analysis waits for the CPU queue,
+        # when the patient cannot be tracked in the video
+        await run_cpu_bound(pipeline.run_quality_stage, checkpoints)
+
+        cost_seconds = (await load_throughput()).analysis_seconds(plan.frame_count)
+        await _schedule_extraction(session_id, priority, cost_seconds)
+        await _promote_waiting_jobs()
+        return {"status": "downloaded", "session_id": session_id}
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def extract_gait_task(self, session_id: int):
+    """
+    Celery task running the CPU-bound pose, signal and render stages.
+
+    Args:
+        session_id (int): The ID of the gait session to analyze
+
+    Returns:
+        dict: Status information about the processed video
+    """
+    # A job promoted while queued runs under its new task id
+    if not claim_waiting_job(session_id, self.request.id):
+        print(f"Skipping duplicate {self.name} for session {session_id}")
+        return {"status": "duplicate", "session_id": session_id}
+    # A CPU worker just freed up, the jobs left behind have waited longer
+    run_async(_promote_waiting_jobs())
+    return _run_analysis_step(self, session_id, _extract_gait)
+
+
+async def _extract_gait(session_id: int, pipeline: GaitAnalysisPipeline):
+    async for session in get_session():
+        gait_session, checkpoints = await _load_running_session(
+            session_id, session, "extract_gait_task"
+        )
+        if gait_session is None:
+            return {"status": "skipped", "session_id": session_id}
+        # Release the connection while processing the video
+        await session.commit()
+        warn_if_connections_held("compute")
+
+        await pipeline.run_compute_stages(
+            checkpoints, ProgressPublisher(session_id), CancellationToken(session_id)
+        )
+
+        await _enqueue_stage(session_id, persist_gait_analysis_task)
+        return {"status": "processed", "session_id": session_id}
+
+
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def persist_gait_analysis_task(self, session_id: int):
+    """
+    Celery task uploading the annotated video and storing the gait metrics.
+
+    Args:
+        session_id (int): The ID of the gait session to analyze
+
+    Returns:
+        dict: Status information about the completed analysis
+    """
+    return _run_analysis_step(self, session_id, _persist_analysis)
 
 
-async def _run_analysis(session_id: int, pipeline: GaitAnalysisPipeline):
+async def _persist_analysis(session_id: int, pipeline: GaitAnalysisPipeline):
     """
-    Run the gait analysis asynchronously.
+    Upload the annotated video and store the analysis results.
+
+    All rows are built while no connection is held, so results are written
+    in one short transaction.
 
     Args:
         session_id (int): The ID of the gait session to analyze
@@ -71,194 +492,487 @@ async def _run_analysis(session_id: int, pipeline: GaitAnalysisPipeline):
         dict: Status information about the completed analysis
     """
     async for session in get_session():
-        try:
-            gait_session = await get_gait_session_by_id(session_id, session)
+        gait_session, checkpoints = await _load_running_session(
+            session_id, session, "persist_gait_analysis_task"
+        )
+        if gait_session is None:
+            return {"status": "skipped", "session_id": session_id}
+        # Release the connection while uploading
+        await session.commit()
+        warn_if_connections_held("upload")
 
-            gait_session.analysis_status = AnalysisStatus.InProgress
-            await session.commit()
-            await session.refresh(gait_session)
-
-            # Run analysis pipeline
-            (
-                annotated_video_url,
-                df,
-                frame_rate,
-                dist_left_filtered,
-                dist_right_filtered,
-                peaks_left,
-                peaks_right,
-                minima_left,
-                minima_right,
-                ai_analysis,
-            ) = await pipeline.run_analysis(gait_session, gait_session.video_url)
-
-            # Validate DataFrame
-            if df.empty:
-                raise ValueError("No gait metrics generated")
-
-            # Update session with results
-            gait_session.annotated_video_url = annotated_video_url
-            gait_session.frame_rate = frame_rate
-            gait_session.detailed_ai_analysis = ai_analysis.detailed_analysis
-            gait_session.summarized_ai_analysis = ai_analysis.summary
-            gait_session.recommendations = ai_analysis.recommendations
-            gait_session.possible_abnormalities = ai_analysis.possible_abnormalities
-            gait_session.recommended_exercises = ai_analysis.recommended_exercises
-            gait_session.long_term_risks = ai_analysis.long_term_risks
-            gait_session.analysis_status = AnalysisStatus.Completed
-
-            # Store gait metrics
-            for idx, row in df.iterrows():
-                gait_metric = GaitMetric(
-                    gait_session_id=session_id,
-                    measurement_index=idx,
-                    stance_time_left=(
-                        float(row["Stance Time Left"])
-                        if pd.notnull(row["Stance Time Left"])
-                        else None
-                    ),
-                    stance_time_right=(
-                        float(row["Stance Time Right"])
-                        if pd.notnull(row["Stance Time Right"])
-                        else None
-                    ),
-                    swing_time_left=(
-                        float(row["Swing Time Left"])
-                        if pd.notnull(row["Swing Time Left"])
-                        else None
-                    ),
-                    swing_time_right=(
-                        float(row["Swing Time Right"])
-                        if pd.notnull(row["Swing Time Right"])
-                        else None
-                    ),
-                    step_time_left=(
-                        float(row["Step Time Left"])
-                        if pd.notnull(row["Step Time Left"])
-                        else None
-                    ),
-                    step_time_right=(
-                        float(row["Step Time Right"])
-                        if pd.notnull(row["Step Time Right"])
-                        else None
-                    ),
-                    double_support_time_left=(
-                        float(row["Double Support Times Left"])
-                        if pd.notnull(row["Double Support Times Left"])
-                        else None
-                    ),
-                    double_support_time_right=(
-                        float(row["Double Support Times Right"])
-                        if pd.notnull(row["Double Support Times Right"])
-                        else None
-                    ),
-                )
-                session.add(gait_metric)
-            await session.flush()
-
-            # Store gait plot data
-            plot_df = pd.DataFrame(
-                {
-                    "frame_number": range(len(dist_left_filtered)),
-                    "dist_left_filtered": dist_left_filtered,
-                    "dist_right_filtered": dist_right_filtered,
-                    "is_peak_left": [
-                        i in peaks_left for i in range(len(dist_left_filtered))
-                    ],
-                    "is_peak_right": [
-                        i in peaks_right for i in range(len(dist_right_filtered))
-                    ],
-                    "is_minima_left": [
-                        i in minima_left for i in range(len(dist_left_filtered))
-                    ],
-                    "is_minima_right": [
-                        i in minima_right for i in range(len(dist_right_filtered))
-                    ],
-                }
+        progress = ProgressPublisher(session_id)
+        cancellation = CancellationToken(session_id)
+        await pipeline.run_upload_stage(checkpoints, progress, cancellation)
+        (
+            annotated_video_url,
+            df,
+            frame_rate,
+            dist_left_filtered,
+            dist_right_filtered,
+            peaks_left,
+            peaks_right,
+            minima_left,
+            minima_right,
+        ) = pipeline.load_results(checkpoints)
+
+        # Validate DataFrame
+        if df.empty:
+            raise ValueError("No gait metrics generated")
+
+        gait_metrics = _build_gait_metrics(session_id, df)
+        gait_plot_data = _build_gait_plot_data(
+            session_id,
+            dist_left_filtered,
+            dist_right_filtered,
+            peaks_left,
+            peaks_right,
+            minima_left,
+            minima_right,
+        )
+
+        # Replace the results of a previous analysis in the same transaction
+        await session.execute(
+            delete(GaitMetric).where(GaitMetric.gait_session_id == session_id)
+        )
+        await session.execute(
+            delete(GaitPlotData).where(GaitPlotData.gait_session_id == session_id)
+        )
+        session.add_all(gait_metrics)
+        session.add_all(gait_plot_data)
+
+        cancellation.raise_if_cancelled(force=True)
+        # The session may have been cancelled or deleted since the last
+        # check, the results are only stored if it was not
+        result = await session.execute(
+            update(GaitSession)
+            .where(
+                GaitSession.id == session_id,
+                GaitSession.analysis_status == AnalysisStatus.InProgress,
+                GaitSession.deleted_at.is_(None),
+            )
+            .values(
+                annotated_video_url=annotated_video_url,
+                frame_rate=frame_rate,
+                processing_adjustments=(
+                    pipeline.run_probe_stage(checkpoints).adjustments
+                    + pipeline.quality_warnings(checkpoints)
+                ),
+                analysis_error=None,
+                # The previous report does not describe the new metrics, the
+                # session waits for its own report instead of showing both
+                detailed_ai_analysis=None,
+                summarized_ai_analysis=None,
+                recommendations=[],
+                possible_abnormalities=[],
+                recommended_exercises=[],
+                long_term_risks=[],
+                analysis_status=AnalysisStatus.MetricsReady,
             )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            await session.rollback()
+            checkpoints.clear()
+            print(f"Discarding results of session {session_id}, it changed meanwhile")
+            return {"status": "discarded", "session_id": session_id}
+        await session.commit()
+        checkpoints.clear()
+        progress.status(AnalysisStatus.MetricsReady)
 
-            # Validate plot_df
-            if plot_df.empty:
-                raise ValueError("No gait plot data generated")
-            if (
-                plot_df["dist_left_filtered"].isna().any()
-                or plot_df["dist_right_filtered"].isna().any()
-            ):
-                raise ValueError("NaN values detected in gait plot distances")
-
-            # Use batch insertion for better performance with large datasets
-            plot_data_batch = []
-            for _, row in plot_df.iterrows():
-                plot_data = GaitPlotData(
-                    gait_session_id=session_id,
-                    frame_number=int(row["frame_number"]),
-                    dist_left_filtered=(
-                        float(row["dist_left_filtered"])
-                        if pd.notnull(row["dist_left_filtered"])
-                        else None
-                    ),
-                    dist_right_filtered=(
-                        float(row["dist_right_filtered"])
-                        if pd.notnull(row["dist_right_filtered"])
-                        else None
-                    ),
-                    is_peak_left=bool(row["is_peak_left"]),
-                    is_peak_right=bool(row["is_peak_right"]),
-                    is_minima_left=bool(row["is_minima_left"]),
-                    is_minima_right=bool(row["is_minima_right"]),
-                )
-                plot_data_batch.append(plot_data)
+        # Generate the AI report separately, metrics are already visible
+        await job_runner.enqueue(generate_gait_report_task.name, (session_id,))
 
-                # Add in batches of 1000 to avoid memory issues
-                if len(plot_data_batch) >= 1000:
-                    session.add_all(plot_data_batch)
-                    await session.flush()
-                    plot_data_batch = []
+        return {
+            "status": "metrics_ready",
+            "session_id": session_id,
+            "metrics_count": len(gait_metrics),
+            "plot_points_count": len(gait_plot_data),
+        }
 
-            # Add any remaining items
-            if plot_data_batch:
-                session.add_all(plot_data_batch)
-                await session.flush()
 
-            # Commit all changes
-            await session.commit()
-            await session.refresh(gait_session)
+def _optional_float(value) -> Optional[float]:
+    return float(value) if pd.notnull(value) else None
+
+
+def _build_gait_metrics(session_id: int, df: pd.DataFrame) -> List[GaitMetric]:
+    """Build the gait metric rows of a session from the metrics DataFrame."""
+    return [
+        GaitMetric(
+            gait_session_id=session_id,
+            measurement_index=idx,
+            stance_time_left=_optional_float(row["Stance Time Left"]),
+            stance_time_right=_optional_float(row["Stance Time Right"]),
+            swing_time_left=_optional_float(row["Swing Time Left"]),
+            swing_time_right=_optional_float(row["Swing Time Right"]),
+            step_time_left=_optional_float(row["Step Time Left"]),
+            step_time_right=_optional_float(row["Step Time Right"]),
+            double_support_time_left=_optional_float(row["Double Support Times Left"]),
+            double_support_time_right=_optional_float(
+                row["Double Support Times Right"]
+            ),
+        )
+        for idx, row in df.iterrows()
+    ]
+
+
+def _build_gait_plot_data(
+    session_id: int,
+    dist_left_filtered,
+    dist_right_filtered,
+    peaks_left,
+    peaks_right,
+    minima_left,
+    minima_right,
+) -> List[GaitPlotData]:
+    """Build one plot data row per frame, flagging the detected peaks and minima."""
+    if len(dist_left_filtered) == 0:
+        raise ValueError("No gait plot data generated")
+    if pd.isna(dist_left_filtered).any() or pd.isna(dist_right_filtered).any():
+        raise ValueError("NaN values detected in gait plot distances")
+
+    peaks_left, peaks_right = set(peaks_left), set(peaks_right)
+    minima_left, minima_right = set(minima_left), set(minima_right)
+    return [
+        GaitPlotData(
+            gait_session_id=session_id,
+            frame_number=frame,
+            dist_left_filtered=float(dist_left_filtered[frame]),
+            dist_right_filtered=float(dist_right_filtered[frame]),
+            is_peak_left=frame in peaks_left,
+            is_peak_right=frame in peaks_right,
+            is_minima_left=frame in minima_left,
+            is_minima_right=frame in minima_right,
+        )
+        for frame in range(len(dist_left_filtered))
+    ]
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=Config.REPORT_TASK_RETRY_BACKOFF_SECONDS,
+    retry_backoff_max=Config.REPORT_TASK_RETRY_BACKOFF_MAX_SECONDS,
+    retry_jitter=True,
+    max_retries=Config.REPORT_TASK_MAX_RETRIES,
+)
+def generate_gait_report_task(self, session_id: int):
+    """
+    Celery task to generate the AI report for an analyzed gait session.
+
+    Runs on the I/O queue and retries independently of the metrics
+    pipeline. The session stays in MetricsReady until the report is stored,
+    and a re-analysis only succeeds once it is.
+
+    Args:
+        session_id (int): The ID of the gait session to report on
+
+    Returns:
+        dict: Status information about the generated report
+    """
+    last_attempt = self.request.retries >= self.max_retries
+    return run_async(_generate_report(session_id, get_pipeline(), last_attempt))
+
 
-            return {
-                "status": "completed",
-                "session_id": session_id,
-                "metrics_count": len(df),
-                "plot_points_count": len(plot_df),
-            }
+async def _generate_report(
+    session_id: int, pipeline: GaitAnalysisPipeline, last_attempt: bool = True
+):
+    """
+    Generate and store the AI report for a gait session.
+
+    Args:
+        session_id (int): The ID of the gait session to report on
+        last_attempt (bool): Whether a failure is final, which fails the
+            re-analysis of the session
+
+    Returns:
+        dict: Status information about the generated report
+    """
+    async for session in get_session():
+        gait_session = await get_gait_session_by_id(session_id, session)
+        if (
+            gait_session.analysis_status != AnalysisStatus.MetricsReady
+            or gait_session.deleted_at is not None
+        ):
+            return {"status": "skipped", "session_id": session_id}
+
+        # Release the connection while waiting for the LLM
+        await session.commit()
+        warn_if_connections_held("report")
 
+        progress = ProgressPublisher(session_id, AnalysisStatus.MetricsReady)
+        progress.stage("report")
+        stream = ReportStreamPublisher(session_id)
+        await stream.start()
+        try:
+            ai_analysis = await pipeline.generate_report(gait_session, stream=stream)
         except Exception as e:
-            print(f"Error during gait analysis: {str(e)}")
-            await session.rollback()
-            # Update status to Error
-            try:
-                gait_session = await get_gait_session_by_id(session_id, session)
-                gait_session.analysis_status = AnalysisStatus.Error
-                await session.commit()
-                print(f"Gait analysis for session {session_id} failed: {str(e)}")
-            except Exception as db_error:
-                print(f"Failed to update session status: {str(db_error)}")
+            await stream.fail(str(e))
+            if last_attempt:
+                await finish_reanalysis(session_id, "failed")
+            raise
 
-            raise ValueError(f"Gait analysis failed: {str(e)}")
+        # The session may have been cancelled, re-analyzed or deleted while
+        # waiting for the LLM, the report is only stored if it was not
+        result = await session.execute(
+            update(GaitSession)
+            .where(
+                GaitSession.id == session_id,
+                GaitSession.analysis_status == AnalysisStatus.MetricsReady,
+                GaitSession.deleted_at.is_(None),
+            )
+            .values(
+                detailed_ai_analysis=ai_analysis.detailed_analysis,
+                summarized_ai_analysis=ai_analysis.summary,
+                recommendations=ai_analysis.recommendations,
+                possible_abnormalities=ai_analysis.possible_abnormalities,
+                recommended_exercises=ai_analysis.recommended_exercises,
+                long_term_risks=ai_analysis.long_term_risks,
+                analysis_status=AnalysisStatus.Completed,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        if result.rowcount == 0:
+            print(f"Discarding report of session {session_id}, it changed meanwhile")
+            return {"status": "discarded", "session_id": session_id}
+        await finish_reanalysis(session_id, "succeeded")
+        await stream.complete()
+        progress.status(AnalysisStatus.Completed)
 
+        return {"status": "completed", "session_id": session_id}
 
-async def _handle_analysis_error(session_id: int, error_message: str):
+
+@celery_app.task
+def prefetch_video_task(session_id: int, video_url: str):
+    """
+    Celery task downloading and probing the video of a session that was not
+    analyzed yet, then handing it over to `prefetch_pose_task`.
+
+    Args:
+        session_id (int): The ID of the gait session
+        video_url (str): The video the prefetch was started for
+
+    Returns:
+        dict: Status information about the prefetch
+    """
+    return _run_prefetch_step(session_id, video_url, _prefetch_video)
+
+
+async def _prefetch_video(
+    session_id: int, video_url: str, pipeline: GaitAnalysisPipeline
+):
+    token = PrefetchToken(session_id, video_url)
+    async for session in get_session():
+        gait_session = await get_gait_session_by_id(session_id, session)
+        await session.commit()
+    if not _prefetch_wanted(gait_session, video_url, token):
+        return {"status": "skipped", "session_id": session_id}
+
+    checkpoints = PipelineCheckpointStore(session_id, video_url)
+    try:
+        await pipeline.run_download_stage(video_url, checkpoints, None, token)
+        plan = pipeline.run_probe_stage(checkpoints)
+        # Lets the analysis be ranked by cost without probing the video again
+        async for session in get_session():
+            await _store_probe(session, session_id, plan.source, video_url)
+        # The analysis reports the rejection as soon as it starts
+        await run_cpu_bound(pipeline.run_quality_stage, checkpoints)
+    except AnalysisCancelled:
+        return {"status": "cancelled", "session_id": session_id}
+    except VideoRejected:
+        return {"status": "rejected", "session_id": session_id}
+
+    await job_runner.enqueue(
+        prefetch_pose_task.name, (session_id, video_url), None, PRIORITY_PREFETCH
+    )
+    return {"status": "downloaded", "session_id": session_id}
+
+
+@celery_app.task
+def prefetch_pose_task(session_id: int, video_url: str):
+    """
+    Celery task extracting the pose landmarks of a prefetched video on the
+    CPU queue. It yields the worker to any waiting analysis, keeping the
+    landmarks checkpointed so far.
+
+    Args:
+        session_id (int): The ID of the gait session
+        video_url (str): The video the prefetch was started for
+
+    Returns:
+        dict: Status information about the prefetch
+    """
+    return _run_prefetch_step(session_id, video_url, _prefetch_pose)
+
+
+async def _prefetch_pose(
+    session_id: int, video_url: str, pipeline: GaitAnalysisPipeline
+):
+    token = PrefetchToken(session_id, video_url)
+    if token.is_cancelled(force=True):
+        return {"status": "skipped", "session_id": session_id}
+
+    checkpoints = PipelineCheckpointStore(session_id, video_url)
+    if not checkpoints.is_complete("download"):
+        return {"status": "skipped", "session_id": session_id}
+    try:
+        await pipeline.run_pose_stage(checkpoints, None, token)
+    except AnalysisCancelled:
+        return {"status": "yielded", "session_id": session_id}
+    return {"status": "pose_ready", "session_id": session_id}
+
+
+def _run_prefetch_step(session_id: int, video_url: str, step):
+    """
+    Run one prefetch task, unless the session's analysis, which writes the
+    same checkpoints, is already running.
+    """
+    checkpoints_lock = checkpoint_lock(session_id)
+    if not checkpoints_lock.acquire():
+        return {"status": "skipped", "session_id": session_id}
+    try:
+        return run_async(step(session_id, video_url, get_pipeline()))
+    finally:
+        checkpoints_lock.release()
+
+
+async def _store_probe(
+    session: AsyncSession,
+    session_id: int,
+    probe: VideoProbe,
+    video_url: Optional[str] = None,
+) -> None:
+    """Save the video properties of a session, if its video is still `video_url`."""
+    query = update(GaitSession).where(GaitSession.id == session_id)
+    if video_url is not None:
+        query = query.where(GaitSession.video_url == video_url)
+    await session.execute(
+        query.values(
+            video_width=probe.width,
+            video_height=probe.height,
+            video_frame_rate=probe.frame_rate,
+            video_frame_count=probe.frame_count or None,
+            video_duration_seconds=probe.duration_seconds or None,
+        )
+    )
+    await session.commit()
+
+
+def _prefetch_wanted(gait_session, video_url: str, token: PrefetchToken) -> bool:
+    """Whether the session still waits, unanalyzed, with the same video."""
+    return (
+        gait_session.deleted_at is None
+        and gait_session.analysis_status == AnalysisStatus.Initial
+        and gait_session.video_url == video_url
+        and not token.is_cancelled(force=True)
+    )
+
+
+@celery_app.task(priority=PRIORITY_BATCH)
+def generate_gait_reports_batch_task(
+    session_ids: Optional[List[int]] = None,
+    include_completed: bool = False,
+    concurrency: int = Config.REPORT_BATCH_CONCURRENCY,
+    use_cache: bool = True,
+):
+    """
+    Celery task to generate AI reports for many gait sessions at once.
+
+    Args:
+        session_ids (list[int], optional): Sessions to report on, all pending ones if omitted
+        include_completed (bool): Whether to regenerate reports that already exist
+        concurrency (int): Maximum number of concurrent LLM requests
+        use_cache (bool): Whether cached LLM answers may be reused
+
+    Returns:
+        dict: Counts, throughput and latency distribution of the batch
+    """
+    return run_async(
+        generate_reports_batch(
+            get_pipeline(),
+            session_ids=session_ids,
+            include_completed=include_completed,
+            concurrency=concurrency,
+            use_cache=use_cache,
+        )
+    )
+
+
+@celery_app.task(bind=True, max_retries=Config.PURGE_MAX_RETRIES)
+def purge_deleted_task(self):
+    """
+    Celery task removing deleted sessions and patients, with their child rows
+    and stored files, in the background of the delete requests.
+
+    Retried later while some files could not be deleted, or when an analysis
+    still writing results made a delete fail.
+
+    Returns:
+        dict: Number of rows removed, and of rows left for a later purge
+    """
+    try:
+        summary = run_async(_purge_deleted())
+    except Exception as e:
+        print(f"Failed to purge deleted sessions: {str(e)}")
+        raise self.retry(exc=e, countdown=Config.PURGE_RETRY_SECONDS)
+    if summary["artifact_failures"]:
+        raise self.retry(countdown=Config.PURGE_RETRY_SECONDS)
+    return summary
+
+
+async def _purge_deleted():
+    async for session in get_session():
+        return await purge_deleted(session)
+
+
+async def _handle_analysis_cancelled(session_id: int):
+    """
+    Clean up after a cancelled analysis.
+
+    Args:
+        session_id (int): The ID of the gait session
+    """
+    clear_session_checkpoints(session_id)
+    await remove_waiting_job(session_id)
+    async for session in get_session():
+        try:
+            gait_session = await get_gait_session_by_id(session_id, session)
+            # A cancelled re-analysis keeps the results it would have replaced
+            gait_session.analysis_status = (
+                await finish_reanalysis(session_id, "cancelled")
+                or AnalysisStatus.Cancelled
+            )
+            await session.commit()
+            await publish_status(session_id, gait_session.analysis_status)
+        except Exception as e:
+            print(f"Failed to update session status to Cancelled: {str(e)}")
+
+
+async def _handle_analysis_error(
+    session_id: int, error_message: str, rejection: Optional[str] = None
+):
     """
     Handle errors in the analysis by updating the session status.
 
     Args:
         session_id (int): The ID of the gait session
         error_message (str): The error message
+        rejection (Optional[str]): Why the video was rejected, shown to the
+            user with the error
     """
+    await remove_waiting_job(session_id)
     async for session in get_session():
         try:
             gait_session = await get_gait_session_by_id(session_id, session)
-            gait_session.analysis_status = AnalysisStatus.Error
+            # A failed re-analysis keeps the results it would have replaced
+            gait_session.analysis_status = (
+                await finish_reanalysis(session_id, "failed") or AnalysisStatus.Error
+            )
+            if gait_session.analysis_status == AnalysisStatus.Error:
+                gait_session.analysis_error = rejection
             await session.commit()
+            await publish_status(session_id, gait_session.analysis_status)
             print(f"Session {session_id} status set to Error due to: {error_message}")
         except Exception as e:
             print(f"Failed to update session status to Error: {str(e)}")
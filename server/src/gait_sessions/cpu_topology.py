@@ -0,0 +1,215 @@
+import math
+import os
+import time
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+from src.config import Config
+
+# Read by OpenMP, the BLAS libraries behind numpy and scipy, and numexpr
+# when they are loaded, so they must be set before numpy is imported
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def limit_library_threads(threads: Optional[int] = None) -> None:
+    """
+    Cap the thread pools of OpenMP, BLAS and numexpr to `WORKER_CPU_THREADS`
+    through the environment. Variables set explicitly are kept.
+
+    Only effective before numpy is imported, and inherited by forked worker
+    children, so the worker entry module calls it before importing the tasks.
+    """
+    threads = threads or Config.WORKER_CPU_THREADS
+    if not threads:
+        return
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(threads))
+
+
+def child_cores(child_index: int, threads: int) -> List[int]:
+    """The cores of a worker child: `threads` consecutive ones, round robin."""
+    available = sorted(os.sched_getaffinity(0))
+    count = max(1, min(threads, len(available)))
+    start = (child_index * count) % len(available)
+    return [available[(start + i) % len(available)] for i in range(count)]
+
+
+def apply_worker_topology(
+    child_index: Optional[int],
+    threads: Optional[int] = None,
+    pin: Optional[bool] = None,
+) -> Dict:
+    """
+    Set up the CPU layout of a worker child: OpenCV uses `WORKER_CPU_THREADS`
+    threads and, with `WORKER_CPU_AFFINITY`, the child is pinned to its own
+    cores.
+
+    MediaPipe does not expose the size of its TFLite thread pool, pinning is
+    what keeps its threads off the cores of the other children.
+
+    Returns:
+        dict: The thread count and cores applied, empty when unconfigured
+    """
+    threads = threads or Config.WORKER_CPU_THREADS
+    pin = Config.WORKER_CPU_AFFINITY if pin is None else pin
+    layout = {}
+    if threads:
+        import cv2
+
+        cv2.setNumThreads(threads)
+        layout["threads"] = threads
+    if pin and child_index is not None and hasattr(os, "sched_setaffinity"):
+        cores = child_cores(child_index, threads or 1)
+        os.sched_setaffinity(0, cores)
+        layout["cores"] = cores
+    return layout
+
+
+def _init_benchmark_child(counter, threads: Optional[int], pin: bool) -> None:
+    with counter.get_lock():
+        child_index = counter.value
+        counter.value += 1
+    apply_worker_topology(child_index, threads, pin)
+
+
+def _benchmark_workload(frames: int, video_path: Optional[str]) -> float:
+    """
+    Process `frames` frames the way the CPU stages do and return the time it
+    took: pose inference on a video when one is given, a stand-in mixing
+    OpenCV filters and BLAS otherwise.
+    """
+    import cv2
+    import numpy as np
+
+    started_at = time.perf_counter()
+    if video_path:
+        import mediapipe as mp
+
+        from src.gait_sessions.gait_analysis_pipeline import GAIT_SESSIONS_MODEL_PATH
+
+        options = mp.tasks.vision.PoseLandmarkerOptions(
+            base_options=mp.tasks.BaseOptions(
+                model_asset_path=GAIT_SESSIONS_MODEL_PATH
+            ),
+            running_mode=mp.tasks.vision.RunningMode.IMAGE,
+        )
+        landmarker = mp.tasks.vision.PoseLandmarker.create_from_options(options)
+        cap = cv2.VideoCapture(video_path)
+        try:
+            done = 0
+            while done < frames:
+                ret, frame = cap.read()
+                if not ret:
+                    # Loop over short videos
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    ret, frame = cap.read()
+                    if not ret:
+                        raise RuntimeError(f"Failed to read video: {video_path}")
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                landmarker.detect(mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb))
+                done += 1
+        finally:
+            cap.release()
+            landmarker.close()
+    else:
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 255, (720, 1280, 3), dtype=np.uint8)
+        matrix = rng.random((384, 384))
+        for _ in range(frames):
+            cv2.GaussianBlur(frame, (15, 15), 0)
+            cv2.resize(frame, (256, 256), interpolation=cv2.INTER_AREA)
+            matrix @ matrix
+    return time.perf_counter() - started_at
+
+
+def _measure_layout(
+    children: int,
+    threads: Optional[int],
+    pin: bool,
+    frames: int,
+    video_path: Optional[str],
+) -> Dict:
+    """Run the workload split over `children` processes and time it."""
+    context = get_context("spawn")
+    # Spawned children read the thread variables before they import numpy
+    saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    for name in THREAD_ENV_VARS:
+        if threads:
+            os.environ[name] = str(threads)
+        else:
+            os.environ.pop(name, None)
+    try:
+        counter = context.Value("i", 0)
+        per_child = math.ceil(frames / children)
+        with context.Pool(
+            children,
+            initializer=_init_benchmark_child,
+            initargs=(counter, threads, pin),
+        ) as pool:
+            # Load the libraries before timing
+            pool.starmap(_benchmark_workload, [(1, video_path)] * children)
+            started_at = time.perf_counter()
+            pool.starmap(_benchmark_workload, [(per_child, video_path)] * children)
+            elapsed = time.perf_counter() - started_at
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    return {
+        "children": children,
+        "threads_per_child": threads or "library default",
+        "pinned": pin,
+        "elapsed_seconds": round(elapsed, 3),
+        "frames_per_second": round(per_child * children / elapsed, 2),
+    }
+
+
+def run_topology_benchmark(
+    cores: Optional[int] = None,
+    frames: int = 400,
+    video_path: Optional[str] = None,
+) -> Dict:
+    """
+    Sweep worker children against threads per child on `cores` cores and
+    report the layout with the highest throughput.
+
+    Every layout uses all the cores (children x threads = cores), pinned to
+    disjoint cores, next to the default of one child per core with library
+    thread pools left unbounded. Pass a short clip as `video_path` to measure
+    real pose inference rather than the stand-in workload.
+
+    Returns:
+        dict: Throughput per layout and the settings of the best one
+    """
+    cores = cores or len(os.sched_getaffinity(0))
+    layouts = [(cores, None, False)]
+    for children in range(1, cores + 1):
+        if cores % children == 0:
+            layouts.append((children, cores // children, True))
+
+    results = [
+        _measure_layout(children, threads, pin, frames, video_path)
+        for children, threads, pin in layouts
+    ]
+    best = max(results, key=lambda result: result["frames_per_second"])
+    return {
+        "cores": cores,
+        "frames": frames,
+        "workload": "pose" if video_path else "stand-in",
+        "layouts": results,
+        "best": {
+            "concurrency": best["children"],
+            "WORKER_CPU_THREADS": best["threads_per_child"],
+            "WORKER_CPU_AFFINITY": best["pinned"],
+            "frames_per_second": best["frames_per_second"],
+        },
+    }
@@ -1,7 +1,10 @@
+import asyncio
 import json
 import os
+import random
 import uuid
 import math
+import time
 from typing import Dict, List, Optional, Tuple
 
 import cv2
@@ -18,9 +21,37 @@ from mediapipe.framework.formats import landmark_pb2
 
 from pydantic import BaseModel
 from langchain_core.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-
-from src.db.model.gait_session import GaitSession
+from langchain_core.language_models.chat_models import BaseChatModel
+
+from src.db.model.gait_session import GaitSession, GaitMetric
+from src.gait_sessions.cancellation import AnalysisCancelled, CancellationToken
+from src.gait_sessions.llm_cache import LLMResponseCache
+from src.gait_sessions.llm_limiter import LLMRateLimiter
+from src.gait_sessions.llm_providers import (
+    LLM_TEMPERATURE,
+    create_llm,
+    get_llm_model_name,
+    record_fixture,
+)
+from src.gait_sessions.pipeline_checkpoints import (
+    ANNOTATED_VIDEO_ARTIFACT,
+    VIDEO_ARTIFACT,
+    PipelineCheckpointStore,
+)
+from src.gait_sessions.progress import ProgressPublisher
+from src.gait_sessions.report_stream import ReportStreamPublisher
+from src.gait_sessions.throughput import record_analysis_frames, record_stage
+from src.gait_sessions.video_budget import (
+    ProcessingPlan,
+    plan_processing,
+    probe_video,
+)
+from src.gait_sessions.video_quality import (
+    QualityReport,
+    VideoRejected,
+    assess_video_quality,
+)
+from src.gait_sessions.worker_resources import run_cpu_bound
 from src.config import Config
 
 GAIT_SESSIONS_RUNTIME_DIR = os.path.join("src", "gait_sessions", "runtime")
@@ -28,6 +59,7 @@ GAIT_SESSIONS_ASSETS_DIR = os.path.join("src", "gait_sessions", "assets")
 GAIT_SESSIONS_MODEL_PATH = os.path.join(
     GAIT_SESSIONS_ASSETS_DIR, "model", "pose_landmarker_heavy.task"
 )
+POSE_LANDMARK_COUNT = 33
 
 
 class GaitAnalysisOutput(BaseModel):
@@ -39,7 +71,6 @@ class GaitAnalysisOutput(BaseModel):
     long_term_risks: List[str]  # Potential long-term risks or complications
 
 
-GOOGLE_API_KEY = Config.GOOGLE_API_KEY
 
 
 class GaitAnalysisPipeline:
@@ -49,13 +80,17 @@ class GaitAnalysisPipeline:
         self.model_path = model_path
         # selfandmarker = self._initialize_landmarker()
         self.llm = self.initialize_llm()
+        self.llm_cache = LLMResponseCache()
+        self.llm_limiter = LLMRateLimiter()
 
-    def _initialize_landmarker(self):
+    def _initialize_landmarker(
+        self, running_mode=mp.tasks.vision.RunningMode.VIDEO
+    ):
         """Initialize MediaPipe Pose Landmarker with thread-safe configuration."""
         try:
             options = mp.tasks.vision.PoseLandmarkerOptions(
                 base_options=mp.tasks.BaseOptions(model_asset_path=self.model_path),
-                running_mode=mp.tasks.vision.RunningMode.VIDEO,
+                running_mode=running_mode,
                 min_pose_detection_confidence=0.5,
                 # TODO: Remove this
                 # num_poses=1,
@@ -66,66 +101,141 @@ class GaitAnalysisPipeline:
             print(f"Failed to initialize Pose Landmarker: {str(e)}")
             raise RuntimeError(f"Pose Landmarker initialization failed: {str(e)}")
 
-    def initialize_llm(self) -> ChatGoogleGenerativeAI:
-        """Initialize and return the Google Gemini LLM."""
-        return ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash", google_api_key=GOOGLE_API_KEY, temperature=0.7
-        )
+    def initialize_llm(self) -> BaseChatModel:
+        """
+        Initialize and return the LLM for the configured provider.
+
+        The client is created once per pipeline and shared by every analysis.
+        """
+        return create_llm(Config.LLM_PROVIDER)
 
-    def draw_landmarks_on_image(self, rgb_image, detection_result):
-        """Draw pose landmarks on the image."""
-        pose_landmarks_list = detection_result.pose_landmarks
+    def draw_landmarks_on_image(self, rgb_image, pose_landmarks: np.ndarray):
+        """Draw pose landmarks (an array of x, y, z rows) on the image."""
         annotated_image = np.copy(rgb_image)
-        for idx in range(len(pose_landmarks_list)):
-            pose_landmarks = pose_landmarks_list[idx]
-            pose_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
-            pose_landmarks_proto.landmark.extend(
-                [
-                    landmark_pb2.NormalizedLandmark(
-                        x=landmark.x, y=landmark.y, z=landmark.z
-                    )
-                    for landmark in pose_landmarks
-                ]
-            )
-            solutions.drawing_utils.draw_landmarks(
-                annotated_image,
-                pose_landmarks_proto,
-                solutions.pose.POSE_CONNECTIONS,
-                solutions.drawing_styles.get_default_pose_landmarks_style(),
-            )
+        pose_landmarks_proto = landmark_pb2.NormalizedLandmarkList()
+        pose_landmarks_proto.landmark.extend(
+            [
+                landmark_pb2.NormalizedLandmark(x=x, y=y, z=z)
+                for x, y, z in pose_landmarks.tolist()
+            ]
+        )
+        solutions.drawing_utils.draw_landmarks(
+            annotated_image,
+            pose_landmarks_proto,
+            solutions.pose.POSE_CONNECTIONS,
+            solutions.drawing_styles.get_default_pose_landmarks_style(),
+        )
         return annotated_image
 
-    async def save_annotated_video(
-        self, frames: List[np.ndarray], frame_rate: float
+    def render_annotated_video(
+        self,
+        video_path: str,
+        landmarks: np.ndarray,
+        plan: ProcessingPlan,
+        output_video_path: str,
+        progress: Optional[ProgressPublisher] = None,
+        cancellation: Optional[CancellationToken] = None,
     ) -> str:
-        """Save annotated video to a temporary file with optimized H.264 encoding."""
-        output_dir = os.path.join(GAIT_SESSIONS_RUNTIME_DIR, "output_videos")
-        os.makedirs(output_dir, exist_ok=True)
-
-        output_video_filename = uuid.uuid4().hex
-        output_video_path = os.path.join(output_dir, output_video_filename + ".mp4")
-
-        if len(frames[0].shape) == 2:
-            height, width = frames[0].shape
-            frames = [cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) for frame in frames]
-        else:
-            height, width, _ = frames[0].shape
+        """
+        Re-read the video and write the analyzed frames with the stored pose
+        landmarks drawn on them, one frame at a time, at the resolution and
+        frame rate of the processing plan.
+        """
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Failed to open video: {video_path}")
 
+        # Write under a temporary name so a crash never leaves a partial video
+        base, ext = os.path.splitext(output_video_path)
+        partial_video_path = f"{base}.partial{ext}"
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         out = cv2.VideoWriter(
-            output_video_path, fourcc, frame_rate, (width, height), isColor=True
+            partial_video_path,
+            fourcc,
+            plan.frame_rate,
+            (plan.width, plan.height),
+            isColor=True,
         )
+        source_frame = 0
+        frame_number = 0
+        started_at = time.monotonic()
+
+        try:
+            while cap.isOpened() and frame_number < len(landmarks):
+                if cancellation is not None:
+                    cancellation.raise_if_cancelled()
+                if not plan.samples(source_frame):
+                    if not cap.grab():
+                        break
+                    source_frame += 1
+                    continue
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                source_frame += 1
+                if len(frame.shape) == 2:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+                frame = plan.resize(frame)
+                if not np.isnan(landmarks[frame_number, 0, 0]):
+                    frame = self.draw_landmarks_on_image(frame, landmarks[frame_number])
+                out.write(frame)
+                frame_number += 1
+                if progress is not None:
+                    progress.frames(frame_number, len(landmarks))
+        finally:
+            cap.release()
+            out.release()
+            if frame_number == 0 or (
+                cancellation is not None and cancellation.cancelled
+            ):
+                if os.path.exists(partial_video_path):
+                    os.remove(partial_video_path)
 
-        for frame in frames:
-            out.write(frame)
-        out.release()
+        if frame_number == 0:
+            raise ValueError("No frames rendered from video")
 
+        record_stage("render", time.monotonic() - started_at, frame_number)
+        os.replace(partial_video_path, output_video_path)
         return output_video_path
 
-    async def process_video(
-        self, video_path: str
-    ) -> Tuple[List[np.ndarray], List[float], List[float], float]:
-        """Process video to extract landmarks and distances with robust resource management."""
+    async def extract_pose_landmarks(
+        self,
+        video_path: str,
+        plan: ProcessingPlan,
+        checkpoints: PipelineCheckpointStore,
+        progress: Optional[ProgressPublisher] = None,
+        cancellation: Optional[CancellationToken] = None,
+    ) -> Tuple[np.ndarray, float]:
+        """
+        Run pose estimation on the frames of the video selected by the
+        processing plan, resized to its resolution, on the inference thread.
+
+        Returns an array of shape (frames, 33, 3) holding the landmarks of the
+        first detected pose per analyzed frame (NaN when no pose was found)
+        and their frame rate. Landmarks are checkpointed every
+        `PIPELINE_POSE_CHECKPOINT_FRAMES` frames, and frames covered by earlier
+        checkpoints are skipped when an interrupted run is resumed.
+        """
+        return await run_cpu_bound(
+            self._extract_pose_landmarks,
+            video_path,
+            plan,
+            checkpoints,
+            progress,
+            cancellation,
+        )
+
+    def _extract_pose_landmarks(
+        self,
+        video_path: str,
+        plan: ProcessingPlan,
+        checkpoints: PipelineCheckpointStore,
+        progress: Optional[ProgressPublisher] = None,
+        cancellation: Optional[CancellationToken] = None,
+    ) -> Tuple[np.ndarray, float]:
+        chunks = checkpoints.load_pose_chunks()
+        resume_from = sum(len(chunk) for chunk in chunks)
+
         landmarker = self._initialize_landmarker()
 
         cap = cv2.VideoCapture(video_path)
@@ -133,63 +243,94 @@ class GaitAnalysisPipeline:
             landmarker.close()
             raise RuntimeError(f"Failed to open video: {video_path}")
 
-        frame_rate = cap.get(cv2.CAP_PROP_FPS)
-        if frame_rate <= 0:
-            cap.release()
-            landmarker.close()
-            raise ValueError("Invalid frame rate detected")
+        total_frames = plan.frame_count
+        if resume_from:
+            print(f"Resuming pose extraction at frame {resume_from}")
 
+        source_frame = 0
         frame_number = 0
-        annotated_frames = []
-        dist_left, dist_right = [], []
+        chunk_start = resume_from
+        pending = []
+        started_at = time.monotonic()
 
         try:
+            # Decode without running the model up to the checkpointed frame
+            while frame_number < resume_from and cap.grab():
+                if plan.samples(source_frame):
+                    frame_number += 1
+                source_frame += 1
+
             while cap.isOpened():
+                if cancellation is not None:
+                    cancellation.raise_if_cancelled()
+                if plan.max_source_frames and source_frame >= plan.max_source_frames:
+                    break
+                if not plan.samples(source_frame):
+                    if not cap.grab():
+                        break
+                    source_frame += 1
+                    continue
                 ret, frame = cap.read()
                 if not ret:
                     break
-                numpy_frame_from_opencv = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                numpy_frame_from_opencv = cv2.cvtColor(
+                    plan.resize(frame), cv2.COLOR_BGR2RGB
+                )
                 mp_image = mp.Image(
                     image_format=mp.ImageFormat.SRGB, data=numpy_frame_from_opencv
                 )
-                frame_timestamp_ms = int(frame_number * (1000 / frame_rate))
+                frame_timestamp_ms = int(source_frame * (1000 / plan.source_frame_rate))
                 pose_landmarker_result = landmarker.detect_for_video(
                     mp_image, frame_timestamp_ms
                 )
-                annotated_image = self.draw_landmarks_on_image(
-                    frame, pose_landmarker_result
-                )
-                annotated_frames.append(annotated_image)
 
                 if pose_landmarker_result.pose_landmarks:
-                    landmarks = pose_landmarker_result.pose_landmarks[0]
-                    keypoint_data = [
-                        (landmark.x, landmark.y, landmark.z) for landmark in landmarks
-                    ]
-                    left_hip = np.array(keypoint_data[23])
-                    right_hip = np.array(keypoint_data[24])
-                    left_foot_index = np.array(keypoint_data[31])
-                    right_foot_index = np.array(keypoint_data[32])
-                    dist_left.append(
-                        np.linalg.norm(np.subtract(left_hip, left_foot_index))
-                    )
-                    dist_right.append(
-                        np.linalg.norm(np.subtract(right_hip, right_foot_index))
+                    pending.append(
+                        [
+                            (landmark.x, landmark.y, landmark.z)
+                            for landmark in pose_landmarker_result.pose_landmarks[0]
+                        ]
                     )
+                else:
+                    pending.append(np.full((POSE_LANDMARK_COUNT, 3), np.nan))
 
+                source_frame += 1
                 frame_number += 1
+                if progress is not None:
+                    progress.frames(frame_number, total_frames, resume_from)
+                if len(pending) >= Config.PIPELINE_POSE_CHECKPOINT_FRAMES:
+                    chunk = np.array(pending, dtype=np.float64)
+                    checkpoints.save_pose_chunk(chunk_start, chunk)
+                    chunks.append(chunk)
+                    chunk_start = frame_number
+                    pending = []
+        except AnalysisCancelled:
+            raise
         except Exception as e:
-            print(f"Error processing video frame {frame_number}: {str(e)}")
+            print(f"Error processing video frame {source_frame}: {str(e)}")
             raise RuntimeError(f"Video processing failed: {str(e)}")
         finally:
             cap.release()
             landmarker.close()
             cv2.destroyAllWindows()
 
-        if frame_number == 0:
+        if pending:
+            chunks.append(np.array(pending, dtype=np.float64))
+
+        if frame_number == 0 or not chunks:
             raise ValueError("No frames processed from video")
 
-        return annotated_frames, dist_left, dist_right, math.floor(frame_rate)
+        record_stage("pose", time.monotonic() - started_at, frame_number - resume_from)
+        return np.concatenate(chunks), math.floor(plan.frame_rate)
+
+    def distances_from_landmarks(
+        self, landmarks: np.ndarray
+    ) -> Tuple[List[float], List[float]]:
+        """Hip to foot-index distances for every frame with a detected pose."""
+        detected = landmarks[~np.isnan(landmarks[:, 0, 0])]
+        dist_left = np.linalg.norm(detected[:, 23] - detected[:, 31], axis=1)
+        dist_right = np.linalg.norm(detected[:, 24] - detected[:, 32], axis=1)
+        return dist_left.tolist(), dist_right.tolist()
 
     def gap_fill(
         self, dist_left: List[float], dist_right: List[float]
@@ -404,7 +545,203 @@ class GaitAnalysisPipeline:
         )
         return result
 
-    async def run_analysis(self, gait_session: GaitSession, video_url: str) -> Tuple[
+    def run_probe_stage(self, checkpoints: PipelineCheckpointStore) -> ProcessingPlan:
+        """
+        Probe the downloaded video and plan how it is decoded so the analysis
+        stays within its resource budgets.
+        """
+        if checkpoints.is_complete("probe"):
+            return ProcessingPlan(**checkpoints.load_json("probe"))
+        plan = plan_processing(probe_video(checkpoints.path(VIDEO_ARTIFACT)))
+        record_analysis_frames(plan.frame_count)
+        if plan.adjustments:
+            print(f"Video over budget: {'; '.join(plan.adjustments)}")
+        checkpoints.save_json("probe", plan.model_dump())
+        return plan
+
+    def run_quality_stage(
+        self, checkpoints: PipelineCheckpointStore
+    ) -> Optional[QualityReport]:
+        """
+        Check on a few sampled frames that the pose model finds the patient
+        with hips and feet in view, before the full pose extraction runs.
+
+        Raises:
+            VideoRejected: With the reason when the video cannot yield gait
+                metrics. The report is checkpointed, so a retry fails as fast.
+        """
+        if not Config.QUALITY_GATE_ENABLED:
+            return None
+        if checkpoints.is_complete("quality"):
+            report = QualityReport(**checkpoints.load_json("quality"))
+        else:
+            started_at = time.monotonic()
+            landmarker = self._initialize_landmarker(
+                mp.tasks.vision.RunningMode.IMAGE
+            )
+            try:
+                report = assess_video_quality(
+                    checkpoints.path(VIDEO_ARTIFACT),
+                    self.run_probe_stage(checkpoints),
+                    landmarker,
+                )
+            finally:
+                landmarker.close()
+            record_stage("quality", time.monotonic() - started_at)
+            checkpoints.save_json("quality", report.model_dump())
+        if report.rejection:
+            raise VideoRejected(report.rejection)
+        if report.warnings:
+            print(f"Video quality warnings: {'; '.join(report.warnings)}")
+        return report
+
+    def quality_warnings(self, checkpoints: PipelineCheckpointStore) -> List[str]:
+        """Warnings of the quality check, empty when it did not run."""
+        if not checkpoints.is_complete("quality"):
+            return []
+        return QualityReport(**checkpoints.load_json("quality")).warnings
+
+    async def run_download_stage(
+        self,
+        video_url: str,
+        checkpoints: PipelineCheckpointStore,
+        progress: Optional[ProgressPublisher] = None,
+        cancellation: Optional[CancellationToken] = None,
+    ) -> str:
+        """Download the session video into the checkpoint directory."""
+        video_path = checkpoints.path(VIDEO_ARTIFACT)
+        if not checkpoints.is_complete("download"):
+            if progress is not None:
+                progress.stage("download")
+            started_at = time.monotonic()
+            download = self.download_video(video_url)
+            if cancellation is not None:
+                download = cancellation.run(download)
+            os.replace(await download, video_path)
+            record_stage("download", time.monotonic() - started_at)
+            checkpoints.mark_complete("download")
+        return video_path
+
+    async def run_compute_stages(
+        self,
+        checkpoints: PipelineCheckpointStore,
+        progress: Optional[ProgressPublisher] = None,
+        cancellation: Optional[CancellationToken] = None,
+    ) -> None:
+        """
+        Run the CPU-bound pose, signal and render stages. With a cancellation
+        token, the stages stop within `CANCEL_CHECK_INTERVAL_SECONDS` of the
+        analysis being cancelled.
+
+        Each stage runs on the inference thread, so the event loop stays free
+        for the I/O of other analyses of the worker process meanwhile.
+        """
+        video_path = checkpoints.path(VIDEO_ARTIFACT)
+        plan = self.run_probe_stage(checkpoints)
+        await run_cpu_bound(self.run_quality_stage, checkpoints)
+
+        # Pose estimation
+        landmarks, frame_rate = await self.run_pose_stage(
+            checkpoints, progress, cancellation
+        )
+
+        # Signal processing and gait event detection
+        if not checkpoints.is_complete("signal"):
+            if cancellation is not None:
+                cancellation.raise_if_cancelled(force=True)
+            if progress is not None:
+                progress.stage("signal")
+            await run_cpu_bound(
+                self.run_signal_stage, landmarks, frame_rate, checkpoints
+            )
+
+        # Render annotated video
+        if not checkpoints.is_complete("render"):
+            if progress is not None:
+                progress.stage("render")
+            await run_cpu_bound(
+                self.render_annotated_video,
+                video_path,
+                landmarks,
+                plan,
+                checkpoints.path(ANNOTATED_VIDEO_ARTIFACT),
+                progress,
+                cancellation,
+            )
+            checkpoints.mark_complete("render")
+
+    async def run_pose_stage(
+        self,
+        checkpoints: PipelineCheckpointStore,
+        progress: Optional[ProgressPublisher] = None,
+        cancellation: Optional[CancellationToken] = None,
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Extract the pose landmarks of the downloaded video, or load them when
+        an earlier attempt or a prefetch already did.
+        """
+        if checkpoints.is_complete("pose"):
+            pose = checkpoints.load_arrays("pose")
+            return pose["landmarks"], int(pose["frame_rate"])
+        if progress is not None:
+            progress.stage("pose")
+        landmarks, frame_rate = await self.extract_pose_landmarks(
+            checkpoints.path(VIDEO_ARTIFACT),
+            self.run_probe_stage(checkpoints),
+            checkpoints,
+            progress,
+            cancellation,
+        )
+        checkpoints.save_arrays("pose", landmarks=landmarks, frame_rate=frame_rate)
+        checkpoints.clear_pose_chunks()
+        return landmarks, frame_rate
+
+    def run_signal_stage(
+        self,
+        landmarks: np.ndarray,
+        frame_rate: int,
+        checkpoints: PipelineCheckpointStore,
+    ) -> None:
+        """Filter the ankle distances and detect the gait events."""
+        dist_left, dist_right = self.distances_from_landmarks(landmarks)
+        dist_left_filled, dist_right_filled = self.gap_fill(dist_left, dist_right)
+        dist_left_filtered, dist_right_filtered = self.butterworth_low_pass_filter(
+            dist_left_filled, dist_right_filled, frame_rate
+        )
+        peaks_left, peaks_right, minima_left, minima_right = self.detect_gait_events(
+            dist_left_filtered, dist_right_filtered, frame_rate
+        )
+        checkpoints.save_arrays(
+            "signal",
+            dist_left_filtered=dist_left_filtered,
+            dist_right_filtered=dist_right_filtered,
+            peaks_left=peaks_left,
+            peaks_right=peaks_right,
+            minima_left=minima_left,
+            minima_right=minima_right,
+        )
+
+    async def run_upload_stage(
+        self,
+        checkpoints: PipelineCheckpointStore,
+        progress: Optional[ProgressPublisher] = None,
+        cancellation: Optional[CancellationToken] = None,
+    ) -> str:
+        """Upload the annotated video and return its URL."""
+        if checkpoints.is_complete("upload"):
+            return checkpoints.load_json("upload")["annotated_video_url"]
+        if progress is not None:
+            progress.stage("upload")
+        started_at = time.monotonic()
+        upload = self.upload_to_cloudinary(checkpoints.path(ANNOTATED_VIDEO_ARTIFACT))
+        if cancellation is not None:
+            upload = cancellation.run(upload)
+        annotated_video_url = await upload
+        record_stage("upload", time.monotonic() - started_at)
+        checkpoints.save_json("upload", {"annotated_video_url": annotated_video_url})
+        return annotated_video_url
+
+    def load_results(self, checkpoints: PipelineCheckpointStore) -> Tuple[
         str,
         pd.DataFrame,
         float,
@@ -414,106 +751,119 @@ class GaitAnalysisPipeline:
         np.ndarray,
         np.ndarray,
         np.ndarray,
-        GaitAnalysisOutput,
     ]:
-        """Run the full gait analysis pipeline."""
-
-        # Download video from Cloudinary
-        local_video_path = await self.download_video(video_url)
+        """Build the analysis results from the checkpoints of completed stages."""
+        frame_rate = int(checkpoints.load_arrays("pose")["frame_rate"])
+        signal = checkpoints.load_arrays("signal")
 
-        try:
-            # Process video
-            annotated_frames, dist_left, dist_right, frame_rate = (
-                await self.process_video(local_video_path)
-            )
-
-            # Signal processing
-            dist_left_filled, dist_right_filled = self.gap_fill(dist_left, dist_right)
-            dist_left_filtered, dist_right_filtered = self.butterworth_low_pass_filter(
-                dist_left_filled, dist_right_filled, frame_rate
-            )
+        # Calculate gait parameters
+        (
+            stance_times_left,
+            stance_times_right,
+            swing_time_left,
+            swing_time_right,
+            step_time_left,
+            step_time_right,
+            double_support_times_left,
+            double_support_times_right,
+        ) = self.calculate_gait_parameters(
+            signal["peaks_left"],
+            signal["peaks_right"],
+            signal["minima_left"],
+            signal["minima_right"],
+            frame_rate,
+        )
 
-            # Detect gait events
-            peaks_left, peaks_right, minima_left, minima_right = (
-                self.detect_gait_events(
-                    dist_left_filtered, dist_right_filtered, frame_rate
-                )
-            )
+        # Create DataFrame
+        df = self.create_results_dataframe(
+            stance_times_left,
+            stance_times_right,
+            swing_time_left,
+            swing_time_right,
+            step_time_left,
+            step_time_right,
+            double_support_times_left,
+            double_support_times_right,
+        )
 
-            # Calculate gait parameters
-            (
-                stance_times_left,
-                stance_times_right,
-                swing_time_left,
-                swing_time_right,
-                step_time_left,
-                step_time_right,
-                double_support_times_left,
-                double_support_times_right,
-            ) = self.calculate_gait_parameters(
-                peaks_left, peaks_right, minima_left, minima_right, frame_rate
-            )
+        return (
+            checkpoints.load_json("upload")["annotated_video_url"],
+            df,
+            frame_rate,
+            signal["dist_left_filtered"],
+            signal["dist_right_filtered"],
+            signal["peaks_left"],
+            signal["peaks_right"],
+            signal["minima_left"],
+            signal["minima_right"],
+        )
 
-            # Create DataFrame
-            df = self.create_results_dataframe(
-                stance_times_left,
-                stance_times_right,
-                swing_time_left,
-                swing_time_right,
-                step_time_left,
-                step_time_right,
-                double_support_times_left,
-                double_support_times_right,
-            )
+    async def run_analysis(
+        self,
+        video_url: str,
+        checkpoints: PipelineCheckpointStore,
+        progress: Optional[ProgressPublisher] = None,
+        cancellation: Optional[CancellationToken] = None,
+    ):
+        """
+        Run the whole gait metrics pipeline in the current process.
 
-            # Generate result string
-            result = self.generate_result_string(
-                stance_times_left,
-                stance_times_right,
-                swing_time_left,
-                swing_time_right,
-                step_time_left,
-                step_time_right,
-                double_support_times_left,
-                double_support_times_right,
-            )
+        Each stage (download, quality, pose, signal, render, upload) stores its output
+        in `checkpoints`, and stages that already completed in an earlier,
+        interrupted attempt are skipped. The Celery tasks run the same stages
+        on separate I/O and CPU queues instead. The AI report is generated
+        separately by `generate_report` once the metrics have been stored.
+        """
+        await self.run_download_stage(video_url, checkpoints, progress, cancellation)
+        await self.run_compute_stages(checkpoints, progress, cancellation)
+        await self.run_upload_stage(checkpoints, progress, cancellation)
+        return self.load_results(checkpoints)
+
+    def gait_data_from_metrics(self, gait_metrics: List[GaitMetric]) -> str:
+        """Rebuild the gait metrics summary string from stored GaitMetric rows."""
+        gait_metrics = sorted(gait_metrics, key=lambda m: m.measurement_index)
+
+        def column(name: str) -> List[float]:
+            return [
+                getattr(m, name) for m in gait_metrics if getattr(m, name) is not None
+            ]
 
-            # Save and upload annotated video
-            output_video_path = await self.save_annotated_video(
-                annotated_frames, frame_rate
-            )
+        return self.generate_result_string(
+            column("stance_time_left"),
+            column("stance_time_right"),
+            column("swing_time_left"),
+            column("swing_time_right"),
+            column("step_time_left"),
+            column("step_time_right"),
+            column("double_support_time_left"),
+            column("double_support_time_right"),
+        )
 
-            annotated_video_url = await self.upload_to_cloudinary(output_video_path)
-            # annotated_video_url = "https://res.cloudinary.com/deuvh8isd/video/upload/v1745790144/patients/qtkqbqefqhnwxarmm6aw.mp4"
+    def build_patient_info(self, gait_session: GaitSession) -> Dict:
+        """Collect the patient details and gait data used in the LLM prompt."""
+        return {
+            "age": gait_session.patient.age or "N/A",
+            "weight": gait_session.patient.weight or "N/A",
+            "prosthetics": gait_session.patient.prosthetics or [],
+            "medical_conditions": gait_session.patient.medical_conditions or [],
+            "injuries": gait_session.patient.injuries or [],
+            "gait_data": self.gait_data_from_metrics(gait_session.gait_metrics),
+        }
 
-            patient_info = {
-                "age": gait_session.patient.age or "N/A",
-                "weight": gait_session.patient.weight or "N/A",
-                "prosthetics": gait_session.patient.prosthetics or [],
-                "medical_conditions": gait_session.patient.medical_conditions or [],
-                "injuries": gait_session.patient.injuries or [],
-                "gait_data": result,
-            }
-            ai_analysis = self.ask_gait_analysis(patient_info=patient_info)
-
-            return (
-                annotated_video_url,
-                df,
-                frame_rate,
-                dist_left_filtered,
-                dist_right_filtered,
-                peaks_left,
-                peaks_right,
-                minima_left,
-                minima_right,
-                ai_analysis,
-            )
-        finally:
-            # Clean up local files
-            if os.path.exists(local_video_path):
-                os.remove(local_video_path)
-            if "output_video_path" in locals() and os.path.exists(output_video_path):
-                os.remove(output_video_path)
+    async def generate_report(
+        self,
+        gait_session: GaitSession,
+        stream: Optional[ReportStreamPublisher] = None,
+        use_cache: bool = True,
+    ) -> GaitAnalysisOutput:
+        """Generate the AI report for a session whose metrics are already stored."""
+        if not gait_session.gait_metrics:
+            raise ValueError(f"Gait session {gait_session.id} has no gait metrics")
+        return await self.ask_gait_analysis(
+            patient_info=self.build_patient_info(gait_session),
+            stream=stream,
+            use_cache=use_cache,
+        )
 
     async def download_video(self, video_url: str) -> str:
         """Download video from Cloudinary URL to a temporary file."""
@@ -522,15 +872,21 @@ class GaitAnalysisPipeline:
 
         temp_file = os.path.join(temp_dir, f"{uuid.uuid4().hex}.mp4")
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(video_url) as response:
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Failed to download video: {response.status}",
-                    )
-                async with aiofiles.open(temp_file, mode="wb") as f:
-                    await f.write(await response.read())
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(video_url) as response:
+                    if response.status != 200:
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Failed to download video: {response.status}",
+                        )
+                    async with aiofiles.open(temp_file, mode="wb") as f:
+                        await f.write(await response.read())
+        except BaseException:
+            # Do not leave partial downloads behind, e.g. when cancelled
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
 
         return temp_file
 
@@ -679,14 +1035,107 @@ class GaitAnalysisPipeline:
             content = content[: -len("```")].strip()
         return content
 
-    def ask_gait_analysis(
-        self, patient_info: Optional[Dict] = None
+    def create_json_repair_prompt(self) -> PromptTemplate:
+        """Create and return a PromptTemplate that asks the LLM to fix malformed JSON."""
+        template = """
+    The text below was supposed to be a single JSON object matching the JSON schema that follows, but it could not be parsed or validated.
+
+    **Error**: {error}
+
+    **JSON Schema**:
+    {schema}
+
+    **Text to Fix**:
+    {response}
+
+    **Instructions**:
+    - Return only the corrected JSON object, starting with {{ and ending with }}.
+    - Keep the original content; only fix the structure, escaping and missing or mistyped fields.
+    - Do NOT include any Markdown code block markers or surrounding text.
+    """
+        return PromptTemplate(
+            input_variables=["error", "schema", "response"],
+            template=template,
+        )
+
+    async def _ainvoke_llm(
+        self, prompt_text: str, stream: Optional[ReportStreamPublisher] = None
+    ) -> str:
+        """
+        Call the shared LLM client with a per-call timeout and bounded
+        exponential-backoff retries. Every attempt first waits for the global
+        rate limiter shared by all workers. When a stream publisher is given,
+        the response is streamed and forwarded to it chunk by chunk.
+        """
+        estimated_tokens = self.llm_limiter.estimate_tokens(prompt_text)
+
+        async def call() -> str:
+            if stream is None:
+                response = await self.llm.ainvoke(prompt_text)
+                return response.content
+            await stream.reset()
+            content = ""
+            async for chunk in self.llm.astream(prompt_text):
+                content += chunk.content
+                await stream.feed(chunk.content)
+            return content
+
+        max_attempts = Config.LLM_MAX_RETRIES + 1
+        for attempt in range(max_attempts):
+            try:
+                async with self.llm_limiter.acquire(estimated_tokens):
+                    return await asyncio.wait_for(
+                        call(), timeout=Config.LLM_TIMEOUT_SECONDS
+                    )
+            except Exception as e:
+                if attempt == max_attempts - 1:
+                    raise RuntimeError(
+                        f"LLM call failed after {max_attempts} attempts: {str(e) or type(e).__name__}"
+                    )
+                delay = min(
+                    Config.LLM_RETRY_BACKOFF_SECONDS * (2**attempt),
+                    Config.LLM_RETRY_BACKOFF_MAX_SECONDS,
+                )
+                delay += random.uniform(0, delay / 2)
+                print(
+                    f"LLM call attempt {attempt + 1} failed ({str(e) or type(e).__name__}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def parse_gait_analysis_output(self, response_content: str) -> GaitAnalysisOutput:
+        """Parse and validate an LLM response against the GaitAnalysisOutput schema."""
+        # Strip any ```json and ``` markers if present
+        cleaned_content = self.strip_markdown_code_block(response_content)
+
+        # Parse JSON response
+        try:
+            output = json.loads(cleaned_content)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"LLM response is not valid JSON: {str(e)}")
+
+        # Validate output structure
+        try:
+            return GaitAnalysisOutput(**output)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Output does not match expected structure: {str(e)}")
+
+    async def ask_gait_analysis(
+        self,
+        patient_info: Optional[Dict] = None,
+        stream: Optional[ReportStreamPublisher] = None,
+        use_cache: bool = True,
     ) -> GaitAnalysisOutput:
         """
         Analyze gait data using LLM and return structured output.
 
+        Malformed responses are sent back to the LLM together with the
+        GaitAnalysisOutput schema for repair instead of failing the analysis.
+
         Args:
             patient_info: Dictionary containing patient details (age, weight, prosthetics, medical_conditions, injuries, gait_data)
+            stream: Optional publisher receiving the detailed analysis as it is generated
+            use_cache: Whether a cached answer for the same prompt may be returned
 
         Returns:
             Dictionary containing structured gait analysis output
@@ -706,29 +1155,43 @@ class GaitAnalysisPipeline:
             "gait_data": patient_info.get("gait_data", ""),
         }
 
-        # Initialize components
-        llm = self.initialize_llm()
-        prompt = self.create_gait_analysis_prompt()
-
-        # Generate response
-        chain = prompt | llm
-        response = chain.invoke(input_data)
+        prompt_text = self.create_gait_analysis_prompt().format(**input_data)
 
-        # Strip any ```json and ``` markers if present
-        cleaned_content = self.strip_markdown_code_block(response.content)
+        # Return the cached answer if this exact prompt was already analyzed
+        cache_key = self.llm_cache.make_key(
+            prompt_text, get_llm_model_name(Config.LLM_PROVIDER), LLM_TEMPERATURE
+        )
+        cached_output = await self.llm_cache.get(cache_key) if use_cache else None
+        if cached_output is not None:
+            result = GaitAnalysisOutput.model_validate_json(cached_output)
+            if stream is not None:
+                await stream.reset()
+                await stream.publish_text(result.detailed_analysis)
+            return result
 
-        # Parse JSON response
-        try:
-            output = json.loads(cleaned_content)
-        except json.JSONDecodeError as e:
-            print("Failed to parse JSON. Cleaned content:", cleaned_content)
-            raise ValueError(f"LLM response is not valid JSON: {str(e)}")
+        # Generate response
+        response_content = await self._ainvoke_llm(prompt_text, stream=stream)
+
+        repair_prompt = self.create_json_repair_prompt()
+        for attempt in range(Config.LLM_JSON_REPAIR_ATTEMPTS + 1):
+            try:
+                result = self.parse_gait_analysis_output(response_content)
+                break
+            except ValueError as e:
+                if attempt == Config.LLM_JSON_REPAIR_ATTEMPTS:
+                    print("Failed to parse LLM response:", response_content)
+                    raise
+                print(f"Invalid LLM response ({str(e)}), asking the LLM to repair it")
+                response_content = await self._ainvoke_llm(
+                    repair_prompt.format(
+                        error=str(e),
+                        schema=json.dumps(GaitAnalysisOutput.model_json_schema()),
+                        response=response_content,
+                    )
+                )
 
-        # Validate output structure
-        try:
-            result = GaitAnalysisOutput(**output)
-        except ValueError as e:
-            print("Output validation failed. Output:", output)
-            raise ValueError(f"Output does not match expected structure: {str(e)}")
+        await self.llm_cache.set(cache_key, result.model_dump_json())
+        if Config.LLM_RECORD_FIXTURES:
+            record_fixture(result.model_dump_json())
 
         return result
@@ -0,0 +1,516 @@
+import asyncio
+import functools
+import importlib
+import json
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from celery import Celery, Task, group
+from celery.exceptions import Retry
+from celery.utils import uuid
+from sqlalchemy import delete, insert, or_, select, update
+
+from src.config import Config
+from src.db import main as db
+from src.db.model.enum import JobStatus
+from src.db.models import BackgroundJob
+from src.gait_sessions.worker_resources import init_worker_resources
+
+# (task name, positional arguments, task ID or None, priority or None)
+Job = Tuple[str, Sequence, Optional[str], Optional[int]]
+
+FINISHED_STATUSES = (JobStatus.Succeeded, JobStatus.Failed, JobStatus.Revoked)
+CLEANUP_INTERVAL_SECONDS = 60 * 60
+WAIT_POLL_SECONDS = 0.2
+
+
+class JobDeferred(Exception):
+    """
+    Raised by a task run eagerly by the local runner to be run again after
+    `countdown` seconds, where a Celery task would retry with a countdown.
+    """
+
+    def __init__(self, countdown: float):
+        super().__init__(f"Deferred for {countdown} s")
+        self.countdown = countdown
+
+
+class JobRetried(JobDeferred):
+    """Raised in place of Celery's `Retry`, the job counts one more retry."""
+
+
+class RunnerTask(Task):
+    """
+    Base class of the tasks. Run eagerly by the local runner, where Celery
+    would re-run a retried task in place right away, a retry raises
+    `JobRetried` so the job is queued again after the retry's countdown.
+    """
+
+    def retry(self, *args, **kwargs):
+        if not self.request.is_eager:
+            return super().retry(*args, **kwargs)
+        kwargs["throw"] = True
+        try:
+            super().retry(*args, **kwargs)
+        except Retry as retry:
+            countdown = retry.when or 0
+            if isinstance(countdown, datetime):
+                countdown = (countdown - datetime.now(timezone.utc)).total_seconds()
+            raise JobRetried(max(countdown, 0)) from retry.exc
+
+
+class JobRunner(ABC):
+    """
+    Runs registered tasks in the background, by name.
+
+    Call sites enqueue through the runner selected by `JOB_RUNNER` instead of
+    calling `delay` or `apply_async` on the tasks, so the same code runs on
+    Celery workers or on the local runner. Methods are coroutines, so
+    enqueueing from an API request or a worker job never blocks its loop.
+    """
+
+    def __init__(self, app: Celery):
+        self.app = app
+
+    @abstractmethod
+    async def enqueue(
+        self,
+        task_name: str,
+        args: Sequence = (),
+        task_id: Optional[str] = None,
+        priority: Optional[int] = None,
+    ) -> str:
+        """Enqueue a task and return its ID. Lower priorities run first."""
+
+    @abstractmethod
+    async def enqueue_group(self, jobs: List[Job]) -> str:
+        """Enqueue several tasks at once and return the ID of the group."""
+
+    @abstractmethod
+    async def revoke(self, task_id: str) -> None:
+        """Drop a task that has not started yet."""
+
+    @abstractmethod
+    async def wait(self, task_id: str, timeout: float) -> Any:
+        """Wait until a task finished and return its result."""
+
+    async def start(self) -> None:
+        """Start executing jobs in this process, if the runner does."""
+
+    async def stop(self) -> None:
+        """Stop executing jobs, letting the running ones finish."""
+
+
+class CeleryJobRunner(JobRunner):
+    """
+    Sends tasks to the Celery workers through the broker. The Celery client
+    is synchronous, its calls run on the default executor of the loop.
+    """
+
+    def _signature(
+        self,
+        task_name: str,
+        args: Sequence,
+        task_id: Optional[str],
+        priority: Optional[int],
+    ):
+        options = {"task_id": task_id or uuid()}
+        if priority is not None:
+            options["priority"] = priority
+        # Tasks not registered in this process are sent by name
+        return self.app.signature(task_name, args=tuple(args), **options)
+
+    async def enqueue(self, task_name, args=(), task_id=None, priority=None) -> str:
+        signature = self._signature(task_name, args, task_id, priority)
+        await _in_executor(signature.apply_async)
+        return signature.id
+
+    async def enqueue_group(self, jobs: List[Job]) -> str:
+        signatures = group([self._signature(*job) for job in jobs])
+        return (await _in_executor(signatures.apply_async)).id
+
+    async def revoke(self, task_id: str) -> None:
+        await _in_executor(self.app.control.revoke, task_id)
+
+    async def wait(self, task_id: str, timeout: float) -> Any:
+        return await _in_executor(
+            self.app.AsyncResult(task_id).get, timeout=timeout
+        )
+
+
+class LocalJobRunner(JobRunner):
+    """
+    Runs tasks in process pools of the API process, fed by the
+    `background_job` table, for single-node deployments without Redis and
+    Celery.
+
+    Each Celery queue gets its own bounded `ProcessPoolExecutor`, so a long
+    pose job never holds up downloads or reports. Jobs are claimed in
+    priority order with `FOR UPDATE SKIP LOCKED`, so several API processes
+    can share the table. Queued jobs survive a restart, and running ones
+    whose runner stopped renewing their lease are queued again and resume
+    from their pipeline checkpoints.
+
+    Tasks run as Celery would run them eagerly, except for their retries:
+    the app's tasks are `RunnerTask`s, which are queued again to run after
+    the retry's countdown. Tasks that must wait without counting a retry
+    raise `JobDeferred`.
+
+    Jobs are written with the engine of the calling process: the API's, or
+    the worker's in pool processes, see `init_worker_resources`.
+    """
+
+    def __init__(self, app: Celery, pool_sizes: Dict[str, int]):
+        super().__init__(app)
+        self.pool_sizes = pool_sizes
+        self.pools: Dict[str, ProcessPoolExecutor] = {}
+        self.running: Dict[str, Dict[int, asyncio.Task]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _queue_of(self, task_name: str) -> str:
+        route = (self.app.conf.task_routes or {}).get(task_name)
+        queue = route["queue"] if route else self.app.conf.task_default_queue
+        return queue if queue in self.pool_sizes else self.app.conf.task_default_queue
+
+    def _priority_of(self, task_name: str, priority: Optional[int]) -> int:
+        if priority is not None:
+            return priority
+        task = self.app.tasks.get(task_name)
+        if task is not None and task.priority is not None:
+            return task.priority
+        return self.app.conf.task_default_priority
+
+    def _row(self, task_name, args, task_id, priority) -> Dict:
+        return {
+            "task_id": task_id or uuid(),
+            "task_name": task_name,
+            "args": list(args),
+            "queue": self._queue_of(task_name),
+            "priority": self._priority_of(task_name, priority),
+            "status": JobStatus.Queued,
+            "attempts": 0,
+            "retries": 0,
+            "enqueued_at": datetime.now(timezone.utc),
+        }
+
+    async def enqueue(self, task_name, args=(), task_id=None, priority=None) -> str:
+        row = self._row(task_name, args, task_id, priority)
+        await _execute(insert(BackgroundJob).values([row]))
+        self._wake()
+        return row["task_id"]
+
+    async def enqueue_group(self, jobs: List[Job]) -> str:
+        rows = [self._row(*job) for job in jobs]
+        if rows:
+            await _execute(insert(BackgroundJob).values(rows))
+            self._wake()
+        return uuid()
+
+    async def revoke(self, task_id: str) -> None:
+        await _execute(
+            update(BackgroundJob)
+            .where(
+                BackgroundJob.task_id == task_id,
+                BackgroundJob.status == JobStatus.Queued,
+            )
+            .values(status=JobStatus.Revoked, finished_at=datetime.now(timezone.utc))
+        )
+
+    async def wait(self, task_id: str, timeout: float) -> Any:
+        statement = select(
+            BackgroundJob.status, BackgroundJob.result, BackgroundJob.error
+        ).where(BackgroundJob.task_id == task_id)
+        deadline = time.monotonic() + timeout
+        while True:
+            rows = await _execute(statement, fetch=True)
+            if rows and rows[0].status in FINISHED_STATUSES:
+                job = rows[0]
+                if job.status != JobStatus.Succeeded:
+                    raise RuntimeError(f"Job {task_id} {job.status.value}: {job.error}")
+                return job.result
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Job {task_id} did not finish in {timeout} s")
+            await asyncio.sleep(WAIT_POLL_SECONDS)
+
+    def _wake(self) -> None:
+        """Dispatch right away when the job was enqueued on the runner's loop."""
+        if self._loop is not None and self._loop is asyncio.get_running_loop():
+            self._wakeup.set()
+
+    def _new_pool(self, queue: str) -> ProcessPoolExecutor:
+        # Pool processes set up their own loop and engine, like Celery workers
+        return ProcessPoolExecutor(
+            max_workers=self.pool_sizes[queue], initializer=init_worker_resources
+        )
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        for queue in self.pool_sizes:
+            self.pools[queue] = self._new_pool(queue)
+            self.running[queue] = {}
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        print(f"Local job runner started with pools {self.pool_sizes}")
+
+    async def stop(self) -> None:
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        self._dispatcher = None
+        # Warm shutdown: running jobs finish, queued ones wait for the restart
+        running = [task for jobs in self.running.values() for task in jobs.values()]
+        if running:
+            print(f"Waiting for {len(running)} running job(s) to finish")
+            await asyncio.gather(*running, return_exceptions=True)
+        for pool in self.pools.values():
+            pool.shutdown()
+        self.pools = {}
+        self._loop = None
+
+    async def _dispatch(self) -> None:
+        await self._requeue_expired()
+        await self._delete_finished()
+        renewed_at = cleaned_at = time.monotonic()
+        while True:
+            self._wakeup.clear()
+            try:
+                for queue, size in self.pool_sizes.items():
+                    running = self.running[queue]
+                    free = size - len(running)
+                    if free <= 0:
+                        continue
+                    for job in await self._claim(queue, free):
+                        running[job.id] = asyncio.create_task(
+                            self._run_job(queue, job)
+                        )
+
+                now = time.monotonic()
+                if now - renewed_at >= Config.LOCAL_RUNNER_LEASE_SECONDS / 3:
+                    await self._renew_leases()
+                    await self._requeue_expired()
+                    renewed_at = now
+                if now - cleaned_at >= CLEANUP_INTERVAL_SECONDS:
+                    await self._delete_finished()
+                    cleaned_at = now
+            except Exception as e:
+                print(f"Local job runner failed to dispatch jobs: {str(e)}")
+
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), Config.LOCAL_RUNNER_POLL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def _claim(self, queue: str, limit: int):
+        """Mark the next queued jobs of a queue as running and return them."""
+        now = datetime.now(timezone.utc)
+        candidates = (
+            select(BackgroundJob.id)
+            .where(
+                BackgroundJob.status == JobStatus.Queued,
+                BackgroundJob.queue == queue,
+                or_(
+                    BackgroundJob.run_after.is_(None),
+                    BackgroundJob.run_after <= now,
+                ),
+            )
+            .order_by(BackgroundJob.priority, BackgroundJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(BackgroundJob)
+            .where(BackgroundJob.id.in_(candidates.scalar_subquery()))
+            .values(
+                status=JobStatus.Running,
+                attempts=BackgroundJob.attempts + 1,
+                started_at=now,
+                heartbeat_at=now,
+            )
+            .returning(
+                BackgroundJob.id,
+                BackgroundJob.task_id,
+                BackgroundJob.task_name,
+                BackgroundJob.args,
+                BackgroundJob.attempts,
+                BackgroundJob.retries,
+            )
+        )
+        async with db.async_engine.begin() as conn:
+            return (await conn.execute(statement)).all()
+
+    async def _run_job(self, queue: str, job) -> None:
+        pool = self.pools[queue]
+        try:
+            outcome = await self._loop.run_in_executor(
+                pool, execute_job, job.task_name, job.args, job.task_id, job.retries
+            )
+        except BrokenProcessPool:
+            # A pool process died, e.g. killed for memory, taking every job
+            # of the pool with it
+            if self.pools.get(queue) is pool:
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.pools[queue] = self._new_pool(queue)
+            outcome = None
+        except Exception as e:
+            outcome = {"status": JobStatus.Failed, "error": str(e)}
+
+        try:
+            await self._finish(job, outcome)
+        except Exception as e:
+            print(f"Failed to record the outcome of job {job.task_id}: {str(e)}")
+        finally:
+            self.running[queue].pop(job.id, None)
+            self._wakeup.set()
+
+    async def _finish(self, job, outcome: Optional[Dict]) -> None:
+        now = datetime.now(timezone.utc)
+        if outcome is None:
+            print(f"Job {job.task_id} lost its worker process")
+            if job.attempts < Config.LOCAL_RUNNER_MAX_ATTEMPTS:
+                values = {"status": JobStatus.Queued, "error": "Worker process died"}
+            else:
+                values = {
+                    "status": JobStatus.Failed,
+                    "error": "Worker process died",
+                    "finished_at": now,
+                }
+        elif outcome["status"] == JobStatus.Queued:
+            # Deferred or retried, the attempt did not count
+            values = {
+                "status": JobStatus.Queued,
+                "attempts": BackgroundJob.attempts - 1,
+                "run_after": now + timedelta(seconds=outcome["countdown"]),
+            }
+            if outcome.get("retried"):
+                values["retries"] = BackgroundJob.retries + 1
+                values["error"] = outcome.get("error")
+        else:
+            values = {
+                "status": outcome["status"],
+                "result": _json_safe(outcome.get("result")),
+                "error": outcome.get("error"),
+                "finished_at": now,
+            }
+        await _execute(
+            update(BackgroundJob)
+            .where(
+                BackgroundJob.id == job.id,
+                BackgroundJob.status == JobStatus.Running,
+            )
+            .values(**values)
+        )
+
+    async def _renew_leases(self) -> None:
+        ids = [job_id for jobs in self.running.values() for job_id in jobs]
+        if not ids:
+            return
+        await _execute(
+            update(BackgroundJob)
+            .where(
+                BackgroundJob.id.in_(ids),
+                BackgroundJob.status == JobStatus.Running,
+            )
+            .values(heartbeat_at=datetime.now(timezone.utc))
+        )
+
+    async def _requeue_expired(self) -> None:
+        """Queue again the running jobs of runners that stopped or crashed."""
+        now = datetime.now(timezone.utc)
+        expired = (
+            BackgroundJob.status == JobStatus.Running,
+            BackgroundJob.heartbeat_at
+            < now - timedelta(seconds=Config.LOCAL_RUNNER_LEASE_SECONDS),
+        )
+        async with db.async_engine.begin() as conn:
+            await conn.execute(
+                update(BackgroundJob)
+                .where(
+                    *expired,
+                    BackgroundJob.attempts >= Config.LOCAL_RUNNER_MAX_ATTEMPTS,
+                )
+                .values(
+                    status=JobStatus.Failed,
+                    error="Job runner stopped during the last attempt",
+                    finished_at=now,
+                )
+            )
+            result = await conn.execute(
+                update(BackgroundJob).where(*expired).values(status=JobStatus.Queued)
+            )
+        if result.rowcount:
+            print(f"Queued {result.rowcount} interrupted job(s) again")
+
+    async def _delete_finished(self) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(
+            seconds=Config.LOCAL_RUNNER_KEEP_FINISHED_SECONDS
+        )
+        await _execute(
+            delete(BackgroundJob).where(
+                BackgroundJob.status.in_(FINISHED_STATUSES),
+                BackgroundJob.finished_at < cutoff,
+            )
+        )
+
+
+def execute_job(task_name: str, args: List, task_id: str, retries: int = 0) -> Dict:
+    """Run a task in a pool process, the way a Celery worker would."""
+    # Imported here, the task modules import this one
+    from src.gait_sessions.celery_jobs import celery_app
+
+    for module in celery_app.conf.include or ():
+        importlib.import_module(module)
+    task = celery_app.tasks[task_name]
+    result = task.apply(args=args, task_id=task_id, retries=retries, throw=False)
+    if isinstance(result.result, JobDeferred):
+        deferred = result.result
+        return {
+            "status": JobStatus.Queued,
+            "countdown": deferred.countdown,
+            "retried": isinstance(deferred, JobRetried),
+            "error": repr(deferred.__cause__) if deferred.__cause__ else None,
+        }
+    if result.failed():
+        return {"status": JobStatus.Failed, "error": repr(result.result)}
+    return {"status": JobStatus.Succeeded, "result": result.result}
+
+
+def create_job_runner(
+    app: Celery, pool_sizes: Dict[str, int], runner: Optional[str] = None
+) -> JobRunner:
+    """Create the job runner named by `runner`, `JOB_RUNNER` by default."""
+    runner = runner or Config.JOB_RUNNER
+    if runner == "celery":
+        return CeleryJobRunner(app)
+    if runner == "local":
+        return LocalJobRunner(app, pool_sizes)
+    raise ValueError(f"Unknown job runner: {runner}")
+
+
+def _json_safe(value: Any) -> Any:
+    return json.loads(json.dumps(value, default=str))
+
+
+async def _execute(statement, fetch: bool = False):
+    """Execute a statement in its own transaction."""
+    async with db.async_engine.begin() as conn:
+        result = await conn.execute(statement)
+        return result.all() if fetch else result.rowcount
+
+
+async def _in_executor(function, *args, **kwargs):
+    """Run a blocking call on the default executor of the running loop."""
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(function, *args, **kwargs)
+    )
@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Dict, Optional
+
+from redis import asyncio as aioredis
+
+from src.config import Config
+from src.db.redis import get_async_redis
+
+LLM_CACHE_KEY_PREFIX = "llm_cache"
+
+
+class _RedisCacheBackend:
+    """Redis-backed store. Entries expire via TTL; an LRU index bounds the size."""
+
+    def __init__(self, client: aioredis.Redis, ttl_seconds: int, max_entries: int):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.index_key = f"{LLM_CACHE_KEY_PREFIX}:index"
+        self.stats_key = f"{LLM_CACHE_KEY_PREFIX}:stats"
+
+    def _entry_key(self, key: str) -> str:
+        return f"{LLM_CACHE_KEY_PREFIX}:entry:{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(self._entry_key(key))
+        if value is None:
+            await self.client.zrem(self.index_key, key)
+            return None
+        await self.client.zadd(self.index_key, {key: time.time()})
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.set(self._entry_key(key), value, ex=self.ttl_seconds)
+        pipe.zadd(self.index_key, {key: now})
+        # Drop index members whose entries have already expired
+        pipe.zremrangebyscore(self.index_key, "-inf", now - self.ttl_seconds)
+        pipe.zcard(self.index_key)
+        size = (await pipe.execute())[-1]
+
+        overflow = size - self.max_entries
+        if overflow > 0:
+            evicted = await self.client.zpopmin(self.index_key, overflow)
+            if evicted:
+                await self.client.delete(*[self._entry_key(k) for k, _ in evicted])
+
+    async def record(self, field: str) -> None:
+        await self.client.hincrby(self.stats_key, field, 1)
+
+    async def stats(self) -> Dict[str, int]:
+        raw = await self.client.hgetall(self.stats_key)
+        return {
+            "hits": int(raw.get("hits", 0)),
+            "misses": int(raw.get("misses", 0)),
+            "entries": int(await self.client.zcard(self.index_key)),
+        }
+
+
+class _DiskCacheBackend:
+    """
+    On-disk store with one JSON file per entry; file mtime tracks last access.
+
+    File access runs in a worker thread so it does not block the event loop.
+    """
+
+    def __init__(self, cache_dir: str, ttl_seconds: int, max_entries: int):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._get, key)
+
+    def _get(self, key: str) -> Optional[str]:
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        os.utime(path, None)
+        return entry["value"]
+
+    async def set(self, key: str, value: str) -> None:
+        await asyncio.to_thread(self._set, key, value)
+
+    def _set(self, key: str, value: str) -> None:
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.time(), "value": value}, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if now - mtime > self.ttl_seconds:
+                self._remove(path)
+            else:
+                entries.append((mtime, path))
+
+        overflow = len(entries) - self.max_entries
+        if overflow > 0:
+            entries.sort()
+            for _, path in entries[:overflow]:
+                self._remove(path)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    async def record(self, field: str) -> None:
+        setattr(self, field, getattr(self, field) + 1)
+
+    async def stats(self) -> Dict[str, int]:
+        names = await asyncio.to_thread(os.listdir, self.cache_dir)
+        entries = len([n for n in names if n.endswith(".json")])
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+
+class LLMResponseCache:
+    """
+    Content-addressed cache for LLM responses.
+
+    Entries are keyed by a hash of the rendered prompt, the model name and the
+    temperature, so a re-run with identical inputs returns the stored response
+    instead of calling the model again. Redis is used when configured, otherwise
+    entries are kept on local disk.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int = Config.LLM_CACHE_TTL_SECONDS,
+        max_entries: int = Config.LLM_CACHE_MAX_ENTRIES,
+        cache_dir: str = Config.LLM_CACHE_DIR,
+        redis_client: Optional[aioredis.Redis] = None,
+        enabled: bool = Config.LLM_CACHE_ENABLED,
+    ):
+        self.enabled = enabled
+        redis_client = redis_client or get_async_redis()
+        if redis_client is not None:
+            self.backend = _RedisCacheBackend(redis_client, ttl_seconds, max_entries)
+        else:
+            self.backend = _DiskCacheBackend(cache_dir, ttl_seconds, max_entries)
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float) -> str:
+        """Build the cache key for a rendered prompt and model settings."""
+        payload = json.dumps(
+            {"prompt": prompt, "model": model, "temperature": temperature},
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached response for a key, or None on a miss."""
+        if not self.enabled:
+            return None
+        try:
+            value = await self.backend.get(key)
+            await self.backend.record("hits" if value is not None else "misses")
+            return value
+        except Exception as e:
+            print(f"LLM cache lookup failed: {str(e)}")
+            return None
+
+    async def set(self, key: str, value: str) -> None:
+        """Store a response for a key, evicting expired and least recently used entries."""
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(key, value)
+        except Exception as e:
+            print(f"LLM cache store failed: {str(e)}")
+
+    async def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        return await self.backend.stats()
@@ -0,0 +1,228 @@
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+from redis import asyncio as aioredis
+
+from src.config import Config
+from src.db.redis import get_async_redis
+
+LLM_LIMITER_KEY_PREFIX = "llm_limiter"
+LLM_LIMITER_POLL_SECONDS = 0.1
+
+# Fair semaphore: holders are ranked by ticket, entries whose heartbeat is
+# older than the lease are considered dead and removed.
+# KEYS: queue (ticket scored), heartbeats (time scored)
+# ARGV: holder, now, lease seconds, limit, ticket
+FAIR_SEMAPHORE_SCRIPT = """
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', tonumber(ARGV[2]) - tonumber(ARGV[3]))
+for _, holder in ipairs(stale) do
+    redis.call('ZREM', KEYS[1], holder)
+    redis.call('ZREM', KEYS[2], holder)
+end
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[1], ARGV[5], ARGV[1])
+end
+if redis.call('ZRANK', KEYS[1], ARGV[1]) < tonumber(ARGV[4]) then
+    return 1
+end
+return 0
+"""
+
+# Two token buckets (requests and LLM tokens) consumed atomically.
+# Returns 0 when both budgets were taken, otherwise the wait in milliseconds.
+# KEYS: request bucket, token bucket
+# ARGV: now, request capacity, request refill/s, token capacity, token refill/s, tokens
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local function refill(key, capacity, rate)
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    return math.min(capacity, tokens + (now - ts) * rate)
+end
+local req_capacity, req_rate = tonumber(ARGV[2]), tonumber(ARGV[3])
+local tok_capacity, tok_rate = tonumber(ARGV[4]), tonumber(ARGV[5])
+local needed = math.min(tonumber(ARGV[6]), tok_capacity)
+local requests = refill(KEYS[1], req_capacity, req_rate)
+local tokens = refill(KEYS[2], tok_capacity, tok_rate)
+if requests >= 1 and tokens >= needed then
+    redis.call('HSET', KEYS[1], 'tokens', requests - 1, 'ts', now)
+    redis.call('HSET', KEYS[2], 'tokens', tokens - needed, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], 3600)
+    redis.call('EXPIRE', KEYS[2], 3600)
+    return 0
+end
+local wait = math.max((1 - requests) / req_rate, (needed - tokens) / tok_rate, 0)
+return math.ceil(wait * 1000)
+"""
+
+
+class _LocalTokenBuckets:
+    """In-process equivalent of TOKEN_BUCKET_SCRIPT used when Redis is absent."""
+
+    def __init__(self):
+        self.requests: Optional[float] = None
+        self.tokens: Optional[float] = None
+        self.ts = time.time()
+
+    def take(self, now: float, req_capacity, req_rate, tok_capacity, tok_rate, needed):
+        needed = min(needed, tok_capacity)
+        elapsed = now - self.ts
+        requests = min(
+            req_capacity,
+            (req_capacity if self.requests is None else self.requests)
+            + elapsed * req_rate,
+        )
+        tokens = min(
+            tok_capacity,
+            (tok_capacity if self.tokens is None else self.tokens) + elapsed * tok_rate,
+        )
+        self.ts = now
+        if requests >= 1 and tokens >= needed:
+            self.requests, self.tokens = requests - 1, tokens - needed
+            return 0
+        self.requests, self.tokens = requests, tokens
+        return max((1 - requests) / req_rate, (needed - tokens) / tok_rate, 0) * 1000
+
+
+class LLMRateLimiter:
+    """
+    Limits LLM calls across every worker process.
+
+    A fair (FIFO) distributed semaphore caps the number of concurrent calls,
+    and token buckets enforce the per-minute request and token budgets. Both
+    live in Redis so every Celery worker shares them; without Redis the
+    limiter falls back to per-process equivalents. Wait times are recorded so
+    queueing in front of the LLM can be monitored.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = Config.LLM_MAX_CONCURRENT_REQUESTS,
+        requests_per_minute: int = Config.LLM_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = Config.LLM_TOKENS_PER_MINUTE,
+        lease_seconds: int = Config.LLM_LIMITER_LEASE_SECONDS,
+        redis_client: Optional[aioredis.Redis] = None,
+        key_prefix: str = LLM_LIMITER_KEY_PREFIX,
+    ):
+        self.max_concurrent = max_concurrent
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.lease_seconds = lease_seconds
+        self.redis = redis_client or get_async_redis()
+        self.keys = {
+            name: f"{key_prefix}:{name}"
+            for name in ("ticket", "queue", "heartbeats", "requests", "tokens", "stats")
+        }
+        if self.redis is not None:
+            self._semaphore_script = self.redis.register_script(FAIR_SEMAPHORE_SCRIPT)
+            self._bucket_script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self._local_semaphore = asyncio.Semaphore(max_concurrent)
+        self._local_buckets = _LocalTokenBuckets()
+        self._local_stats = {"acquired": 0, "wait_ms_total": 0, "wait_ms_max": 0}
+
+    @staticmethod
+    def estimate_tokens(prompt_text: str) -> int:
+        """Roughly estimate prompt plus completion tokens for a request."""
+        return len(prompt_text) // 4 + Config.LLM_EXPECTED_OUTPUT_TOKENS
+
+    def _bucket_args(self, tokens: int):
+        return [
+            self.requests_per_minute,
+            self.requests_per_minute / 60,
+            self.tokens_per_minute,
+            self.tokens_per_minute / 60,
+            tokens,
+        ]
+
+    async def _acquire_slot(self, holder: str) -> None:
+        if self.redis is None:
+            await self._local_semaphore.acquire()
+            return
+        ticket = await self.redis.incr(self.keys["ticket"])
+        while True:
+            acquired = await self._semaphore_script(
+                keys=[self.keys["queue"], self.keys["heartbeats"]],
+                args=[holder, time.time(), self.lease_seconds, self.max_concurrent, ticket],
+            )
+            if acquired:
+                return
+            await asyncio.sleep(LLM_LIMITER_POLL_SECONDS)
+
+    async def _release_slot(self, holder: str) -> None:
+        if self.redis is None:
+            self._local_semaphore.release()
+            return
+        pipe = self.redis.pipeline()
+        pipe.zrem(self.keys["queue"], holder)
+        pipe.zrem(self.keys["heartbeats"], holder)
+        await pipe.execute()
+
+    async def _take_budget(self, tokens: int) -> None:
+        while True:
+            if self.redis is None:
+                wait_ms = self._local_buckets.take(time.time(), *self._bucket_args(tokens))
+            else:
+                wait_ms = await self._bucket_script(
+                    keys=[self.keys["requests"], self.keys["tokens"]],
+                    args=[time.time(), *self._bucket_args(tokens)],
+                )
+            if not wait_ms:
+                return
+            await asyncio.sleep(max(float(wait_ms) / 1000, LLM_LIMITER_POLL_SECONDS))
+
+    async def _record_wait(self, wait_ms: int) -> None:
+        if self.redis is None:
+            self._local_stats["acquired"] += 1
+            self._local_stats["wait_ms_total"] += wait_ms
+            self._local_stats["wait_ms_max"] = max(self._local_stats["wait_ms_max"], wait_ms)
+            return
+        pipe = self.redis.pipeline()
+        pipe.hincrby(self.keys["stats"], "acquired", 1)
+        pipe.hincrby(self.keys["stats"], "wait_ms_total", wait_ms)
+        await pipe.execute()
+        current_max = int(await self.redis.hget(self.keys["stats"], "wait_ms_max") or 0)
+        if wait_ms > current_max:
+            await self.redis.hset(self.keys["stats"], "wait_ms_max", wait_ms)
+
+    @asynccontextmanager
+    async def acquire(self, tokens: int) -> AsyncIterator[float]:
+        """
+        Wait for a concurrency slot and request/token budget, in arrival order.
+
+        Yields:
+            float: Seconds spent waiting before the call was admitted
+        """
+        holder = uuid.uuid4().hex
+        started_at = time.perf_counter()
+        await self._acquire_slot(holder)
+        try:
+            await self._take_budget(tokens)
+            waited = time.perf_counter() - started_at
+            try:
+                await self._record_wait(int(waited * 1000))
+            except Exception as e:
+                print(f"Failed to record LLM limiter wait time: {str(e)}")
+            if waited >= 1:
+                print(f"LLM call waited {waited:.1f}s for the rate limiter")
+            yield waited
+        finally:
+            await self._release_slot(holder)
+
+    async def stats(self) -> Dict[str, float]:
+        """Return the number of admitted calls and their wait-time metrics."""
+        if self.redis is None:
+            raw = self._local_stats
+        else:
+            raw = await self.redis.hgetall(self.keys["stats"])
+        acquired = int(raw.get("acquired", 0))
+        wait_ms_total = int(raw.get("wait_ms_total", 0))
+        return {
+            "acquired": acquired,
+            "wait_ms_avg": round(wait_ms_total / acquired, 1) if acquired else 0,
+            "wait_ms_max": int(raw.get("wait_ms_max", 0)),
+        }
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from src.config import Config
+
+GEMINI_PROVIDER = "gemini"
+LOCAL_PROVIDER = "local"
+
+GEMINI_MODEL = "gemini-2.0-flash"
+LOCAL_MODEL = "local-gait-report"
+LLM_TEMPERATURE = 0.7
+
+LOCAL_STREAM_CHUNK_SIZE = 16
+
+
+class LocalGaitReportLLM(BaseChatModel):
+    """
+    Offline stand-in for the Gemini chat model.
+
+    Returns recorded GaitAnalysisOutput fixtures (picked deterministically from
+    the prompt) or a templated report when no fixtures exist, after a
+    configurable latency and with a configurable simulated error rate.
+    """
+
+    latency_seconds: float = 0.0
+    error_rate: float = 0.0
+    fixtures_dir: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return LOCAL_MODEL
+
+    def _prompt_text(self, messages: List[BaseMessage]) -> str:
+        return "\n".join(str(m.content) for m in messages)
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("Local LLM stand-in simulated failure")
+
+    def _load_fixtures(self) -> List[str]:
+        if not self.fixtures_dir or not os.path.isdir(self.fixtures_dir):
+            return []
+        fixtures = []
+        for name in sorted(os.listdir(self.fixtures_dir)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.fixtures_dir, name), encoding="utf-8") as f:
+                    fixtures.append(f.read())
+        return fixtures
+
+    def _respond(self, prompt_text: str) -> str:
+        digest = hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()
+        fixtures = self._load_fixtures()
+        if fixtures:
+            return fixtures[int(digest, 16) % len(fixtures)]
+
+        return json.dumps(
+            {
+                "detailed_analysis": (
+                    "### 1. Walking Pattern\n"
+                    f"Templated report `{digest[:12]}` generated by the local LLM stand-in.\n\n"
+                    "### 2. Abnormalities\nNone assessed.\n\n"
+                    "### 3. Exercises\nNone assessed.\n\n"
+                    "### 4. Weight Influence\nNone assessed.\n\n"
+                    "### 5. Long-Term Risks\nNone assessed."
+                ),
+                "summary": "Templated report generated offline; no clinical assessment was made.",
+                "recommendations": [],
+                "recommended_exercises": [],
+                "possible_abnormalities": [],
+                "long_term_risks": [],
+            }
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency_seconds)
+        self._maybe_fail()
+        content = self._respond(self._prompt_text(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency_seconds)
+        self._maybe_fail()
+        content = self._respond(self._prompt_text(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        content = self._respond(self._prompt_text(messages))
+        chunks = range(0, len(content), LOCAL_STREAM_CHUNK_SIZE)
+        for start in chunks:
+            time.sleep(self.latency_seconds / len(chunks))
+            if start == 0:
+                self._maybe_fail()
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=content[start : start + LOCAL_STREAM_CHUNK_SIZE]
+                )
+            )
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        content = self._respond(self._prompt_text(messages))
+        chunks = range(0, len(content), LOCAL_STREAM_CHUNK_SIZE)
+        for start in chunks:
+            await asyncio.sleep(self.latency_seconds / len(chunks))
+            if start == 0:
+                self._maybe_fail()
+            yield ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=content[start : start + LOCAL_STREAM_CHUNK_SIZE]
+                )
+            )
+
+
+def get_llm_model_name(provider: str = Config.LLM_PROVIDER) -> str:
+    """Return the model name used for the configured provider."""
+    return LOCAL_MODEL if provider == LOCAL_PROVIDER else GEMINI_MODEL
+
+
+def create_llm(provider: str = Config.LLM_PROVIDER) -> BaseChatModel:
+    """
+    Create the chat model for the configured provider.
+
+    Retries and backoff are handled by the pipeline, so the client's own
+    retries are disabled and each call makes exactly one request.
+    """
+    if provider == LOCAL_PROVIDER:
+        return LocalGaitReportLLM(
+            latency_seconds=Config.LLM_LOCAL_LATENCY_SECONDS,
+            error_rate=Config.LLM_LOCAL_ERROR_RATE,
+            fixtures_dir=Config.LLM_FIXTURES_DIR,
+        )
+    if provider == GEMINI_PROVIDER:
+        return ChatGoogleGenerativeAI(
+            model=GEMINI_MODEL,
+            google_api_key=Config.GOOGLE_API_KEY,
+            temperature=LLM_TEMPERATURE,
+            response_mime_type="application/json",
+            timeout=Config.LLM_TIMEOUT_SECONDS,
+            max_retries=0,
+        )
+    raise ValueError(f"Unknown LLM provider: {provider}")
+
+
+def record_fixture(response_json: str, fixtures_dir: str = Config.LLM_FIXTURES_DIR):
+    """Save a validated LLM response so the local provider can replay it."""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    path = os.path.join(fixtures_dir, f"{uuid.uuid4().hex}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(response_json)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.config import Config
+
+# Bump whenever a stage's output format or computation changes so stale
+# checkpoints from older workers are never resumed from.
+PIPELINE_VERSION = "2"
+
+# Stages of the metrics task, in order. The AI report is generated by its own
+# task, which resumes from the metrics stored by the persist stage.
+PIPELINE_STAGES = (
+    "download",
+    "probe",
+    "quality",
+    "pose",
+    "signal",
+    "render",
+    "upload",
+    "persist",
+)
+
+VIDEO_ARTIFACT = "video.mp4"
+ANNOTATED_VIDEO_ARTIFACT = "annotated.mp4"
+
+MANIFEST_FILENAME = "manifest.json"
+POSE_CHUNK_PREFIX = "pose-chunk-"
+
+
+class PipelineCheckpointStore:
+    """
+    On-disk checkpoints of the analysis pipeline for one session.
+
+    Checkpoints are keyed by session, pipeline version and video URL, so a
+    retried task resumes at the first incomplete stage while a new pipeline
+    version or a replaced video starts from scratch. Every file is written to
+    a temporary name of its own and renamed, so a crash never leaves a
+    partial artifact behind a completed stage, and concurrent writers never
+    mix their content. The tasks writing a session's checkpoints still take
+    its `checkpoint_lock`, as the manifest is read, updated and written back.
+    """
+
+    def __init__(
+        self,
+        session_id: int,
+        video_url: str,
+        root: str = Config.PIPELINE_CHECKPOINT_DIR,
+        version: str = PIPELINE_VERSION,
+    ):
+        digest = hashlib.sha256(video_url.encode("utf-8")).hexdigest()[:16]
+        self.session_dir = os.path.join(root, str(session_id))
+        self.dir = os.path.join(self.session_dir, f"v{version}-{digest}")
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.dir, name)
+
+    def _replace(self, name: str, write) -> None:
+        with tempfile.NamedTemporaryFile(
+            "wb", dir=self.dir, prefix=f".{name}.", suffix=".tmp", delete=False
+        ) as f:
+            tmp_path = f.name
+            try:
+                write(f)
+            except BaseException:
+                f.close()
+                os.remove(tmp_path)
+                raise
+        os.replace(tmp_path, self.path(name))
+
+    def _read_manifest(self) -> Dict:
+        try:
+            with open(self.path(MANIFEST_FILENAME), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"completed": [], "attempts": {}}
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        self._replace(
+            MANIFEST_FILENAME, lambda f: f.write(json.dumps(manifest).encode("utf-8"))
+        )
+
+    def is_complete(self, stage: str) -> bool:
+        return stage in self._read_manifest()["completed"]
+
+    def first_incomplete_stage(self) -> Optional[str]:
+        completed = self._read_manifest()["completed"]
+        return next((s for s in PIPELINE_STAGES if s not in completed), None)
+
+    def mark_complete(self, stage: str) -> None:
+        manifest = self._read_manifest()
+        if stage not in manifest["completed"]:
+            manifest["completed"].append(stage)
+            self._write_manifest(manifest)
+
+    def record_attempt(self, task: str) -> int:
+        """Count an attempt at running a pipeline task and return the total."""
+        manifest = self._read_manifest()
+        manifest["attempts"][task] = manifest["attempts"].get(task, 0) + 1
+        self._write_manifest(manifest)
+        return manifest["attempts"][task]
+
+    def save_arrays(self, stage: str, **arrays: np.ndarray) -> None:
+        """Store a stage's array outputs and mark the stage complete."""
+        self._replace(f"{stage}.npz", lambda f: np.savez(f, **arrays))
+        self.mark_complete(stage)
+
+    def load_arrays(self, stage: str) -> Dict[str, np.ndarray]:
+        with np.load(self.path(f"{stage}.npz")) as data:
+            return {name: data[name] for name in data.files}
+
+    def save_json(self, stage: str, data: Dict) -> None:
+        """Store a stage's JSON output and mark the stage complete."""
+        self._replace(
+            f"{stage}.json", lambda f: f.write(json.dumps(data).encode("utf-8"))
+        )
+        self.mark_complete(stage)
+
+    def load_json(self, stage: str) -> Dict:
+        with open(self.path(f"{stage}.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_pose_chunk(self, start_frame: int, landmarks: np.ndarray) -> None:
+        """Store the landmarks of a block of frames starting at `start_frame`."""
+        self._replace(
+            f"{POSE_CHUNK_PREFIX}{start_frame:08d}.npy", lambda f: np.save(f, landmarks)
+        )
+
+    def load_pose_chunks(self) -> List[np.ndarray]:
+        """Load the contiguous pose chunks saved so far, in frame order."""
+        chunks = []
+        next_frame = 0
+        for name in sorted(os.listdir(self.dir)):
+            if not name.startswith(POSE_CHUNK_PREFIX):
+                continue
+            if int(name[len(POSE_CHUNK_PREFIX) : -len(".npy")]) != next_frame:
+                break
+            chunk = np.load(self.path(name))
+            chunks.append(chunk)
+            next_frame += len(chunk)
+        return chunks
+
+    def clear_pose_chunks(self) -> None:
+        for name in os.listdir(self.dir):
+            if name.startswith(POSE_CHUNK_PREFIX):
+                os.remove(self.path(name))
+
+    def clear(self) -> None:
+        """Remove every checkpoint of the session, for all pipeline versions."""
+        shutil.rmtree(self.session_dir, ignore_errors=True)
+
+
+def clear_session_checkpoints(
+    session_id: int, root: str = Config.PIPELINE_CHECKPOINT_DIR
+) -> None:
+    """Remove every checkpoint of a session, e.g. once its analysis is cancelled."""
+    shutil.rmtree(os.path.join(root, str(session_id)), ignore_errors=True)
+
+
+def prune_stale_checkpoints(
+    root: str = Config.PIPELINE_CHECKPOINT_DIR,
+    max_age_seconds: int = Config.PIPELINE_CHECKPOINT_TTL_SECONDS,
+) -> None:
+    """Remove checkpoints of sessions that have not been touched for a while."""
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(root):
+        session_dir = os.path.join(root, name)
+        try:
+            if os.path.getmtime(session_dir) < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+        except OSError:
+            continue
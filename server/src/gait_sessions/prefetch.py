@@ -0,0 +1,49 @@
+from src.config import Config
+from src.db.redis import get_async_redis
+from src.gait_sessions.cancellation import CancellationToken
+from src.gait_sessions.scheduling import WAITING_JOBS_KEY
+
+PREFETCH_KEY_PREFIX = "gait_prefetch"
+
+
+def prefetch_key(session_id: int) -> str:
+    return f"{PREFETCH_KEY_PREFIX}:{session_id}"
+
+
+async def mark_prefetch(session_id: int, video_url: str) -> bool:
+    """
+    Record the video a session's prefetch works on, which cancels a prefetch
+    of its previous video. Returns False without Redis, where a prefetch
+    could not be cancelled.
+    """
+    redis = get_async_redis()
+    if redis is None:
+        return False
+    await redis.set(prefetch_key(session_id), video_url, ex=Config.PROGRESS_TTL_SECONDS)
+    return True
+
+
+async def cancel_prefetch(*session_ids: int) -> None:
+    redis = get_async_redis()
+    if redis is not None and session_ids:
+        await redis.delete(*(prefetch_key(session_id) for session_id in session_ids))
+
+
+class PrefetchToken(CancellationToken):
+    """
+    Cancellation check of a speculative prefetch.
+
+    The prefetch stops when its session is deleted, analyzed or given another
+    video, and yields the worker as soon as a real analysis waits on the CPU
+    queue. Pose landmarks extracted so far stay checkpointed, the analysis
+    resumes from them.
+    """
+
+    def __init__(self, session_id: int, video_url: str):
+        super().__init__(session_id)
+        self.video_url = video_url
+
+    def _check(self) -> bool:
+        if self.redis.get(prefetch_key(self.session_id)) != self.video_url:
+            return True
+        return self.redis.hlen(WAITING_JOBS_KEY) > 0
@@ -0,0 +1,262 @@
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from src.config import Config
+from src.db.model.enum import AnalysisStatus
+from src.db.redis import get_async_redis, get_redis
+from src.gait_sessions.report_stream import format_sse
+
+PROGRESS_KEY_PREFIX = "gait_progress"
+PROGRESS_KEEP_ALIVE_SECONDS = 15
+
+# The analysis (metrics and AI report) is over once one of these is reached
+TERMINAL_STATUSES = {
+    AnalysisStatus.Completed.value,
+    AnalysisStatus.Error.value,
+    AnalysisStatus.Cancelled.value,
+}
+
+
+def session_progress_channel(session_id: int) -> str:
+    return f"{PROGRESS_KEY_PREFIX}:session:{session_id}"
+
+
+def user_progress_channel(user_id: int) -> str:
+    return f"{PROGRESS_KEY_PREFIX}:user:{user_id}"
+
+
+def latest_progress_key(session_id: int) -> str:
+    return f"{PROGRESS_KEY_PREFIX}:latest:{session_id}"
+
+
+def progress_owner_key(session_id: int) -> str:
+    return f"{PROGRESS_KEY_PREFIX}:owner:{session_id}"
+
+
+async def set_progress_owner(session_id: int, user_id: Optional[int]) -> None:
+    """Remember which user started an analysis so it reaches their stream."""
+    redis = get_async_redis()
+    if redis is None or user_id is None:
+        return
+    try:
+        await redis.set(
+            progress_owner_key(session_id),
+            user_id,
+            ex=Config.PROGRESS_TTL_SECONDS,
+        )
+    except Exception as e:
+        print(f"Failed to store analysis owner: {str(e)}")
+
+
+class ProgressPublisher:
+    """
+    Publishes analysis progress of one session to Redis pub/sub.
+
+    Every update carries the status, current stage, frames processed out of
+    the total and an ETA for the stage. Updates go to the session channel and
+    to the channel of the user who started the analysis, and the latest one
+    is kept so new subscribers start from the current state. Frame updates
+    are throttled to `PROGRESS_MIN_INTERVAL_SECONDS`.
+
+    Publishing is synchronous so it can be called from the frame loops.
+    """
+
+    def __init__(
+        self, session_id: int, status: AnalysisStatus = AnalysisStatus.InProgress
+    ):
+        self.session_id = session_id
+        self.redis = get_redis()
+        self.state: Dict = {
+            "session_id": session_id,
+            "status": status.value,
+            "stage": None,
+            "frames_processed": None,
+            "frames_total": None,
+            "eta_seconds": None,
+        }
+        self.stage_started_at = time.monotonic()
+        self.last_published_at = 0.0
+        self.channels = [session_progress_channel(session_id)]
+        if self.redis is not None:
+            try:
+                owner = self.redis.get(progress_owner_key(session_id))
+                if owner is not None:
+                    self.channels.append(user_progress_channel(int(owner)))
+            except Exception as e:
+                print(f"Failed to load analysis owner: {str(e)}")
+
+    def _publish(self) -> None:
+        if self.redis is None:
+            return
+        self.last_published_at = time.monotonic()
+        message = json.dumps({**self.state, "updated_at": time.time()})
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(
+                latest_progress_key(self.session_id),
+                message,
+                ex=Config.PROGRESS_TTL_SECONDS,
+            )
+            for channel in self.channels:
+                pipe.publish(channel, message)
+            pipe.execute()
+        except Exception as e:
+            print(f"Failed to publish analysis progress: {str(e)}")
+
+    def status(self, status: AnalysisStatus) -> None:
+        self.state["status"] = status.value
+        if status != AnalysisStatus.InProgress:
+            self.state.update(frames_processed=None, frames_total=None, eta_seconds=None)
+        self._publish()
+
+    def stage(self, name: str) -> None:
+        self.stage_started_at = time.monotonic()
+        self.state.update(
+            stage=name, frames_processed=None, frames_total=None, eta_seconds=None
+        )
+        self._publish()
+
+    def frames(
+        self, processed: int, total: Optional[int], resumed_from: int = 0
+    ) -> None:
+        """Report frame progress of the current stage, estimating its ETA."""
+        done = processed == total
+        if not done and (
+            time.monotonic() - self.last_published_at
+            < Config.PROGRESS_MIN_INTERVAL_SECONDS
+        ):
+            return
+
+        eta = None
+        elapsed = time.monotonic() - self.stage_started_at
+        if total and processed > resumed_from and elapsed > 0:
+            rate = (processed - resumed_from) / elapsed
+            eta = round(max(total - processed, 0) / rate, 1)
+
+        self.state.update(frames_processed=processed, frames_total=total, eta_seconds=eta)
+        self._publish()
+
+
+async def publish_status(session_id: int, status: AnalysisStatus) -> None:
+    """
+    Publish a status change of a session, like `ProgressPublisher.status`
+    but through the async client, for the API and the worker coroutines.
+    """
+    redis = get_async_redis()
+    if redis is None:
+        return
+    message = json.dumps(
+        {
+            "session_id": session_id,
+            "status": status.value,
+            "stage": None,
+            "frames_processed": None,
+            "frames_total": None,
+            "eta_seconds": None,
+            "updated_at": time.time(),
+        }
+    )
+    try:
+        channels = [session_progress_channel(session_id)]
+        owner = await redis.get(progress_owner_key(session_id))
+        if owner is not None:
+            channels.append(user_progress_channel(int(owner)))
+        pipe = redis.pipeline()
+        pipe.set(
+            latest_progress_key(session_id), message, ex=Config.PROGRESS_TTL_SECONDS
+        )
+        for channel in channels:
+            pipe.publish(channel, message)
+        await pipe.execute()
+    except Exception as e:
+        print(f"Failed to publish analysis progress: {str(e)}")
+
+
+async def _latest_progress(redis, session_id: int) -> Optional[Dict]:
+    try:
+        latest = await redis.get(latest_progress_key(session_id))
+    except Exception:
+        return None
+    return json.loads(latest) if latest else None
+
+
+async def progress_events(
+    channels: List[str],
+    snapshots: Callable[[], Awaitable[List[Dict]]],
+    stop_on_terminal: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Yield SSE `progress` events for the given pub/sub channels.
+
+    Subscribes first and then sends the current state returned by
+    `snapshots`, so no update is lost in between. Every update is relayed
+    until `PROGRESS_STREAM_TIMEOUT_SECONDS` have passed or, with
+    `stop_on_terminal`, until the analysis reaches a terminal status.
+    """
+    redis = get_async_redis()
+    if redis is None:
+        for snapshot in await snapshots():
+            yield format_sse("progress", snapshot)
+        return
+
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(*channels)
+    try:
+        current = await snapshots()
+        for snapshot in current:
+            yield format_sse("progress", snapshot)
+        if stop_on_terminal and any(s["status"] in TERMINAL_STATUSES for s in current):
+            return
+
+        deadline = time.monotonic() + Config.PROGRESS_STREAM_TIMEOUT_SECONDS
+        last_sent_at = time.monotonic()
+        while time.monotonic() < deadline:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=1.0
+            )
+            if message is None:
+                # Keep the connection alive through proxies while waiting
+                if time.monotonic() - last_sent_at >= PROGRESS_KEEP_ALIVE_SECONDS:
+                    last_sent_at = time.monotonic()
+                    yield ": keep-alive\n\n"
+                continue
+
+            data = json.loads(message["data"])
+            last_sent_at = time.monotonic()
+            yield format_sse("progress", data)
+            if stop_on_terminal and data["status"] in TERMINAL_STATUSES:
+                return
+        yield format_sse("timeout", {})
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.aclose()
+
+
+async def session_progress_events(
+    session_id: int, status: AnalysisStatus
+) -> AsyncIterator[str]:
+    """Progress of a single session, ending once its analysis is over."""
+
+    async def snapshots() -> List[Dict]:
+        snapshot = {"session_id": session_id, "status": status.value}
+        if status.value in TERMINAL_STATUSES:
+            return [snapshot]
+        redis = get_async_redis()
+        latest = await _latest_progress(redis, session_id) if redis else None
+        return [latest or snapshot]
+
+    async for event in progress_events(
+        [session_progress_channel(session_id)], snapshots, stop_on_terminal=True
+    ):
+        yield event
+
+
+async def user_progress_events(user_id: int) -> AsyncIterator[str]:
+    """Progress of every analysis started by a user, multiplexed."""
+
+    async def snapshots() -> List[Dict]:
+        return []
+
+    async for event in progress_events([user_progress_channel(user_id)], snapshots):
+        yield event
@@ -0,0 +1,233 @@
+import hashlib
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+import aiohttp
+from sqlalchemy import text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import Config
+from src.db.model.injury import PatientInjury
+from src.db.model.medical_condition import PatientMedicalCondition
+from src.db.model.prosthetic import Prosthetic
+from src.db.models import GaitMetric, GaitPlotData, GaitSession, Patient
+from src.gait_sessions.pipeline_checkpoints import clear_session_checkpoints
+from src.gait_sessions.scheduling import remove_waiting_job
+
+CLOUDINARY_HOST = "res.cloudinary.com"
+CLOUDINARY_VERSION = re.compile(r"^v\d+$")
+
+# Rows of large child tables are deleted a batch per transaction, so the purge
+# never holds locks on many rows for long
+BATCH_DELETE_SQL = """
+DELETE FROM {table} WHERE id IN (
+    SELECT id FROM {table} WHERE {column} = ANY(:ids) LIMIT :limit
+)
+"""
+
+
+def cloudinary_asset(url: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Return the (resource type, public ID) of a file stored in our Cloudinary
+    cloud, or None for any other URL.
+    """
+    if not url:
+        return None
+    parsed = urlparse(url)
+    parts = [unquote(part) for part in parsed.path.split("/") if part]
+    # /<cloud name>/<resource type>/upload/[v<version>/]<public id>.<format>
+    if (
+        parsed.netloc != CLOUDINARY_HOST
+        or len(parts) < 4
+        or parts[0] != Config.CLOUD_NAME
+        or parts[2] != "upload"
+    ):
+        return None
+    path = parts[3:]
+    for index, part in enumerate(path):
+        if CLOUDINARY_VERSION.match(part):
+            path = path[index + 1 :]
+            break
+    if not path:
+        return None
+    # The format extension is not part of the public ID
+    if "." in path[-1]:
+        path[-1] = path[-1].rsplit(".", 1)[0]
+    return parts[1], "/".join(path)
+
+
+async def delete_cloudinary_asset(http: aiohttp.ClientSession, url: str) -> bool:
+    """
+    Delete a file from Cloudinary with a signed destroy request.
+
+    Returns whether the file is gone, which includes files already deleted
+    and URLs outside our cloud.
+    """
+    asset = cloudinary_asset(url)
+    if asset is None:
+        return True
+    resource_type, public_id = asset
+
+    timestamp = str(int(time.time()))
+    # Signed parameters in alphabetical order, followed by the API secret
+    signed = f"invalidate=true&public_id={public_id}&timestamp={timestamp}"
+    signature = hashlib.sha1(
+        f"{signed}{Config.CLOUDINARY_API_SECRET}".encode()
+    ).hexdigest()
+    endpoint = (
+        f"https://api.cloudinary.com/v1_1/{Config.CLOUD_NAME}/{resource_type}/destroy"
+    )
+    form = {
+        "public_id": public_id,
+        "invalidate": "true",
+        "timestamp": timestamp,
+        "api_key": Config.CLOUDINARY_API_KEY,
+        "signature": signature,
+    }
+    try:
+        async with http.post(endpoint, data=form) as response:
+            data = await response.json(content_type=None)
+            if response.status == 200 and data.get("result") in ("ok", "not found"):
+                return True
+            print(f"Failed to delete {url} from Cloudinary: {data}")
+    except Exception as e:
+        print(f"Failed to delete {url} from Cloudinary: {str(e)}")
+    return False
+
+
+async def delete_in_batches(
+    session: AsyncSession, model, column: str, ids: List[int]
+) -> int:
+    """Delete the rows of `model` whose `column` is one of `ids`, batch by batch."""
+    statement = text(
+        BATCH_DELETE_SQL.format(table=model.__tablename__, column=column)
+    )
+    deleted = 0
+    while True:
+        result = await session.execute(
+            statement, {"ids": ids, "limit": Config.PURGE_ROW_BATCH_SIZE}
+        )
+        await session.commit()
+        deleted += result.rowcount
+        if result.rowcount < Config.PURGE_ROW_BATCH_SIZE:
+            return deleted
+
+
+async def delete_artifacts(
+    http: Optional[aiohttp.ClientSession], urls: List[Optional[str]]
+) -> bool:
+    if http is None:
+        return True
+    deleted = True
+    for url in urls:
+        if url and not await delete_cloudinary_asset(http, url):
+            deleted = False
+    return deleted
+
+
+async def purge_deleted(session: AsyncSession) -> Dict:
+    """
+    Remove soft-deleted sessions and patients with everything they own.
+
+    Child rows go first in set-based batches, then the stored videos and
+    images, then the sessions and patients themselves. A session or patient
+    whose files could not be deleted keeps its row, so its URLs are not lost
+    and a later purge tries again. Without Cloudinary API credentials stored
+    files are left in place.
+
+    Returns:
+        dict: Number of rows removed, and of rows whose files could not be
+            deleted
+    """
+    summary = {
+        "sessions": 0,
+        "patients": 0,
+        "plot_rows": 0,
+        "metric_rows": 0,
+        "artifact_failures": 0,
+    }
+    http = None
+    if Config.CLOUDINARY_API_KEY and Config.CLOUDINARY_API_SECRET:
+        http = aiohttp.ClientSession()
+    else:
+        print("Cloudinary API credentials missing, stored files are not deleted")
+
+    try:
+        failed = set()
+        while True:
+            statement = (
+                select(
+                    GaitSession.id,
+                    GaitSession.video_url,
+                    GaitSession.annotated_video_url,
+                )
+                .where(GaitSession.deleted_at.is_not(None))
+                .order_by(GaitSession.id)
+                .limit(Config.PURGE_SESSION_BATCH_SIZE)
+            )
+            if failed:
+                statement = statement.where(GaitSession.id.not_in(failed))
+            rows = (await session.exec(statement)).all()
+            if not rows:
+                break
+
+            ids = [row.id for row in rows]
+            summary["plot_rows"] += await delete_in_batches(
+                session, GaitPlotData, "gait_session_id", ids
+            )
+            summary["metric_rows"] += await delete_in_batches(
+                session, GaitMetric, "gait_session_id", ids
+            )
+
+            purged = []
+            for row in rows:
+                if await delete_artifacts(
+                    http, [row.annotated_video_url, row.video_url]
+                ):
+                    purged.append(row.id)
+                else:
+                    failed.add(row.id)
+            if purged:
+                await session.execute(
+                    text("DELETE FROM gait_session WHERE id = ANY(:ids)"),
+                    {"ids": purged},
+                )
+                await session.commit()
+            for session_id in purged:
+                clear_session_checkpoints(session_id)
+                await remove_waiting_job(session_id)
+            summary["sessions"] += len(purged)
+
+        # Patients go once every one of their sessions is gone
+        result = await session.exec(
+            select(Patient.id, Patient.image_url).where(
+                Patient.deleted_at.is_not(None),
+                ~select(GaitSession.id)
+                .where(GaitSession.patient_id == Patient.id)
+                .exists(),
+            )
+        )
+        ids = []
+        failed_patients = 0
+        for patient in result.all():
+            if await delete_artifacts(http, [patient.image_url]):
+                ids.append(patient.id)
+            else:
+                failed_patients += 1
+        if ids:
+            for model in (PatientMedicalCondition, PatientInjury, Prosthetic):
+                await delete_in_batches(session, model, "patient_id", ids)
+            await session.execute(
+                text("DELETE FROM patient WHERE id = ANY(:ids)"), {"ids": ids}
+            )
+            await session.commit()
+        summary["patients"] = len(ids)
+        summary["artifact_failures"] = len(failed) + failed_patients
+    finally:
+        if http is not None:
+            await http.close()
+
+    return summary
@@ -0,0 +1,378 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import defaultdict
+from typing import Dict
+
+from sqlalchemy import text
+
+from src.db.main import get_session
+from src.db.redis import get_async_redis
+from src.gait_sessions.celery_jobs import (
+    CPU_QUEUE,
+    IO_QUEUE,
+    LOCAL_RUNNER_POOLS,
+    celery_app,
+)
+from src.gait_sessions.job_runner import create_job_runner
+from src.gait_sessions.report_batch import summarize_latencies
+from src.gait_sessions.scheduling import PRIORITY_DEFAULT, job_priority
+from src.gait_sessions.worker_resources import (
+    get_worker_resources,
+    run_async,
+    run_cpu_bound,
+)
+
+# Hashing releases the GIL on large buffers, like native pose inference
+HASH_BLOCK = bytes(1 << 20)
+
+
+@celery_app.task
+def benchmark_cpu_task(seconds: float) -> float:
+    """Keep a core busy for `seconds`, standing in for pose extraction."""
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return time.time()
+
+
+@celery_app.task
+def benchmark_io_task(seconds: float) -> float:
+    """Wait for `seconds`, standing in for downloads, uploads and LLM calls."""
+    time.sleep(seconds)
+    return time.time()
+
+
+def _hash_for(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        hashlib.sha256(HASH_BLOCK).digest()
+
+
+@celery_app.task
+def benchmark_analysis_task(
+    io_seconds: float, cpu_seconds: float, inline_cpu: bool = False
+) -> float:
+    """
+    Stand in for an analysis: wait on a download, compute, wait on an upload.
+
+    The compute runs on the inference thread, or with `inline_cpu` on the
+    event loop as the pipeline stages used to.
+    """
+    return run_async(_benchmark_analysis(io_seconds, cpu_seconds, inline_cpu))
+
+
+async def _benchmark_analysis(
+    io_seconds: float, cpu_seconds: float, inline_cpu: bool
+) -> float:
+    await asyncio.sleep(io_seconds / 2)
+    if inline_cpu:
+        _hash_for(cpu_seconds)
+    else:
+        await run_cpu_bound(_hash_for, cpu_seconds)
+    await asyncio.sleep(io_seconds / 2)
+    return time.time()
+
+
+@celery_app.task
+def benchmark_worker_resources_task() -> Dict:
+    """Run a short query and Redis round trip on the worker's resources."""
+    started_at = time.perf_counter()
+    checked_out = run_async(_probe_worker_resources())
+    resources = get_worker_resources()
+    return {
+        "pid": os.getpid(),
+        "loop": id(resources.loop),
+        "engine": id(resources.engine),
+        "tasks_run": resources.tasks_run,
+        "connections_checked_out": checked_out,
+        "connections_left_open": resources.connections_checked_out(),
+        "seconds": time.perf_counter() - started_at,
+    }
+
+
+async def _probe_worker_resources() -> int:
+    async for session in get_session():
+        await session.exec(text("SELECT 1"))
+        checked_out = get_worker_resources().connections_checked_out()
+    redis = get_async_redis()
+    if redis is not None:
+        await redis.ping()
+    return checked_out
+
+
+def run_worker_stress(tasks: int, queue: str = IO_QUEUE, timeout: float = 600) -> Dict:
+    """
+    Submit many short tasks touching the database and Redis, and check that
+    every worker process reused one event loop and one engine for all of
+    them without leaking connections.
+
+    Run it against a worker started with `--concurrency=1` to put every task
+    through the same process.
+
+    Returns:
+        dict: Failures, per-process loop and engine reuse, and task durations
+    """
+    results = [
+        benchmark_worker_resources_task.apply_async(queue=queue) for _ in range(tasks)
+    ]
+
+    failures = []
+    durations = []
+    per_process = defaultdict(
+        lambda: {"tasks": 0, "loops": set(), "engines": set(), "max_checked_out": 0}
+    )
+    leaked = 0
+    for result in results:
+        try:
+            probe = result.get(timeout=timeout)
+        except Exception as e:
+            failures.append(str(e))
+            continue
+        process = per_process[probe["pid"]]
+        process["tasks"] += 1
+        process["loops"].add(probe["loop"])
+        process["engines"].add(probe["engine"])
+        process["max_checked_out"] = max(
+            process["max_checked_out"], probe["connections_checked_out"]
+        )
+        leaked = max(leaked, probe["connections_left_open"])
+        durations.append(probe["seconds"])
+
+    processes = {
+        pid: {
+            "tasks": process["tasks"],
+            "event_loops": len(process["loops"]),
+            "engines": len(process["engines"]),
+            "max_connections_checked_out": process["max_checked_out"],
+        }
+        for pid, process in per_process.items()
+    }
+    return {
+        "tasks": tasks,
+        "failed": len(failures),
+        "errors": sorted(set(failures))[:10],
+        "processes": processes,
+        "resources_reused": all(
+            p["event_loops"] == 1 and p["engines"] == 1 for p in processes.values()
+        ),
+        "max_connections_left_open": leaked,
+        "task_seconds": summarize_latencies(durations),
+    }
+
+
+def run_queue_benchmark(
+    cpu_jobs: int,
+    io_jobs: int,
+    cpu_seconds: float,
+    io_seconds: float,
+    single_queue: bool = False,
+    timeout: float = 3600,
+) -> Dict:
+    """
+    Submit a mixed workload to the running workers and measure, per kind of
+    job, the latency from submission to completion.
+
+    With `single_queue` every job is sent to the CPU queue, reproducing the
+    previous setup where one worker handled all tasks. Latencies use the
+    worker clocks, so the workers and this process should share a host clock.
+
+    Returns:
+        dict: Total throughput and the latency distribution per kind of job
+    """
+    io_queue = CPU_QUEUE if single_queue else IO_QUEUE
+    submitted = []
+    started_at = time.time()
+
+    # Interleave the jobs so quick ones arrive behind long ones
+    for i in range(max(cpu_jobs, io_jobs)):
+        if i < cpu_jobs:
+            result = benchmark_cpu_task.apply_async((cpu_seconds,), queue=CPU_QUEUE)
+            submitted.append(("cpu", time.time(), result))
+        if i < io_jobs:
+            result = benchmark_io_task.apply_async((io_seconds,), queue=io_queue)
+            submitted.append(("io", time.time(), result))
+
+    latencies = {"cpu": [], "io": []}
+    finished_at = started_at
+    for kind, submitted_at, result in submitted:
+        done_at = result.get(timeout=timeout)
+        latencies[kind].append(done_at - submitted_at)
+        finished_at = max(finished_at, done_at)
+
+    elapsed = finished_at - started_at
+    return {
+        "queues": [CPU_QUEUE] if single_queue else [CPU_QUEUE, IO_QUEUE],
+        "jobs": len(submitted),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": (
+            round(len(submitted) / elapsed, 3) if elapsed > 0 else None
+        ),
+        "cpu_latency_seconds": summarize_latencies(latencies["cpu"]),
+        "io_latency_seconds": summarize_latencies(latencies["io"]),
+    }
+
+
+def run_scheduling_benchmark(
+    short_jobs: int,
+    long_jobs: int,
+    short_seconds: float,
+    long_seconds: float,
+    fifo: bool = False,
+    cost_scale: float = 30.0,
+    timeout: float = 3600,
+) -> Dict:
+    """
+    Submit short and long CPU jobs, long ones first, and measure the mean
+    completion time (from submission to completion) under shortest job first
+    or, with `fifo`, with every job at the same priority.
+
+    Each benchmark second stands for `cost_scale` seconds of analysis when
+    ranking the jobs, so short runs map to realistic priorities. Jobs are all
+    submitted at once, so none of them age during the benchmark.
+
+    Returns:
+        dict: Mean completion time and its distribution per kind of job
+    """
+    jobs = [("long", long_seconds)] * long_jobs + [("short", short_seconds)] * short_jobs
+    submitted = []
+    started_at = time.time()
+    for kind, seconds in jobs:
+        priority = (
+            PRIORITY_DEFAULT
+            if fifo
+            else job_priority(PRIORITY_DEFAULT, seconds * cost_scale)
+        )
+        result = benchmark_cpu_task.apply_async(
+            (seconds,), queue=CPU_QUEUE, priority=priority
+        )
+        submitted.append((kind, time.time(), result))
+
+    completion = {"short": [], "long": []}
+    finished_at = started_at
+    for kind, submitted_at, result in submitted:
+        done_at = result.get(timeout=timeout)
+        completion[kind].append(done_at - submitted_at)
+        finished_at = max(finished_at, done_at)
+
+    every_job = completion["short"] + completion["long"]
+    return {
+        "scheduling": "fifo" if fifo else "shortest_job_first",
+        "jobs": len(submitted),
+        "elapsed_seconds": round(finished_at - started_at, 3),
+        "mean_completion_seconds": (
+            round(sum(every_job) / len(every_job), 3) if every_job else None
+        ),
+        "short_completion_seconds": summarize_latencies(completion["short"]),
+        "long_completion_seconds": summarize_latencies(completion["long"]),
+    }
+
+
+def run_runner_benchmark(
+    runner: str,
+    jobs: int,
+    seconds: float = 0.0,
+    kind: str = "io",
+    timeout: float = 600,
+) -> Dict:
+    """
+    Submit jobs through a job runner and measure the latency from submission
+    to completion.
+
+    With the Celery runner the workers must be running. The local runner
+    executes the jobs in process pools of this process, so compare both on
+    the same host. With the default jobs of zero seconds the latency is the
+    overhead of the runner itself.
+
+    Returns:
+        dict: Throughput and the latency distribution of the jobs
+    """
+    return asyncio.run(_runner_benchmark(runner, jobs, seconds, kind, timeout))
+
+
+async def _runner_benchmark(
+    runner: str, jobs: int, seconds: float, kind: str, timeout: float
+) -> Dict:
+    job_runner = create_job_runner(celery_app, LOCAL_RUNNER_POOLS, runner)
+    task = benchmark_cpu_task if kind == "cpu" else benchmark_io_task
+    await job_runner.start()
+    try:
+        submitted = []
+        started_at = time.time()
+        for _ in range(jobs):
+            submitted_at = time.time()
+            task_id = await job_runner.enqueue(task.name, (seconds,))
+            submitted.append((submitted_at, task_id))
+
+        latencies = []
+        finished_at = started_at
+        for submitted_at, task_id in submitted:
+            done_at = await job_runner.wait(task_id, timeout)
+            latencies.append(done_at - submitted_at)
+            finished_at = max(finished_at, done_at)
+    finally:
+        await job_runner.stop()
+
+    elapsed = finished_at - started_at
+    return {
+        "runner": runner,
+        "kind": kind,
+        "jobs": len(submitted),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_per_second": (
+            round(len(submitted) / elapsed, 3) if elapsed > 0 else None
+        ),
+        "latency_seconds": summarize_latencies(latencies),
+    }
+
+
+def run_overlap_benchmark(
+    jobs: int,
+    io_seconds: float,
+    cpu_seconds: float,
+    inline_cpu: bool = False,
+    queue: str = CPU_QUEUE,
+    timeout: float = 3600,
+) -> Dict:
+    """
+    Submit analyses mixing I/O waits and compute to one worker process and
+    measure the throughput.
+
+    Run it against a worker started with `-P threads --concurrency=<jobs>`,
+    so the jobs share the process's event loop and inference thread. With
+    the compute offloaded, the inference thread stays busy while other jobs
+    wait on I/O, and the elapsed time tends to `jobs * cpu_seconds` instead
+    of `jobs * (io_seconds + cpu_seconds)`. Compare with `inline_cpu`, or
+    with a worker started with `--concurrency=1`.
+
+    Returns:
+        dict: Throughput, inference thread utilization and job latencies
+    """
+    submitted = []
+    started_at = time.time()
+    for _ in range(jobs):
+        result = benchmark_analysis_task.apply_async(
+            (io_seconds, cpu_seconds, inline_cpu), queue=queue
+        )
+        submitted.append((time.time(), result))
+
+    latencies = []
+    finished_at = started_at
+    for submitted_at, result in submitted:
+        done_at = result.get(timeout=timeout)
+        latencies.append(done_at - submitted_at)
+        finished_at = max(finished_at, done_at)
+
+    elapsed = finished_at - started_at
+    return {
+        "cpu": "inline" if inline_cpu else "offloaded",
+        "jobs": jobs,
+        "elapsed_seconds": round(elapsed, 3),
+        "sequential_seconds": round(jobs * (io_seconds + cpu_seconds), 3),
+        "throughput_per_second": round(jobs / elapsed, 3) if elapsed > 0 else None,
+        "inference_utilization": (
+            round(jobs * cpu_seconds / elapsed, 3) if elapsed > 0 else None
+        ),
+        "latency_seconds": summarize_latencies(latencies),
+    }
@@ -0,0 +1,86 @@
+import json
+from typing import Dict, Optional
+
+from src.config import Config
+from src.db.model.enum import AnalysisStatus
+from src.db.redis import get_async_redis
+
+REANALYSIS_KEY_PREFIX = "gait_reanalysis"
+REANALYSIS_JOB_KEY_PREFIX = "gait_reanalysis_job"
+REANALYSIS_TASK_NAME = "src.gait_sessions.reanalysis_tasks.reanalyze_sessions_task"
+
+
+def reanalysis_key(session_id: int) -> str:
+    return f"{REANALYSIS_KEY_PREFIX}:{session_id}"
+
+
+def reanalysis_job_key(job_id: str) -> str:
+    return f"{REANALYSIS_JOB_KEY_PREFIX}:{job_id}"
+
+
+async def mark_reanalysis(session_id: int, previous_status: AnalysisStatus) -> None:
+    """
+    Remember that a session with stored results is being analyzed again.
+
+    Its results are only replaced once the new analysis succeeds, so if it
+    fails or is cancelled the session goes back to `previous_status`.
+    """
+    redis = get_async_redis()
+    if redis is None:
+        return
+    key = reanalysis_key(session_id)
+    pipe = redis.pipeline()
+    pipe.delete(key)
+    pipe.hset(key, "previous_status", previous_status.value)
+    pipe.expire(key, Config.REANALYSIS_TTL_SECONDS)
+    await pipe.execute()
+
+
+async def clear_reanalysis(session_id: int) -> None:
+    redis = get_async_redis()
+    if redis is not None:
+        await redis.delete(reanalysis_key(session_id))
+
+
+async def finish_reanalysis(session_id: int, outcome: str) -> Optional[AnalysisStatus]:
+    """
+    Record the outcome of a re-analysis, keeping the first one recorded.
+
+    Returns the status the session had before, which failed and cancelled
+    re-analyses restore, or None if the session was not being re-analyzed.
+    """
+    redis = get_async_redis()
+    if redis is None:
+        return None
+    key = reanalysis_key(session_id)
+    previous_status = await redis.hget(key, "previous_status")
+    if previous_status is None:
+        return None
+    await redis.hsetnx(key, "outcome", outcome)
+    return AnalysisStatus(previous_status)
+
+
+async def reanalysis_outcome(session_id: int) -> Optional[str]:
+    redis = get_async_redis()
+    if redis is None:
+        return None
+    return await redis.hget(reanalysis_key(session_id), "outcome")
+
+
+async def save_reanalysis_job(progress: Dict) -> None:
+    """Store the progress of a bulk re-analysis so it can be polled."""
+    redis = get_async_redis()
+    if redis is not None:
+        await redis.set(
+            reanalysis_job_key(progress["job_id"]),
+            json.dumps(progress),
+            ex=Config.REANALYSIS_TTL_SECONDS,
+        )
+
+
+async def load_reanalysis_job(job_id: str) -> Optional[Dict]:
+    redis = get_async_redis()
+    if redis is None:
+        return None
+    progress = await redis.get(reanalysis_job_key(job_id))
+    return json.loads(progress) if progress else None
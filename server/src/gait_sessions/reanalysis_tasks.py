@@ -0,0 +1,32 @@
+from typing import Dict
+
+from src.db.main import get_session
+from src.gait_sessions.celery_jobs import PRIORITY_BATCH, celery_app
+from src.gait_sessions.reanalysis import REANALYSIS_TASK_NAME
+from src.gait_sessions.schema import GaitSessionReanalysisModel
+from src.gait_sessions.service import GaitSessionsService
+from src.gait_sessions.worker_resources import run_async
+
+gait_sessions_service = GaitSessionsService()
+
+
+@celery_app.task(name=REANALYSIS_TASK_NAME, priority=PRIORITY_BATCH)
+def reanalyze_sessions_task(job_id: str, filters: Dict):
+    """
+    Celery task analyzing many existing sessions again, throttled.
+
+    Args:
+        job_id (str): ID under which the progress is stored
+        filters (dict): Selection and throttling, see GaitSessionReanalysisModel
+
+    Returns:
+        dict: Final counts of the re-analysis
+    """
+    return run_async(_reanalyze_sessions(job_id, GaitSessionReanalysisModel(**filters)))
+
+
+async def _reanalyze_sessions(job_id: str, filters: GaitSessionReanalysisModel):
+    async for session in get_session():
+        return await gait_sessions_service.reanalyze_sessions(
+            filters, session, job_id=job_id
+        )
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import update
+from sqlalchemy.orm import noload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import Config
+from src.db.main import get_session
+from src.db.models import GaitSession
+from src.db.model.enum import AnalysisStatus
+from src.gait_sessions.gait_analysis_pipeline import (
+    GaitAnalysisOutput,
+    GaitAnalysisPipeline,
+)
+from src.gait_sessions.progress import publish_status
+from src.gait_sessions.reanalysis import finish_reanalysis
+
+REPORT_BATCH_PERSIST_SIZE = 500
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """Summarize per-item latencies (seconds) as a distribution."""
+    if not latencies:
+        return {"count": 0}
+    values = np.array(latencies)
+    return {
+        "count": len(latencies),
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p90": round(float(np.percentile(values, 90)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+async def load_report_jobs(
+    session: AsyncSession,
+    session_ids: Optional[List[int]] = None,
+    include_completed: bool = False,
+    limit: Optional[int] = None,
+) -> List[GaitSession]:
+    """Select the sessions whose AI report should be (re)generated."""
+    statuses = [AnalysisStatus.MetricsReady]
+    if include_completed:
+        statuses.append(AnalysisStatus.Completed)
+
+    statement = (
+        select(GaitSession)
+        .options(noload(GaitSession.gait_plot_data))
+        .where(
+            GaitSession.analysis_status.in_(statuses),
+            GaitSession.deleted_at.is_(None),
+        )
+        .order_by(GaitSession.id)
+    )
+    if session_ids:
+        statement = statement.where(GaitSession.id.in_(session_ids))
+    if limit:
+        statement = statement.limit(limit)
+
+    result = await session.exec(statement)
+    return [s for s in result.all() if s.gait_metrics]
+
+
+async def persist_reports(
+    session: AsyncSession, reports: Dict[int, GaitAnalysisOutput]
+) -> None:
+    """Store generated reports with bulk UPDATEs in a single transaction."""
+    rows = [
+        {
+            "id": session_id,
+            "detailed_ai_analysis": report.detailed_analysis,
+            "summarized_ai_analysis": report.summary,
+            "recommendations": report.recommendations,
+            "possible_abnormalities": report.possible_abnormalities,
+            "recommended_exercises": report.recommended_exercises,
+            "long_term_risks": report.long_term_risks,
+            "analysis_status": AnalysisStatus.Completed,
+        }
+        for session_id, report in reports.items()
+    ]
+    for start in range(0, len(rows), REPORT_BATCH_PERSIST_SIZE):
+        await session.execute(
+            update(GaitSession), rows[start : start + REPORT_BATCH_PERSIST_SIZE]
+        )
+    await session.commit()
+    for session_id in reports:
+        await finish_reanalysis(session_id, "succeeded")
+        await publish_status(session_id, AnalysisStatus.Completed)
+
+
+async def generate_reports_batch(
+    pipeline: GaitAnalysisPipeline,
+    session_ids: Optional[List[int]] = None,
+    include_completed: bool = False,
+    concurrency: int = Config.REPORT_BATCH_CONCURRENCY,
+    limit: Optional[int] = None,
+    use_cache: bool = True,
+) -> Dict:
+    """
+    Generate AI reports for many sessions with bounded concurrency.
+
+    Pending jobs are collected in one query, sent to the LLM at most
+    `concurrency` at a time, mapped back to their sessions and persisted in
+    bulk once all of them have finished.
+
+    Returns:
+        dict: Counts, failures, throughput, the per-item latency distribution
+            and the LLM rate limiter wait-time metrics
+    """
+    async for session in get_session():
+        gait_sessions = await load_report_jobs(
+            session, session_ids, include_completed, limit
+        )
+        # Release the connection while waiting for the LLM
+        await session.commit()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+        reports: Dict[int, GaitAnalysisOutput] = {}
+        failures: Dict[int, str] = {}
+
+        async def run_job(gait_session: GaitSession) -> None:
+            async with semaphore:
+                started_at = time.perf_counter()
+                try:
+                    reports[gait_session.id] = await pipeline.generate_report(
+                        gait_session, use_cache=use_cache
+                    )
+                    latencies.append(time.perf_counter() - started_at)
+                except Exception as e:
+                    failures[gait_session.id] = str(e)
+
+        started_at = time.perf_counter()
+        await asyncio.gather(*(run_job(s) for s in gait_sessions))
+        elapsed = time.perf_counter() - started_at
+
+        if reports:
+            await persist_reports(session, reports)
+
+        return {
+            "status": "completed",
+            "requested": len(gait_sessions),
+            "succeeded": len(reports),
+            "failed": failures,
+            "elapsed_seconds": round(elapsed, 3),
+            "throughput_per_second": (
+                round(len(reports) / elapsed, 3) if elapsed > 0 else None
+            ),
+            "latency_seconds": summarize_latencies(latencies),
+            "llm_limiter": await pipeline.llm_limiter.stats(),
+        }
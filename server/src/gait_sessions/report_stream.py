@@ -0,0 +1,225 @@
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict
+
+from src.config import Config
+from src.db.model.enum import AnalysisStatus
+from src.db.model.gait_session import GaitSession
+from src.db.redis import get_async_redis
+
+REPORT_STREAM_KEY_PREFIX = "gait_report_stream"
+REPORT_STREAM_FIELD = "detailed_analysis"
+REPLAY_CHUNK_SIZE = 64
+
+JSON_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+def report_stream_key(session_id: int) -> str:
+    return f"{REPORT_STREAM_KEY_PREFIX}:{session_id}"
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Format a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JsonStringFieldExtractor:
+    """
+    Incrementally extract the value of one string field from a JSON document
+    that arrives in chunks, decoding escape sequences as they complete.
+    """
+
+    def __init__(self, field: str = REPORT_STREAM_FIELD):
+        self.marker = f'"{field}"'
+        self.buffer = ""
+        self.state = "search"
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the newly decoded part of the field value."""
+        self.buffer += chunk
+
+        while self.state == "search":
+            idx = self.buffer.find(self.marker)
+            if idx == -1:
+                # Keep a tail long enough to match a marker split across chunks
+                self.buffer = self.buffer[-len(self.marker) :]
+                return ""
+            rest = self.buffer[idx + len(self.marker) :].lstrip()
+            if not rest or rest == ":" or (rest[0] == ":" and not rest[1:].strip()):
+                self.buffer = self.buffer[idx:]
+                return ""
+            if rest[0] != ":" or not rest[1:].lstrip().startswith('"'):
+                # The marker was not a key (e.g. quoted inside another value)
+                self.buffer = rest
+                continue
+            self.buffer = rest[1:].lstrip()[1:]
+            self.state = "value"
+
+        if self.state != "value":
+            return ""
+
+        out = []
+        buf = self.buffer
+        i = 0
+        while i < len(buf):
+            c = buf[i]
+            if c == '"':
+                self.state = "done"
+                i += 1
+                break
+            if c != "\\":
+                out.append(c)
+                i += 1
+                continue
+            if i + 1 >= len(buf):
+                break
+            escape = buf[i + 1]
+            if escape != "u":
+                out.append(JSON_ESCAPES.get(escape, escape))
+                i += 2
+                continue
+            if i + 6 > len(buf):
+                break
+            code = int(buf[i + 2 : i + 6], 16)
+            if 0xD800 <= code <= 0xDBFF:
+                # High surrogate, wait for the matching low surrogate
+                if i + 12 > len(buf):
+                    break
+                low = int(buf[i + 8 : i + 12], 16)
+                code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                i += 6
+            out.append(chr(code))
+            i += 6
+        self.buffer = buf[i:]
+        return "".join(out)
+
+
+class ReportStreamPublisher:
+    """
+    Publishes the `detailed_analysis` text of a report to a Redis stream while
+    the LLM response is being generated.
+    """
+
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.key = report_stream_key(session_id)
+        self.redis = get_async_redis()
+        self.extractor = JsonStringFieldExtractor()
+
+    async def _publish(self, event: str, data: Dict) -> None:
+        if self.redis is None:
+            return
+        try:
+            await self.redis.xadd(
+                self.key,
+                {"event": event, "data": json.dumps(data)},
+                maxlen=Config.REPORT_STREAM_MAX_EVENTS,
+                approximate=True,
+            )
+            await self.redis.expire(self.key, Config.REPORT_STREAM_TTL_SECONDS)
+        except Exception as e:
+            print(f"Failed to publish report stream event: {str(e)}")
+
+    async def start(self) -> None:
+        """
+        Drop the events of a previous generation, which subscribers replay
+        from the start of the stream.
+        """
+        if self.redis is None:
+            return
+        try:
+            await self.redis.delete(self.key)
+        except Exception as e:
+            print(f"Failed to clear report stream: {str(e)}")
+
+    async def reset(self) -> None:
+        """Signal that generation restarted and previously sent text is void."""
+        self.extractor = JsonStringFieldExtractor()
+        await self._publish("reset", {})
+
+    async def feed(self, raw_chunk: str) -> None:
+        """Feed a raw LLM response chunk and publish any newly decoded text."""
+        text = self.extractor.feed(raw_chunk)
+        if text:
+            await self._publish("token", {"text": text})
+
+    async def publish_text(self, text: str) -> None:
+        """Publish already decoded text, e.g. a cached report."""
+        for start in range(0, len(text), REPLAY_CHUNK_SIZE):
+            await self._publish("token", {"text": text[start : start + REPLAY_CHUNK_SIZE]})
+
+    async def fail(self, message: str) -> None:
+        await self._publish("error", {"message": message})
+
+    async def complete(self) -> None:
+        await self._publish("done", {"status": AnalysisStatus.Completed.value})
+
+
+async def replay_report_events(gait_session: GaitSession) -> AsyncIterator[str]:
+    """Replay a stored report as SSE token events."""
+    text = gait_session.detailed_ai_analysis or ""
+    for start in range(0, len(text), REPLAY_CHUNK_SIZE):
+        yield format_sse("token", {"text": text[start : start + REPLAY_CHUNK_SIZE]})
+    yield format_sse("done", {"status": gait_session.analysis_status.value})
+
+
+async def report_events(gait_session: GaitSession) -> AsyncIterator[str]:
+    """
+    Yield SSE events for a session's detailed AI analysis.
+
+    Completed reports are replayed from the database. Reports that are still
+    being generated are relayed from the Redis stream written by the report
+    task, starting from its first event so late subscribers see the full text.
+    """
+    if gait_session.analysis_status == AnalysisStatus.Completed:
+        async for event in replay_report_events(gait_session):
+            yield event
+        return
+
+    redis = get_async_redis()
+    if redis is None or gait_session.analysis_status not in (
+        AnalysisStatus.Pending,
+        AnalysisStatus.InProgress,
+        AnalysisStatus.MetricsReady,
+    ):
+        yield format_sse("status", {"status": gait_session.analysis_status.value})
+        return
+
+    key = report_stream_key(gait_session.id)
+    last_id = "0"
+    deadline = time.monotonic() + Config.REPORT_STREAM_TIMEOUT_SECONDS
+    yield format_sse("status", {"status": gait_session.analysis_status.value})
+
+    while time.monotonic() < deadline:
+        try:
+            response = await redis.xread({key: last_id}, block=15000, count=100)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            yield format_sse("error", {"message": str(e)})
+            return
+
+        if not response:
+            # Keep the connection alive through proxies while waiting
+            yield ": keep-alive\n\n"
+            continue
+
+        for _, entries in response:
+            for entry_id, fields in entries:
+                last_id = entry_id
+                event = fields["event"]
+                yield f"event: {event}\ndata: {fields['data']}\n\n"
+                if event == "done":
+                    return
+
+    yield format_sse("timeout", {})
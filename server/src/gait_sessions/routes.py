@@ -1,24 +1,32 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, Header, Query, status
+from fastapi.responses import StreamingResponse
 from sqlmodel.ext.asyncio.session import AsyncSession
 
 from src.utils import PaginatedResponse
 from src.db.main import get_session
 from src.gait_sessions.service import GaitSessionsService
 from src.gait_sessions.schema import (
+    GaitSessionAnalysisBatchCreateModel,
+    GaitSessionAnalysisBatchModel,
+    GaitSessionAnalyzeResponseModel,
     GaitSessionCreateModel,
     GaitSessionListResponseModel,
+    GaitSessionReanalysisJobModel,
+    GaitSessionReanalysisModel,
     GaitSessionResponseModel,
     GaitSessionUpdateModel,
 )
 from src.auth.dependencies import (
     AccessTokenBearer,
+    RoleChecker,
 )
 
 gait_sessions_router = APIRouter()
 gait_sessions_service = GaitSessionsService()
 
 access_token_bearer = AccessTokenBearer()
+admin_role_checker = RoleChecker(["admin"])
 
 
 @gait_sessions_router.get(
@@ -52,6 +60,58 @@ async def create_gait_session(
     return await gait_sessions_service.create_gait_session(gait_session_data, session)
 
 
+@gait_sessions_router.post(
+    "/analysis-batches",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=GaitSessionAnalysisBatchModel,
+)
+async def analyze_gait_sessions(
+    batch_data: GaitSessionAnalysisBatchCreateModel,
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+) -> GaitSessionAnalysisBatchModel:
+    return await gait_sessions_service.start_analysis_batch(
+        batch_data, session, token_details["user"].get("id")
+    )
+
+
+@gait_sessions_router.get(
+    "/analysis-batches/{batch_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=GaitSessionAnalysisBatchModel,
+)
+async def get_gait_sessions_analysis_batch(
+    batch_id: str,
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+) -> GaitSessionAnalysisBatchModel:
+    return await gait_sessions_service.get_analysis_batch(batch_id, session)
+
+
+@gait_sessions_router.post(
+    "/reanalysis",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=GaitSessionReanalysisJobModel,
+)
+async def reanalyze_gait_sessions(
+    filters: GaitSessionReanalysisModel,
+    _: bool = Depends(admin_role_checker),
+) -> GaitSessionReanalysisJobModel:
+    return await gait_sessions_service.start_reanalysis_job(filters)
+
+
+@gait_sessions_router.get(
+    "/reanalysis/{job_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=GaitSessionReanalysisJobModel,
+)
+async def get_gait_sessions_reanalysis(
+    job_id: str,
+    _: bool = Depends(admin_role_checker),
+) -> GaitSessionReanalysisJobModel:
+    return await gait_sessions_service.get_reanalysis_job(job_id)
+
+
 @gait_sessions_router.get(
     "/{gait_session_id}",
     status_code=status.HTTP_200_OK,
@@ -84,14 +144,85 @@ async def update_gait_session(
 @gait_sessions_router.patch(
     "/{gait_session_id}/analyze",
     status_code=status.HTTP_200_OK,
-    response_model=GaitSessionResponseModel,
+    response_model=GaitSessionAnalyzeResponseModel,
 )
 async def analyze_gait_session(
+    gait_session_id: int,
+    session: AsyncSession = Depends(get_session),
+    token_details: dict = Depends(access_token_bearer),
+    idempotency_key: Optional[str] = Header(default=None, alias="Idempotency-Key"),
+) -> GaitSessionAnalyzeResponseModel:
+    return await gait_sessions_service.start_gait_analysis(
+        gait_session_id,
+        session,
+        token_details["user"].get("id"),
+        idempotency_key,
+    )
+
+
+@gait_sessions_router.patch(
+    "/{gait_session_id}/cancel",
+    status_code=status.HTTP_200_OK,
+    response_model=GaitSessionResponseModel,
+)
+async def cancel_gait_session_analysis(
     gait_session_id: int,
     session: AsyncSession = Depends(get_session),
     _: dict = Depends(access_token_bearer),
 ) -> GaitSessionResponseModel:
-    return await gait_sessions_service.start_gait_analysis(gait_session_id, session)
+    return await gait_sessions_service.cancel_gait_analysis(gait_session_id, session)
+
+
+@gait_sessions_router.get(
+    "/progress/stream",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def stream_user_analysis_progress(
+    token_details: dict = Depends(access_token_bearer),
+) -> StreamingResponse:
+    events = gait_sessions_service.stream_user_progress(token_details["user"]["id"])
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@gait_sessions_router.get(
+    "/{gait_session_id}/progress/stream",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def stream_gait_session_progress(
+    gait_session_id: int,
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+) -> StreamingResponse:
+    events = await gait_sessions_service.stream_gait_progress(gait_session_id, session)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@gait_sessions_router.get(
+    "/{gait_session_id}/report/stream",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def stream_gait_session_report(
+    gait_session_id: int,
+    session: AsyncSession = Depends(get_session),
+    _: dict = Depends(access_token_bearer),
+) -> StreamingResponse:
+    events = await gait_sessions_service.stream_gait_report(gait_session_id, session)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @gait_sessions_router.delete(
@@ -0,0 +1,176 @@
+import json
+import math
+import time
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+from src.config import Config
+from src.db.redis import get_async_redis, get_redis
+from src.gait_sessions.cancellation import task_key
+from src.gait_sessions.throughput import load_throughput
+from src.gait_sessions.video_budget import VideoProbe, plan_processing
+
+# Lower values run first (Redis broker priorities). Re-runs of failed
+# analyses always go first, and bulk re-analyses start behind new ones.
+PRIORITY_RERUN = 0
+PRIORITY_DEFAULT = 5
+PRIORITY_BATCH = 8
+# Speculative work ahead of an analysis request runs behind everything else
+PRIORITY_PREFETCH = 9
+# Range of the priorities given to new analyses by estimated cost
+PRIORITY_SHORTEST = 1
+PRIORITY_LONGEST = 7
+
+WAITING_JOBS_KEY = "gait_cpu_waiting_jobs"
+
+# Move a waiting job to a higher priority, unless it was already picked up.
+# KEYS: waiting jobs, session task
+# ARGV: session id, new task id, job
+PROMOTE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+redis.call('SET', KEYS[2], ARGV[2], 'KEEPTTL')
+return 1
+"""
+
+# Take a waiting job off the list, unless it was promoted to another task.
+# KEYS: waiting jobs, session task
+# ARGV: session id, task id
+CLAIM_SCRIPT = """
+local current = redis.call('GET', KEYS[2])
+if current and current ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class WaitingJob(BaseModel):
+    """An analysis waiting on the CPU queue, with what its priority is based on."""
+
+    base_priority: int
+    cost_seconds: Optional[float] = None
+    priority: int
+    enqueued_at: float
+
+    def aged_priority(self, now: Optional[float] = None) -> int:
+        waited = (now or time.time()) - self.enqueued_at
+        return job_priority(self.base_priority, self.cost_seconds, waited)
+
+
+def session_probe(gait_session) -> Optional[VideoProbe]:
+    """The video properties stored on a session, None if it was not probed."""
+    if not gait_session.video_width or not gait_session.video_frame_rate:
+        return None
+    return VideoProbe(
+        width=gait_session.video_width,
+        height=gait_session.video_height,
+        frame_rate=gait_session.video_frame_rate,
+        frame_count=gait_session.video_frame_count or 0,
+    )
+
+
+async def estimate_cost_seconds(probe: Optional[VideoProbe]) -> Optional[float]:
+    """Expected run time of the analysis of a video, from measured throughput."""
+    if probe is None:
+        return None
+    try:
+        frames = plan_processing(probe).frame_count
+    except ValueError:
+        return None
+    return (await load_throughput()).analysis_seconds(frames)
+
+
+def job_priority(
+    base_priority: int, cost_seconds: Optional[float], waited_seconds: float = 0.0
+) -> int:
+    """
+    Broker priority of an analysis: shortest job first, with aging.
+
+    New analyses are ranked by estimated cost, one priority level per doubling
+    over `SJF_SHORTEST_JOB_SECONDS`, and those of unknown cost sit in the
+    middle. Every `SJF_AGING_SECONDS` spent waiting raises a job one level,
+    so long videos and bulk re-analyses are not starved by a stream of short
+    ones. Re-runs of failed analyses keep the top priority.
+    """
+    if base_priority == PRIORITY_RERUN:
+        return PRIORITY_RERUN
+    if base_priority == PRIORITY_BATCH:
+        level = PRIORITY_BATCH
+    elif cost_seconds is None:
+        level = PRIORITY_DEFAULT
+    else:
+        doublings = math.log2(max(cost_seconds, 1.0) / Config.SJF_SHORTEST_JOB_SECONDS)
+        level = min(
+            PRIORITY_LONGEST, PRIORITY_SHORTEST + max(0, math.floor(doublings))
+        )
+    aging = int(max(0.0, waited_seconds) // Config.SJF_AGING_SECONDS)
+    return max(PRIORITY_SHORTEST, level - aging)
+
+
+async def add_waiting_job(session_id: int, job: WaitingJob) -> None:
+    redis = get_async_redis()
+    if redis is not None:
+        await redis.hset(WAITING_JOBS_KEY, str(session_id), job.model_dump_json())
+
+
+async def remove_waiting_job(session_id: int) -> None:
+    redis = get_async_redis()
+    if redis is not None:
+        await redis.hdel(WAITING_JOBS_KEY, str(session_id))
+
+
+async def waiting_jobs() -> Dict[int, WaitingJob]:
+    redis = get_async_redis()
+    if redis is None:
+        return {}
+    jobs = {}
+    for session_id, job in (await redis.hgetall(WAITING_JOBS_KEY)).items():
+        jobs[int(session_id)] = WaitingJob(**json.loads(job))
+    return jobs
+
+
+async def promote_waiting_job(
+    session_id: int, task_id: str, job: WaitingJob
+) -> bool:
+    """
+    Make `task_id` the session's current task with the job's new priority.
+
+    The task already queued becomes a duplicate and is skipped. Returns False
+    if a worker claimed the job in the meantime.
+    """
+    redis = get_async_redis()
+    if redis is None:
+        return False
+    return bool(
+        await redis.eval(
+            PROMOTE_SCRIPT,
+            2,
+            WAITING_JOBS_KEY,
+            task_key(session_id),
+            str(session_id),
+            task_id,
+            job.model_dump_json(),
+        )
+    )
+
+
+def claim_waiting_job(session_id: int, task_id: str) -> bool:
+    """Whether the task may run the job, i.e. it was not promoted away."""
+    redis = get_redis()
+    if redis is None:
+        return True
+    return bool(
+        redis.eval(
+            CLAIM_SCRIPT,
+            2,
+            WAITING_JOBS_KEY,
+            task_key(session_id),
+            str(session_id),
+            task_id,
+        )
+    )
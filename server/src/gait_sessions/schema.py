@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import date, datetime
 from src.db.model.enum import AnalysisStatus
 from src.utils import partial_model, to_camel
@@ -311,6 +311,28 @@ class GaitSessionResponseModel(GaitSessionListResponseModel):
         example=30.0,
         description="Frame rate of the video (calculated during analysis, optional).",
     )
+    video_width: Optional[int] = Field(
+        default=None, example=1920, description="Width of the input video in pixels."
+    )
+    video_height: Optional[int] = Field(
+        default=None, example=1080, description="Height of the input video in pixels."
+    )
+    video_duration_seconds: Optional[float] = Field(
+        default=None,
+        ge=0,
+        example=42.5,
+        description="Duration of the input video, read once it is downloaded.",
+    )
+    processing_adjustments: List[str] = Field(
+        default_factory=list,
+        example=["Downscaled from 3840x2160 to 1280x720"],
+        description="Downscaling or sampling applied to fit the analysis budgets.",
+    )
+    analysis_error: Optional[str] = Field(
+        default=None,
+        example="The patient's left foot is out of view in most of the video.",
+        description="Why the video was rejected by the last failed analysis.",
+    )
     summarized_ai_analysis: Optional[str] = Field(
         default=None,
         example="Gait analysis indicates normal stride length but reduced swing time.",
@@ -354,3 +376,164 @@ class GaitSessionResponseModel(GaitSessionListResponseModel):
         alias_generator = to_camel
         populate_by_name = True
         from_attributes = True
+
+
+class AnalysisEstimateModel(BaseModel):
+    """Schema for when a newly accepted analysis is expected to run."""
+
+    queue_position: int = Field(
+        ...,
+        ge=1,
+        example=3,
+        description="Position of the analysis among queued and running ones.",
+    )
+    estimated_start_at: datetime = Field(
+        ..., description="Estimated time the analysis starts."
+    )
+    estimated_finish_at: datetime = Field(
+        ..., description="Estimated time the analysis finishes."
+    )
+
+    class Config:
+        alias_generator = to_camel
+        populate_by_name = True
+
+
+class GaitSessionAnalyzeResponseModel(GaitSessionResponseModel):
+    """Schema for a session whose analysis was just started."""
+
+    analysis_estimate: Optional[AnalysisEstimateModel] = Field(
+        default=None,
+        description="Estimated start and finish of the analysis, if accepted now.",
+    )
+
+
+class GaitSessionAnalysisBatchCreateModel(BaseModel):
+    """Schema for starting the analysis of several sessions at once."""
+
+    session_ids: List[int] = Field(
+        ...,
+        min_length=1,
+        max_length=100,
+        example=[1, 2, 3],
+        description="Sessions to analyze.",
+    )
+
+    class Config:
+        alias_generator = to_camel
+        populate_by_name = True
+
+
+class GaitSessionAnalysisBatchModel(BaseModel):
+    """Schema for the aggregate progress of a batch of analyses."""
+
+    batch_id: str = Field(..., description="ID of the batch.")
+    session_ids: List[int] = Field(
+        default_factory=list, description="Sessions whose analysis was started."
+    )
+    rejected: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Reason each session that could not be started was rejected.",
+    )
+    created_at: datetime = Field(..., description="Time the batch was submitted.")
+    total: int = Field(default=0, description="Number of analyses started.")
+    status_counts: Dict[AnalysisStatus, int] = Field(
+        default_factory=dict,
+        example={AnalysisStatus.InProgress: 2, AnalysisStatus.Completed: 1},
+        description="Number of sessions of the batch per analysis status.",
+    )
+    finished: int = Field(
+        default=0, description="Number of completed, failed or cancelled analyses."
+    )
+    progress: float = Field(
+        default=0, ge=0, le=1, description="Share of the analyses that finished."
+    )
+
+    class Config:
+        alias_generator = to_camel
+        populate_by_name = True
+
+
+class GaitSessionReanalysisModel(BaseModel):
+    """Schema for selecting sessions to analyze again in bulk."""
+
+    session_ids: Optional[List[int]] = Field(
+        default=None,
+        example=[1, 2, 3],
+        description="Only re-analyze these sessions.",
+    )
+    statuses: List[AnalysisStatus] = Field(
+        default_factory=lambda: [
+            AnalysisStatus.Completed,
+            AnalysisStatus.MetricsReady,
+            AnalysisStatus.Error,
+        ],
+        example=[AnalysisStatus.Completed],
+        description="Only re-analyze sessions whose analysis has one of these statuses.",
+    )
+    patient_id: Optional[int] = Field(
+        default=None,
+        example=1,
+        description="Only re-analyze sessions of this patient.",
+    )
+    created_after: Optional[datetime] = Field(
+        default=None,
+        example="2025-01-01T00:00:00Z",
+        description="Only re-analyze sessions created at or after this time.",
+    )
+    created_before: Optional[datetime] = Field(
+        default=None,
+        example="2025-04-24T00:00:00Z",
+        description="Only re-analyze sessions created before this time.",
+    )
+    limit: Optional[int] = Field(
+        default=None,
+        ge=1,
+        example=100,
+        description="Maximum number of sessions to re-analyze.",
+    )
+    rate_per_minute: Optional[float] = Field(
+        default=None,
+        gt=0,
+        example=30.0,
+        description="Maximum number of analyses started per minute.",
+    )
+    max_in_flight: Optional[int] = Field(
+        default=None,
+        ge=1,
+        example=4,
+        description="Maximum number of analyses queued or running at once.",
+    )
+
+    class Config:
+        alias_generator = to_camel
+        populate_by_name = True
+
+
+class GaitSessionReanalysisJobModel(BaseModel):
+    """Schema for the progress of a bulk re-analysis."""
+
+    job_id: str = Field(..., description="ID of the bulk re-analysis.")
+    status: str = Field(
+        ..., example="running", description="queued, running or completed."
+    )
+    total: int = Field(default=0, description="Number of sessions selected.")
+    submitted: int = Field(default=0, description="Number of analyses started.")
+    in_flight: int = Field(
+        default=0, description="Number of analyses queued or running."
+    )
+    succeeded: int = Field(default=0, description="Number of successful analyses.")
+    failed: int = Field(default=0, description="Number of failed analyses.")
+    cancelled: int = Field(default=0, description="Number of cancelled analyses.")
+    skipped: int = Field(
+        default=0, description="Number of sessions that could not be started."
+    )
+    elapsed_seconds: float = Field(default=0, description="Time since the start.")
+    failures: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Outcome or error of every session that did not succeed.",
+    )
+
+    class Config:
+        alias_generator = to_camel
+        populate_by_name = True
@@ -1,5 +1,11 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
 from math import ceil
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+from uuid import uuid4
+
 from fastapi import HTTPException, status
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
@@ -8,17 +14,72 @@ from src.utils import PaginatedResponse
 from src.patients.service import PatientsService
 from src.db.models import GaitSession
 from src.db.model.enum import AnalysisStatus
+from src.config import Config
 from src.gait_sessions.schema import (
+    GaitSessionAnalysisBatchCreateModel,
+    GaitSessionAnalyzeResponseModel,
     GaitSessionCreateModel,
     GaitSessionListResponseModel,
+    GaitSessionReanalysisModel,
     GaitSessionUpdateModel,
 )
-from src.gait_sessions.celery_jobs import run_gait_analysis_task
-from sqlalchemy import func
+from src.gait_sessions.admission import queue_snapshot
+from src.gait_sessions.analysis_batches import (
+    load_analysis_batch,
+    save_analysis_batch,
+)
+from src.gait_sessions.analysis_locks import (
+    is_duplicate_submission,
+    record_submission,
+    submission_lock,
+)
+from src.gait_sessions.cancellation import clear_cancellation
+from src.gait_sessions.celery_jobs import (
+    job_runner,
+    purge_deleted_task,
+    stop_analysis,
+    submit_analysis,
+    submit_prefetch,
+    submit_analysis_group,
+)
+from src.gait_sessions.prefetch import cancel_prefetch
+from src.gait_sessions.progress import (
+    TERMINAL_STATUSES,
+    publish_status,
+    session_progress_events,
+    set_progress_owner,
+    user_progress_events,
+)
+from src.gait_sessions.reanalysis import (
+    REANALYSIS_TASK_NAME,
+    clear_reanalysis,
+    finish_reanalysis,
+    load_reanalysis_job,
+    mark_reanalysis,
+    reanalysis_outcome,
+    save_reanalysis_job,
+)
+from src.gait_sessions.report_stream import report_events
+from src.gait_sessions.scheduling import (
+    PRIORITY_BATCH,
+    PRIORITY_DEFAULT,
+    PRIORITY_RERUN,
+    estimate_cost_seconds,
+    session_probe,
+)
+from src.gait_sessions.video_budget import probe_video
+from sqlalchemy import func, update
 from sqlalchemy.orm import noload, joinedload
 
 patients_service = PatientsService()
 
+# Statuses from which a new analysis can be started
+STARTABLE_STATUSES = (
+    AnalysisStatus.Initial,
+    AnalysisStatus.Error,
+    AnalysisStatus.Cancelled,
+)
+
 
 class GaitSessionsService:
     async def get_all_sessions(
@@ -39,11 +100,16 @@ class GaitSessionsService:
                 noload(GaitSession.gait_metrics),
                 noload(GaitSession.gait_plot_data),
             )
+            .where(GaitSession.deleted_at.is_(None))
             .order_by(GaitSession.created_at.desc())
         )
 
         # Create count query
-        total_sessions_query = select(func.count()).select_from(GaitSession)
+        total_sessions_query = (
+            select(func.count())
+            .select_from(GaitSession)
+            .where(GaitSession.deleted_at.is_(None))
+        )
 
         # Apply search filter if provided
         if search:
@@ -78,7 +144,9 @@ class GaitSessionsService:
         """
         Get a gait session by ID, including patient information.
         """
-        statement = select(GaitSession).where(GaitSession.id == id)
+        statement = select(GaitSession).where(
+            GaitSession.id == id, GaitSession.deleted_at.is_(None)
+        )
         result = await session.exec(statement)
         gait_session = result.first()
 
@@ -90,6 +158,88 @@ class GaitSessionsService:
 
         return gait_session
 
+    async def stream_gait_report(
+        self, id: int, session: AsyncSession
+    ) -> AsyncIterator[str]:
+        """
+        Stream the detailed AI analysis of a gait session as Server-Sent Events,
+        live while it is being generated or replayed once it is stored.
+        """
+        statement = (
+            select(GaitSession)
+            .options(
+                noload(GaitSession.patient),
+                noload(GaitSession.gait_metrics),
+                noload(GaitSession.gait_plot_data),
+            )
+            .where(GaitSession.id == id, GaitSession.deleted_at.is_(None))
+        )
+        result = await session.exec(statement)
+        gait_session = result.first()
+
+        if gait_session is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Gait session with this ID does not exist.",
+            )
+
+        return report_events(gait_session)
+
+    async def stream_gait_progress(
+        self, id: int, session: AsyncSession
+    ) -> AsyncIterator[str]:
+        """
+        Stream the analysis progress of a gait session as Server-Sent Events
+        until the analysis completes or fails.
+        """
+        result = await session.exec(
+            select(GaitSession.analysis_status).where(
+                GaitSession.id == id, GaitSession.deleted_at.is_(None)
+            )
+        )
+        analysis_status = result.first()
+
+        if analysis_status is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Gait session with this ID does not exist.",
+            )
+
+        # Release the connection, the stream may stay open for a long time
+        await session.commit()
+        return session_progress_events(id, analysis_status)
+
+    def stream_user_progress(self, user_id: int) -> AsyncIterator[str]:
+        """Stream the progress of every analysis started by a user."""
+        return user_progress_events(user_id)
+
+    async def _probe_video(self, gait_session: GaitSession) -> None:
+        """
+        Read the resolution, frame rate and length of the session's video, so
+        its analysis can be ranked by cost before it is downloaded. The video
+        is opened over HTTP and only its metadata is read. Left unset if it
+        cannot be read in time, the download stage fills them in then.
+
+        Only used when an analysis is started before the prefetch of the
+        video recorded these.
+        """
+        try:
+            probe = await asyncio.wait_for(
+                asyncio.to_thread(probe_video, gait_session.video_url),
+                timeout=Config.VIDEO_PROBE_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            print(f"Failed to probe video {gait_session.video_url}: {str(e)}")
+            probe = None
+
+        gait_session.video_width = probe.width if probe else None
+        gait_session.video_height = probe.height if probe else None
+        gait_session.video_frame_rate = probe.frame_rate if probe else None
+        gait_session.video_frame_count = (probe.frame_count or None) if probe else None
+        gait_session.video_duration_seconds = (
+            (probe.duration_seconds or None) if probe else None
+        )
+
     async def create_gait_session(
         self, gait_session_data: GaitSessionCreateModel, session: AsyncSession
     ) -> GaitSession:
@@ -101,6 +251,7 @@ class GaitSessionsService:
         session.add(new_gait_session)
         await session.commit()
         await session.refresh(new_gait_session)
+        await submit_prefetch(new_gait_session.id, new_gait_session.video_url)
         return new_gait_session
 
     async def update_gait_session(
@@ -111,50 +262,490 @@ class GaitSessionsService:
         update_data = gait_session_data.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(gait_session, key, value)
+        if "video_url" in update_data:
+            # Probed again by the prefetch of the new video
+            gait_session.video_width = None
+            gait_session.video_height = None
+            gait_session.video_frame_rate = None
+            gait_session.video_frame_count = None
+            gait_session.video_duration_seconds = None
 
         await session.commit()
         await session.refresh(gait_session)
+        if "video_url" in update_data:
+            # Replaces the prefetch of the previous video, if any
+            if gait_session.analysis_status == AnalysisStatus.Initial:
+                await submit_prefetch(gait_session.id, gait_session.video_url)
+            else:
+                await cancel_prefetch(gait_session.id)
         return gait_session
 
     async def delete_gait_session(self, id: int, session: AsyncSession) -> GaitSession:
+        """
+        Delete a gait session. It is hidden right away, its analysis stopped,
+        and its rows and stored videos are purged in the background.
+        """
         gait_session = await self.get_gait_session_by_id(id, session)
-        await session.delete(gait_session)
+        analysis_running = gait_session.analysis_status in (
+            AnalysisStatus.Pending,
+            AnalysisStatus.InProgress,
+        )
+        gait_session.deleted_at = datetime.now(timezone.utc)
         await session.commit()
+        await session.refresh(gait_session)
+
+        await cancel_prefetch(id)
+        if analysis_running:
+            await stop_analysis(id)
+        await job_runner.enqueue(purge_deleted_task.name)
         return gait_session
 
     async def start_gait_analysis(
+        self,
+        session_id: int,
+        session: AsyncSession,
+        user_id: Optional[int] = None,
+        idempotency_key: Optional[str] = None,
+        reanalyze: bool = False,
+    ) -> GaitSessionAnalyzeResponseModel:
+        """
+        Start gait analysis for a session by setting status to Pending
+        and triggering a background Celery task. Progress is also published
+        to the stream of `user_id`, when given.
+
+        New analyses are refused with a 429 while the queue holds more than
+        `ADMISSION_MAX_BACKLOG_PER_WORKER` analyses per CPU worker, with a
+        Retry-After of the time the backlog takes to drain. Accepted ones get
+        an estimated start and finish based on the measured throughput.
+
+        Submissions of a session are serialized by a Redis lock, so double
+        taps or concurrent API replicas enqueue at most one analysis. Retries
+        carrying an already accepted `idempotency_key` return the session
+        without starting anything.
+
+        With `reanalyze`, sessions whose analysis already finished are run
+        again at batch priority. Their results are only replaced once the new
+        analysis succeeds, otherwise they keep their previous status.
+        """
+        async with submission_lock(session_id) as acquired:
+            # Checked under the lock, so a retry racing the original request
+            # waits for it to be accepted instead of being refused
+            if idempotency_key and await is_duplicate_submission(
+                session_id, idempotency_key
+            ):
+                gait_session = await self.get_gait_session_by_id(session_id, session)
+                await session.refresh(gait_session)
+                return GaitSessionAnalyzeResponseModel(**gait_session.model_dump())
+
+            if not acquired:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Gait analysis is already being started for this session.",
+                )
+
+            gait_session = await self.get_gait_session_by_id(session_id, session)
+            # Another replica may have committed while we waited for the lock
+            await session.refresh(gait_session)
+
+            previous_status = gait_session.analysis_status
+            startable = list(STARTABLE_STATUSES)
+            if reanalyze:
+                startable += [AnalysisStatus.MetricsReady, AnalysisStatus.Completed]
+            if previous_status not in startable:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Gait analysis has already been started for this session.",
+                )
+
+            # Re-runs of failed analyses jump ahead of new ones, while bulk
+            # re-analyses wait behind everything else
+            if reanalyze:
+                priority = PRIORITY_BATCH
+            elif previous_status == AnalysisStatus.Error:
+                priority = PRIORITY_RERUN
+            else:
+                priority = PRIORITY_DEFAULT
+
+            # Sessions whose video was not prefetched yet
+            if not reanalyze and session_probe(gait_session) is None:
+                await self._probe_video(gait_session)
+            cost_seconds = await estimate_cost_seconds(session_probe(gait_session))
+
+            # Bulk re-analyses are throttled by their own runner
+            snapshot = await queue_snapshot(session)
+            if not reanalyze and not snapshot.accepts:
+                retry_after = snapshot.retry_after_seconds()
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=(
+                        "Too many gait analyses are queued, "
+                        f"retry in {retry_after} seconds."
+                    ),
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+            try:
+                # Set status to Pending
+                gait_session.analysis_status = AnalysisStatus.Pending
+                gait_session.analysis_error = None
+                await session.commit()
+                await session.refresh(gait_session)
+                await set_progress_owner(session_id, user_id)
+                await clear_cancellation(session_id)
+                await cancel_prefetch(session_id)
+                if previous_status in (
+                    AnalysisStatus.MetricsReady,
+                    AnalysisStatus.Completed,
+                ):
+                    await mark_reanalysis(session_id, previous_status)
+                else:
+                    await clear_reanalysis(session_id)
+                await publish_status(session_id, AnalysisStatus.Pending)
+
+                # Start Celery task
+                task_id = await submit_analysis(session_id, priority, cost_seconds)
+                if idempotency_key:
+                    await record_submission(session_id, idempotency_key, task_id)
+
+                return GaitSessionAnalyzeResponseModel(
+                    **gait_session.model_dump(),
+                    analysis_estimate=snapshot.estimate(cost_seconds),
+                )
+
+            except Exception as e:
+                print(f"Error starting gait analysis: {str(e)}")
+                await session.rollback()
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Failed to start gait analysis: {str(e)}",
+                )
+
+    async def start_analysis_batch(
+        self,
+        batch_data: GaitSessionAnalysisBatchCreateModel,
+        session: AsyncSession,
+        user_id: Optional[int] = None,
+    ) -> Dict:
+        """
+        Start the analysis of several sessions at once.
+
+        The sessions are validated in one query and set to Pending in one
+        transaction, and their analyses are enqueued as one Celery group.
+        Sessions that do not exist or whose analysis was already started are
+        reported as rejected instead of failing the whole batch. The batch is
+        refused with a 429 like single analyses when the queue is full.
+        """
+        session_ids = list(dict.fromkeys(batch_data.session_ids))
+        result = await session.exec(
+            select(
+                GaitSession.id,
+                GaitSession.analysis_status,
+                GaitSession.video_width,
+                GaitSession.video_height,
+                GaitSession.video_frame_rate,
+                GaitSession.video_frame_count,
+            ).where(GaitSession.id.in_(session_ids), GaitSession.deleted_at.is_(None))
+        )
+        found = {row.id: row for row in result.all()}
+
+        rejected = {}
+        for session_id in session_ids:
+            if session_id not in found:
+                rejected[str(session_id)] = "Gait session with this ID does not exist."
+            elif found[session_id].analysis_status not in STARTABLE_STATUSES:
+                rejected[str(session_id)] = (
+                    "Gait analysis has already been started for this session."
+                )
+        candidates = [id for id in session_ids if str(id) not in rejected]
+
+        snapshot = await queue_snapshot(session)
+        if candidates and not snapshot.accepts:
+            retry_after = snapshot.retry_after_seconds()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=(
+                    "Too many gait analyses are queued, "
+                    f"retry in {retry_after} seconds."
+                ),
+                headers={"Retry-After": str(retry_after)},
+            )
+
+        accepted = []
+        if candidates:
+            # Sessions started concurrently since the query are left out
+            result = await session.execute(
+                update(GaitSession)
+                .where(
+                    GaitSession.id.in_(candidates),
+                    GaitSession.analysis_status.in_(STARTABLE_STATUSES),
+                )
+                .values(analysis_status=AnalysisStatus.Pending, analysis_error=None)
+                .returning(GaitSession.id)
+                .execution_options(synchronize_session=False)
+            )
+            updated = set(result.scalars().all())
+            await session.commit()
+            for session_id in candidates:
+                if session_id in updated:
+                    accepted.append(session_id)
+                else:
+                    rejected[str(session_id)] = (
+                        "Gait analysis has already been started for this session."
+                    )
+
+        jobs = []
+        for session_id in accepted:
+            await set_progress_owner(session_id, user_id)
+            await clear_cancellation(session_id)
+            await cancel_prefetch(session_id)
+            await clear_reanalysis(session_id)
+            await publish_status(session_id, AnalysisStatus.Pending)
+            row = found[session_id]
+            priority = (
+                PRIORITY_RERUN
+                if row.analysis_status == AnalysisStatus.Error
+                else PRIORITY_DEFAULT
+            )
+            cost_seconds = await estimate_cost_seconds(session_probe(row))
+            jobs.append((session_id, priority, cost_seconds))
+
+        batch = {
+            "batch_id": uuid4().hex,
+            "group_id": None,
+            "session_ids": accepted,
+            "rejected": rejected,
+            "created_at": datetime.now(timezone.utc),
+        }
+        if jobs:
+            try:
+                batch["group_id"] = await submit_analysis_group(jobs)
+            except Exception as e:
+                print(f"Error starting gait analysis batch: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Failed to start gait analysis batch: {str(e)}",
+                )
+        await save_analysis_batch(batch, session)
+        return await self._analysis_batch_progress(batch, session)
+
+    async def get_analysis_batch(self, batch_id: str, session: AsyncSession) -> Dict:
+        batch = await load_analysis_batch(batch_id, session)
+        if batch is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Analysis batch with this ID does not exist.",
+            )
+        return await self._analysis_batch_progress(batch, session)
+
+    async def _analysis_batch_progress(
+        self, batch: Dict, session: AsyncSession
+    ) -> Dict:
+        """Aggregate the current analysis status of the sessions of a batch."""
+        status_counts = {}
+        if batch["session_ids"]:
+            result = await session.exec(
+                select(GaitSession.analysis_status, func.count())
+                .where(GaitSession.id.in_(batch["session_ids"]))
+                .group_by(GaitSession.analysis_status)
+            )
+            status_counts = {
+                analysis_status.value: count for analysis_status, count in result.all()
+            }
+
+        total = len(batch["session_ids"])
+        finished = sum(
+            count
+            for analysis_status, count in status_counts.items()
+            if analysis_status in TERMINAL_STATUSES
+        )
+        return {
+            **batch,
+            "total": total,
+            "status_counts": status_counts,
+            "finished": finished,
+            "progress": finished / total if total else 1.0,
+        }
+
+    async def cancel_gait_analysis(
         self, session_id: int, session: AsyncSession
     ) -> GaitSession:
         """
-        Start gait analysis for a session by setting status to Pending
-        and triggering a background Celery task.
+        Cancel a pending or running gait analysis.
+
+        Queued tasks are revoked, and a running task notices the cancellation
+        flag at its next frame or stage boundary, cleans up its files and
+        frees the worker.
         """
         gait_session = await self.get_gait_session_by_id(session_id, session)
 
-        if (
-            gait_session.analysis_status != AnalysisStatus.Initial
-            and gait_session.analysis_status != AnalysisStatus.Error
+        if gait_session.analysis_status not in (
+            AnalysisStatus.Pending,
+            AnalysisStatus.InProgress,
         ):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Gait analysis has already been started for this session.",
+                detail="Only pending or running gait analyses can be cancelled.",
             )
 
-        try:
-            # Set status to Pending
-            gait_session.analysis_status = AnalysisStatus.Pending
-            await session.commit()
-            await session.refresh(gait_session)
+        # A cancelled re-analysis keeps the results it would have replaced
+        gait_session.analysis_status = (
+            await finish_reanalysis(session_id, "cancelled") or AnalysisStatus.Cancelled
+        )
+        await session.commit()
+        await session.refresh(gait_session)
+
+        await stop_analysis(session_id)
+        await publish_status(session_id, gait_session.analysis_status)
 
-            # Start Celery task
-            run_gait_analysis_task.delay(session_id)
+        return gait_session
 
-            return gait_session
+    async def start_reanalysis_job(self, filters: GaitSessionReanalysisModel) -> Dict:
+        """Start a throttled bulk re-analysis in the background."""
+        progress = {"job_id": uuid4().hex, "status": "queued"}
+        await save_reanalysis_job(progress)
+        await job_runner.enqueue(
+            REANALYSIS_TASK_NAME,
+            (progress["job_id"], filters.model_dump(mode="json")),
+            priority=PRIORITY_BATCH,
+        )
+        return progress
 
-        except Exception as e:
-            print(f"Error starting gait analysis: {str(e)}")
-            await session.rollback()
+    async def get_reanalysis_job(self, job_id: str) -> Dict:
+        progress = await load_reanalysis_job(job_id)
+        if progress is None:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to start gait analysis: {str(e)}",
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Re-analysis job with this ID does not exist.",
             )
+        return progress
+
+    async def reanalyze_sessions(
+        self,
+        filters: GaitSessionReanalysisModel,
+        session: AsyncSession,
+        job_id: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        """
+        Analyze the selected sessions again, e.g. after a pipeline upgrade.
+
+        Analyses are started at most `rate_per_minute` per minute with at
+        most `max_in_flight` queued or running at once, so a backfill never
+        floods the workers. Progress is stored under `job_id` and passed to
+        `on_progress` after every poll.
+        """
+        rate_per_minute = filters.rate_per_minute or Config.REANALYSIS_RATE_PER_MINUTE
+        max_in_flight = filters.max_in_flight or Config.REANALYSIS_MAX_IN_FLIGHT
+        started_at = time.monotonic()
+
+        queue = deque(await self._select_reanalysis_sessions(filters, session))
+        in_flight: Set[int] = set()
+        progress = {
+            "job_id": job_id or uuid4().hex,
+            "status": "running",
+            "total": len(queue),
+            "submitted": 0,
+            "in_flight": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "skipped": 0,
+            "elapsed_seconds": 0.0,
+            "failures": {},
+        }
+        next_submit_at = 0.0
+
+        while queue or in_flight:
+            for session_id, outcome in await self._finished_reanalyses(
+                in_flight, session
+            ):
+                in_flight.discard(session_id)
+                progress[outcome] += 1
+                if outcome != "succeeded":
+                    progress["failures"][str(session_id)] = outcome
+
+            while (
+                queue
+                and len(in_flight) < max_in_flight
+                and time.monotonic() >= next_submit_at
+            ):
+                session_id = queue.popleft()
+                try:
+                    await self.start_gait_analysis(session_id, session, reanalyze=True)
+                except HTTPException as e:
+                    progress["skipped"] += 1
+                    progress["failures"][str(session_id)] = e.detail
+                    continue
+                in_flight.add(session_id)
+                progress["submitted"] += 1
+                next_submit_at = time.monotonic() + 60.0 / rate_per_minute
+
+            # Release the connection between polls
+            await session.commit()
+            progress["in_flight"] = len(in_flight)
+            progress["elapsed_seconds"] = round(time.monotonic() - started_at, 1)
+            await save_reanalysis_job(progress)
+            if on_progress:
+                on_progress(progress)
+            if queue or in_flight:
+                await asyncio.sleep(Config.REANALYSIS_POLL_SECONDS)
+
+        progress["status"] = "completed"
+        await save_reanalysis_job(progress)
+        return progress
+
+    async def _select_reanalysis_sessions(
+        self, filters: GaitSessionReanalysisModel, session: AsyncSession
+    ) -> List[int]:
+        statement = (
+            select(GaitSession.id)
+            .where(
+                GaitSession.analysis_status.in_(filters.statuses),
+                GaitSession.deleted_at.is_(None),
+            )
+            .order_by(GaitSession.id)
+        )
+        if filters.session_ids:
+            statement = statement.where(GaitSession.id.in_(filters.session_ids))
+        if filters.patient_id is not None:
+            statement = statement.where(GaitSession.patient_id == filters.patient_id)
+        if filters.created_after:
+            statement = statement.where(GaitSession.created_at >= filters.created_after)
+        if filters.created_before:
+            statement = statement.where(GaitSession.created_at < filters.created_before)
+        if filters.limit:
+            statement = statement.limit(filters.limit)
+
+        result = await session.exec(statement)
+        return list(result.all())
+
+    async def _finished_reanalyses(
+        self, session_ids: Set[int], session: AsyncSession
+    ) -> List[tuple]:
+        """Return the (session ID, outcome) of the re-analyses that finished."""
+        if not session_ids:
+            return []
+        result = await session.exec(
+            select(GaitSession.id, GaitSession.analysis_status).where(
+                GaitSession.id.in_(session_ids)
+            )
+        )
+        statuses = dict(result.all())
+
+        finished = []
+        for session_id in session_ids:
+            analysis_status = statuses.get(session_id)
+            if analysis_status in (AnalysisStatus.Pending, AnalysisStatus.InProgress):
+                continue
+            # Failed re-analyses restore the previous status, only the
+            # recorded outcome tells them apart from successful ones
+            outcome = await reanalysis_outcome(session_id)
+            if outcome is None and analysis_status == AnalysisStatus.MetricsReady:
+                # New metrics stored, the report is still being generated
+                continue
+            outcome = outcome or {
+                AnalysisStatus.Completed: "succeeded",
+                AnalysisStatus.Cancelled: "cancelled",
+            }.get(analysis_status, "failed")
+            finished.append((session_id, outcome))
+        return finished
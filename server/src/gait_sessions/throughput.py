@@ -0,0 +1,85 @@
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+from src.config import Config
+from src.db.redis import get_async_redis, get_redis
+
+THROUGHPUT_KEY = "gait_analysis_throughput"
+
+# Stages whose duration grows with the number of analyzed frames
+PER_FRAME_STAGES = ("pose", "render")
+
+# Used until enough analyses have been measured
+DEFAULT_SECONDS_PER_FRAME = {"pose": 0.05, "render": 0.01}
+DEFAULT_STAGE_SECONDS = {"download": 10.0, "upload": 15.0}
+DEFAULT_FRAMES_PER_ANALYSIS = 900.0
+
+
+class ThroughputStats(BaseModel):
+    """Historical stage durations, averaged over recent analyses."""
+
+    seconds_per_frame: Dict[str, float]
+    stage_seconds: Dict[str, float]
+    frames_per_analysis: float
+
+    def analysis_seconds(self, frames: Optional[float] = None) -> float:
+        """Expected run time of an analysis of `frames` frames."""
+        if frames is None:
+            frames = self.frames_per_analysis
+        return frames * sum(self.seconds_per_frame.values()) + sum(
+            self.stage_seconds.values()
+        )
+
+
+def _record(field: str, value: float) -> None:
+    """Fold a new measurement into an exponential moving average."""
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        previous = redis.hget(THROUGHPUT_KEY, field)
+        if previous is not None:
+            alpha = Config.THROUGHPUT_EMA_ALPHA
+            value = alpha * value + (1 - alpha) * float(previous)
+        redis.hset(THROUGHPUT_KEY, field, value)
+    except Exception as e:
+        print(f"Failed to record analysis throughput: {str(e)}")
+
+
+def record_analysis_frames(frames: Optional[int]) -> None:
+    if frames:
+        _record("frames", frames)
+
+
+def record_stage(stage: str, seconds: float, frames: Optional[int] = None) -> None:
+    """Record how long a stage took, per frame for frame-bound stages."""
+    if stage in PER_FRAME_STAGES:
+        if frames:
+            _record(f"{stage}:per_frame", seconds / frames)
+    else:
+        _record(f"{stage}:seconds", seconds)
+
+
+async def load_throughput() -> ThroughputStats:
+    redis = get_async_redis()
+    recorded = {}
+    if redis is not None:
+        try:
+            recorded = await redis.hgetall(THROUGHPUT_KEY)
+        except Exception as e:
+            print(f"Failed to load analysis throughput: {str(e)}")
+
+    return ThroughputStats(
+        seconds_per_frame={
+            stage: float(recorded.get(f"{stage}:per_frame", default))
+            for stage, default in DEFAULT_SECONDS_PER_FRAME.items()
+        },
+        stage_seconds={
+            stage: float(recorded.get(f"{stage}:seconds", default))
+            for stage, default in DEFAULT_STAGE_SECONDS.items()
+        },
+        frames_per_analysis=float(
+            recorded.get("frames", DEFAULT_FRAMES_PER_ANALYSIS)
+        ),
+    )
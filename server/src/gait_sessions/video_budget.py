@@ -0,0 +1,219 @@
+import math
+from typing import List, Optional
+
+import cv2
+import numpy as np
+from pydantic import BaseModel
+
+from src.config import Config
+
+# Memory taken by the pose landmarker model and runtime, independent of input
+POSE_MODEL_MEMORY_MB = 400
+# Landmarks of one frame (33 x, y, z float64), held twice when concatenated
+POSE_FRAME_BYTES = 33 * 3 * 8 * 2
+# Copies of a frame alive at once: decoded, resized, RGB, MediaPipe image
+FRAME_COPIES = 4
+# Never downscale below this height, landmarks get unreliable
+MIN_ANALYSIS_HEIGHT = 480
+
+
+class VideoProbe(BaseModel):
+    """Properties of an input video, read from its container."""
+
+    width: int
+    height: int
+    frame_rate: float
+    frame_count: int
+
+    @property
+    def duration_seconds(self) -> float:
+        if self.frame_rate <= 0 or self.frame_count <= 0:
+            return 0.0
+        return self.frame_count / self.frame_rate
+
+
+class ProcessingPlan(BaseModel):
+    """
+    How a video is decoded for analysis so the job stays within its budgets.
+
+    Pose inference runs on every `frame_step`-th source frame, resized to
+    `width` x `height`, and stops after `max_source_frames` source frames.
+    """
+
+    source_width: int
+    source_height: int
+    source_frame_rate: float
+    source_frame_count: int
+    width: int
+    height: int
+    frame_step: int = 1
+    max_source_frames: Optional[int] = None
+    estimated_memory_mb: float = 0.0
+    adjustments: List[str] = []
+
+    @property
+    def source(self) -> VideoProbe:
+        return VideoProbe(
+            width=self.source_width,
+            height=self.source_height,
+            frame_rate=self.source_frame_rate,
+            frame_count=self.source_frame_count,
+        )
+
+    @property
+    def frame_rate(self) -> float:
+        """Frame rate of the analyzed frames."""
+        return self.source_frame_rate / self.frame_step
+
+    @property
+    def duration_seconds(self) -> float:
+        """Duration of the analyzed part of the video."""
+        source_frames = self.source_frame_count or self.max_source_frames or 0
+        if self.max_source_frames:
+            source_frames = min(source_frames, self.max_source_frames)
+        return source_frames / self.source_frame_rate
+
+    @property
+    def frame_count(self) -> Optional[int]:
+        """Number of frames analyzed, None when the source does not tell."""
+        source_frames = self.source_frame_count or self.max_source_frames
+        if not source_frames:
+            return None
+        if self.max_source_frames:
+            source_frames = min(source_frames, self.max_source_frames)
+        return math.ceil(source_frames / self.frame_step)
+
+    def samples(self, source_frame: int) -> bool:
+        """Whether the source frame at this index is analyzed."""
+        if self.max_source_frames and source_frame >= self.max_source_frames:
+            return False
+        return source_frame % self.frame_step == 0
+
+    def resize(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        if (width, height) == (self.width, self.height):
+            return frame
+        return cv2.resize(
+            frame, (self.width, self.height), interpolation=cv2.INTER_AREA
+        )
+
+
+def probe_video(video_path: str) -> VideoProbe:
+    """Read the resolution, frame rate and frame count of a video."""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            raise RuntimeError(f"Failed to open video: {video_path}")
+        return VideoProbe(
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            frame_rate=max(cap.get(cv2.CAP_PROP_FPS), 0.0),
+            frame_count=max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0),
+        )
+    finally:
+        cap.release()
+
+
+def _even(value: float) -> int:
+    """Round down to an even size, which video encoders require."""
+    return max(2, int(value) // 2 * 2)
+
+
+def _estimate_memory_mb(
+    probe: VideoProbe, width: int, height: int, frames: int
+) -> float:
+    decoded = probe.width * probe.height * 3
+    analyzed = width * height * 3 * FRAME_COPIES
+    landmarks = frames * POSE_FRAME_BYTES
+    return POSE_MODEL_MEMORY_MB + (decoded + analyzed + landmarks) / 2**20
+
+
+def plan_processing(probe: VideoProbe) -> ProcessingPlan:
+    """
+    Fit the analysis of a video into the configured budgets.
+
+    Videos over budget are degraded gracefully instead of rejected: first
+    downscaled (not below `MIN_ANALYSIS_HEIGHT`), then analyzed at a lower
+    frame rate (not below `ANALYSIS_MIN_FPS`), and only then cut short. Every
+    adjustment is described in `adjustments`.
+    """
+    if probe.width <= 0 or probe.height <= 0 or probe.frame_rate <= 0:
+        raise ValueError("Could not read the resolution or frame rate of the video")
+
+    min_scale = min(1.0, MIN_ANALYSIS_HEIGHT / probe.height)
+    max_frame_step = max(1, math.floor(probe.frame_rate / Config.ANALYSIS_MIN_FPS))
+    source_frames = probe.frame_count
+    scale = 1.0
+    frame_step = 1
+
+    # Decoded pixels per second: downscale first, then lower the frame rate
+    pixel_rate = probe.width * probe.height * probe.frame_rate
+    if pixel_rate > Config.ANALYSIS_MAX_PIXELS_PER_SECOND:
+        budget = Config.ANALYSIS_MAX_PIXELS_PER_SECOND
+        scale = max(min_scale, math.sqrt(budget / pixel_rate))
+        frame_step = min(max_frame_step, math.ceil(pixel_rate * scale**2 / budget))
+
+    # Frame count: lower the frame rate, then cut the video short
+    max_frames = Config.ANALYSIS_MAX_FRAMES
+    if source_frames and math.ceil(source_frames / frame_step) > max_frames:
+        frame_step = max(
+            frame_step, min(max_frame_step, math.ceil(source_frames / max_frames))
+        )
+    max_source_frames = None
+    if not source_frames or math.ceil(source_frames / frame_step) > max_frames:
+        max_source_frames = max_frames * frame_step
+
+    # Peak memory: downscale further, then cut the video short
+    def estimate() -> float:
+        frames = math.ceil(
+            min(source_frames or max_source_frames, max_source_frames or source_frames)
+            / frame_step
+        )
+        return _estimate_memory_mb(
+            probe, _even(probe.width * scale), _even(probe.height * scale), frames
+        )
+
+    while estimate() > Config.ANALYSIS_MAX_MEMORY_MB and scale > min_scale:
+        scale = max(min_scale, scale * 0.75)
+    while estimate() > Config.ANALYSIS_MAX_MEMORY_MB:
+        current = max_source_frames or source_frames
+        if current <= frame_step:
+            break
+        max_source_frames = max(frame_step, current // 2)
+
+    width, height = (
+        (probe.width, probe.height)
+        if scale == 1.0
+        else (_even(probe.width * scale), _even(probe.height * scale))
+    )
+
+    adjustments = []
+    if (width, height) != (probe.width, probe.height):
+        adjustments.append(
+            f"Downscaled from {probe.width}x{probe.height} to {width}x{height}"
+        )
+    if frame_step > 1:
+        adjustments.append(
+            f"Analyzed every {frame_step} frames ({probe.frame_rate / frame_step:.1f} "
+            f"of {probe.frame_rate:.1f} fps)"
+        )
+    if source_frames and max_source_frames and max_source_frames < source_frames:
+        adjustments.append(
+            f"Analyzed the first {max_source_frames / probe.frame_rate:.0f} s "
+            f"of {probe.duration_seconds:.0f} s"
+        )
+    elif source_frames:
+        max_source_frames = None
+
+    return ProcessingPlan(
+        source_width=probe.width,
+        source_height=probe.height,
+        source_frame_rate=probe.frame_rate,
+        source_frame_count=probe.frame_count,
+        width=width,
+        height=height,
+        frame_step=frame_step,
+        max_source_frames=max_source_frames,
+        estimated_memory_mb=round(estimate(), 1),
+        adjustments=adjustments,
+    )
@@ -0,0 +1,149 @@
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import mediapipe as mp
+from pydantic import BaseModel
+
+from src.config import Config
+from src.gait_sessions.video_budget import ProcessingPlan
+
+# Landmarks the gait metrics are computed from, per body part: the hips and
+# the feet (ankle and foot index)
+BODY_PARTS: Dict[str, Tuple[int, ...]] = {
+    "left hip": (23,),
+    "right hip": (24,),
+    "left foot": (27, 31),
+    "right foot": (28, 32),
+}
+
+# Spacing of the sampled frames when the frame count of a video is unknown
+UNKNOWN_LENGTH_SAMPLE_SECONDS = 0.5
+
+
+class VideoRejected(Exception):
+    """Raised when a video cannot yield gait metrics, with the reason why."""
+
+
+class QualityReport(BaseModel):
+    """Outcome of the pose check on a handful of frames sampled across a video."""
+
+    sampled_frames: int
+    detection_rate: float
+    # Share of the frames with a detected pose where the part is in view
+    visible_rates: Dict[str, float]
+    rejection: Optional[str] = None
+    warnings: List[str] = []
+
+
+def _sample_positions(plan: ProcessingPlan, samples: int) -> List[int]:
+    """Source frame indices spread evenly over the analyzed part of the video."""
+    total = plan.source_frame_count
+    if plan.max_source_frames:
+        total = min(total or plan.max_source_frames, plan.max_source_frames)
+    if not total:
+        step = max(1, round(plan.source_frame_rate * UNKNOWN_LENGTH_SAMPLE_SECONDS))
+        return [i * step for i in range(samples)]
+    samples = min(samples, total)
+    return [int((i + 0.5) * total / samples) for i in range(samples)]
+
+
+def _in_view(landmark) -> bool:
+    return (
+        landmark.visibility >= Config.QUALITY_MIN_LANDMARK_VISIBILITY
+        and 0.0 <= landmark.x <= 1.0
+        and 0.0 <= landmark.y <= 1.0
+    )
+
+
+def _join(parts: List[str]) -> str:
+    return parts[0] if len(parts) == 1 else f"{', '.join(parts[:-1])} and {parts[-1]}"
+
+
+def assess_video_quality(
+    video_path: str, plan: ProcessingPlan, landmarker
+) -> QualityReport:
+    """
+    Run the pose model on `QUALITY_SAMPLE_FRAMES` frames spread across the
+    video, and reject it when too few show a person, or when a hip or foot
+    is out of view in most of them. Borderline videos pass with warnings.
+
+    `landmarker` is a pose landmarker in image mode, since the sampled
+    frames are far apart.
+    """
+    detected = 0
+    decoded = 0
+    in_view = {part: 0 for part in BODY_PARTS}
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Failed to open video: {video_path}")
+    try:
+        for position in _sample_positions(plan, Config.QUALITY_SAMPLE_FRAMES):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+            ret, frame = cap.read()
+            if not ret:
+                continue
+            decoded += 1
+            rgb = cv2.cvtColor(plan.resize(frame), cv2.COLOR_BGR2RGB)
+            result = landmarker.detect(
+                mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
+            )
+            if not result.pose_landmarks:
+                continue
+            detected += 1
+            pose = result.pose_landmarks[0]
+            for part, indices in BODY_PARTS.items():
+                if all(_in_view(pose[index]) for index in indices):
+                    in_view[part] += 1
+    finally:
+        cap.release()
+
+    detection_rate = detected / decoded if decoded else 0.0
+    visible_rates = {
+        part: (count / detected if detected else 0.0)
+        for part, count in in_view.items()
+    }
+    report = QualityReport(
+        sampled_frames=decoded,
+        detection_rate=round(detection_rate, 3),
+        visible_rates={part: round(rate, 3) for part, rate in visible_rates.items()},
+    )
+
+    if decoded == 0:
+        report.rejection = "The video could not be read."
+        return report
+    if detected == 0:
+        report.rejection = (
+            "No person was detected in the video. Film the patient walking, "
+            "from head to toe."
+        )
+        return report
+    if detection_rate < Config.QUALITY_MIN_DETECTION_RATE:
+        report.rejection = (
+            f"A person was detected in only {detection_rate:.0%} of the video. "
+            "Keep the patient in view for the whole walk."
+        )
+        return report
+    hidden = [
+        part
+        for part, rate in visible_rates.items()
+        if rate < Config.QUALITY_MIN_VISIBLE_RATE
+    ]
+    if hidden:
+        verb = "is" if len(hidden) == 1 else "are"
+        report.rejection = (
+            f"The patient's {_join(hidden)} {verb} out of view in most of the "
+            "video. Film the patient from head to toe, with both legs in view."
+        )
+        return report
+
+    if detection_rate < Config.QUALITY_WARN_RATE:
+        report.warnings.append(
+            f"Patient detected in only {detection_rate:.0%} of the video"
+        )
+    for part, rate in visible_rates.items():
+        if rate < Config.QUALITY_WARN_RATE:
+            report.warnings.append(
+                f"The {part} is out of view in {1 - rate:.0%} of the video"
+            )
+    return report
@@ -0,0 +1,15 @@
+"""
+Entry module of the Celery workers: `celery -A src.gait_sessions.worker`.
+
+The library thread pools are capped before the tasks, and numpy with them,
+are imported, so the worker children forked afterwards inherit the limits.
+The API imports the tasks from `celery_jobs` and keeps the library defaults.
+"""
+
+from src.gait_sessions.cpu_topology import limit_library_threads
+
+limit_library_threads()
+
+from src.gait_sessions.celery_jobs import celery_app  # noqa: E402
+
+app = celery_app
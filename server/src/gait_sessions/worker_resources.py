@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Coroutine, Optional, TypeVar
+
+from src.config import Config
+from src.db import main as db
+from src.db.redis import close_async_redis, reset_redis_clients
+
+T = TypeVar("T")
+
+
+class WorkerResources:
+    """
+    Resources owned by one Celery worker process: a persistent event loop
+    and an async database engine with its own connection pool.
+
+    Async clients bind their connections to the loop they first ran on, so
+    every task of the process runs on the same loop instead of paying the
+    connection setup again, and nothing is shared with the parent process.
+
+    The loop runs in its own thread and tasks submit their coroutines to
+    it, so with a thread pool (`-P threads`) the jobs of one process share
+    the loop: one job's downloads, uploads and LLM waits progress while
+    another's CPU stages run on the inference thread, see `run_cpu_bound`.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.loop = asyncio.new_event_loop()
+        self.engine = db.create_async_db_engine(
+            pool_size=Config.WORKER_DB_POOL_SIZE,
+            max_overflow=Config.WORKER_DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+        db.use_engine(self.engine)
+        self.tasks_run = 0
+        self.active_tasks = 0
+        self._counter_lock = threading.Lock()
+        self.thread = threading.Thread(
+            target=self._run_loop, name="worker-event-loop", daemon=True
+        )
+        self.thread.start()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coroutine: Coroutine[None, None, T]) -> T:
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("Cannot block the worker event loop on a coroutine")
+        with self._counter_lock:
+            self.tasks_run += 1
+            self.active_tasks += 1
+        try:
+            return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+        finally:
+            with self._counter_lock:
+                self.active_tasks -= 1
+
+    def connections_checked_out(self) -> int:
+        return self.engine.sync_engine.pool.checkedout()
+
+    async def _release(self) -> None:
+        await self.engine.dispose()
+        await close_async_redis()
+        await self.loop.shutdown_asyncgens()
+
+    def shutdown(self) -> None:
+        if self.loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._release(), self.loop).result(
+                timeout=30
+            )
+        except Exception as e:
+            print(f"Failed to release worker resources: {str(e)}")
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+            self.loop.close()
+
+
+_resources: Optional[WorkerResources] = None
+_resources_lock = threading.Lock()
+_inference_executor: Optional[ThreadPoolExecutor] = None
+_inference_pid: Optional[int] = None
+
+
+def init_worker_resources() -> WorkerResources:
+    """
+    Set up the resources of a freshly forked worker process.
+
+    Pooled connections and Redis clients inherited from the parent are
+    dropped without being closed, since the parent still owns the sockets.
+    """
+    global _resources, _inference_executor
+    db.async_engine.sync_engine.dispose(close=False)
+    reset_redis_clients()
+    # Threads do not survive a fork, the parent's executor is unusable
+    _inference_executor = None
+    _resources = WorkerResources()
+    return _resources
+
+
+def get_worker_resources() -> WorkerResources:
+    """
+    Return the resources of the current process, creating them on first use
+    for pools that do not fork, such as the solo and thread pools.
+    """
+    with _resources_lock:
+        if _resources is None or _resources.pid != os.getpid():
+            return init_worker_resources()
+        return _resources
+
+
+def shutdown_worker_resources() -> None:
+    global _resources, _inference_executor
+    if _inference_executor is not None and _inference_pid == os.getpid():
+        _inference_executor.shutdown(wait=False, cancel_futures=True)
+    _inference_executor = None
+    if _resources is not None and _resources.pid == os.getpid():
+        _resources.shutdown()
+    _resources = None
+
+
+def inference_executor() -> ThreadPoolExecutor:
+    """
+    The threads running the CPU-bound stages of the current process.
+
+    One thread by default: pose inference already uses every core it gets,
+    and analyses of the process take turns on it.
+    """
+    global _inference_executor, _inference_pid
+    with _resources_lock:
+        if _inference_executor is None or _inference_pid != os.getpid():
+            _inference_executor = ThreadPoolExecutor(
+                max_workers=Config.INFERENCE_THREADS,
+                thread_name_prefix="inference",
+            )
+            _inference_pid = os.getpid()
+        return _inference_executor
+
+
+async def run_cpu_bound(function: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a CPU-bound function on the inference thread and wait for it without
+    blocking the event loop, so other jobs of the process keep doing I/O.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        inference_executor(), functools.partial(function, *args, **kwargs)
+    )
+
+
+def warn_if_connections_held(stage: str) -> int:
+    """
+    Check that no database connection is held entering a long stage, where it
+    would sit idle while API requests wait for the pool.
+
+    Connections are only attributed to the stage when no other job runs in
+    the process. Returns the number of connections checked out, and raises
+    instead of warning when `ASSERT_NO_DB_CONNECTIONS_DURING_COMPUTE` is set.
+    """
+    resources = get_worker_resources()
+    checked_out = resources.connections_checked_out()
+    if checked_out and resources.active_tasks <= 1:
+        message = f"{checked_out} database connection(s) held during {stage} stage"
+        if Config.ASSERT_NO_DB_CONNECTIONS_DURING_COMPUTE:
+            raise RuntimeError(message)
+        print(f"Warning: {message}")
+    return checked_out
+
+
+def run_async(coroutine: Coroutine[None, None, T]) -> T:
+    """Run a coroutine to completion on the worker's persistent event loop."""
+    return get_worker_resources().run(coroutine)
@@ -1,13 +1,14 @@
-from datetime import date
+from datetime import date, datetime, timezone
 from math import ceil
 from dateutil.relativedelta import relativedelta
 from fastapi import HTTPException, status
-from sqlalchemy import func
+from sqlalchemy import func, update
 from sqlalchemy.orm import noload
 from sqlmodel import select
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.db.models import Patient
+from src.db.models import GaitSession, Patient
+from src.db.model.enum import AnalysisStatus
 from src.patients.schema import (
     PatientCreateModel,
     PatientListResponseModel,
@@ -16,6 +17,12 @@ from src.patients.schema import (
 from src.db.model.injury import PatientInjury
 from src.db.model.prosthetic import Prosthetic
 from src.db.model.medical_condition import PatientMedicalCondition
+from src.gait_sessions.celery_jobs import (
+    job_runner,
+    purge_deleted_task,
+    stop_analysis,
+)
+from src.gait_sessions.prefetch import cancel_prefetch
 
 from src.utils import PaginatedResponse
 
@@ -36,9 +43,14 @@ class PatientsService:
                 noload(Patient.prosthetics),
                 noload(Patient.gait_sessions),
             )
+            .where(Patient.deleted_at.is_(None))
             .order_by(Patient.first_name, Patient.last_name)
         )
-        total_patients_query = select(func.count()).select_from(Patient)
+        total_patients_query = (
+            select(func.count())
+            .select_from(Patient)
+            .where(Patient.deleted_at.is_(None))
+        )
 
         if search:
             full_name = Patient.first_name + " " + Patient.last_name
@@ -65,7 +77,9 @@ class PatientsService:
         }
 
     async def get_patient_by_id(self, id: int, session: AsyncSession) -> Patient:
-        statement = select(Patient).where(Patient.id == id)
+        statement = select(Patient).where(
+            Patient.id == id, Patient.deleted_at.is_(None)
+        )
         result = await session.exec(statement)
         patient = result.first()
 
@@ -80,21 +94,27 @@ class PatientsService:
     async def get_patient_by_email(
         self, email: str, session: AsyncSession
     ) -> Patient | None:
-        statement = select(Patient).where(Patient.email == email)
+        statement = select(Patient).where(
+            Patient.email == email, Patient.deleted_at.is_(None)
+        )
         result = await session.exec(statement)
         return result.first()
 
     async def get_patient_by_ssn(
         self, ssn: str, session: AsyncSession
     ) -> Patient | None:
-        statement = select(Patient).where(Patient.ssn == ssn)
+        statement = select(Patient).where(
+            Patient.ssn == ssn, Patient.deleted_at.is_(None)
+        )
         result = await session.exec(statement)
         return result.first()
 
     async def get_patient_by_phone_number(
         self, phone_number: str, session: AsyncSession
     ) -> Patient | None:
-        statement = select(Patient).where(Patient.phone_number == phone_number)
+        statement = select(Patient).where(
+            Patient.phone_number == phone_number, Patient.deleted_at.is_(None)
+        )
         result = await session.exec(statement)
         return result.first()
 
@@ -171,29 +191,39 @@ class PatientsService:
         return patient
 
     async def delete_patient(self, id: int, session: AsyncSession) -> None:
+        """
+        Delete a patient with their sessions. They are hidden right away,
+        running analyses are stopped, and everything the patient owns is
+        purged in the background.
+        """
         patient = await self.get_patient_by_id(id, session)
 
-        medical_conditions_stmt = select(PatientMedicalCondition).where(
-            PatientMedicalCondition.patient_id == id
+        result = await session.exec(
+            select(GaitSession.id, GaitSession.analysis_status).where(
+                GaitSession.patient_id == id,
+                GaitSession.deleted_at.is_(None),
+            )
+        )
+        sessions = result.all()
+        running_session_ids = [
+            row.id
+            for row in sessions
+            if row.analysis_status
+            in (AnalysisStatus.Pending, AnalysisStatus.InProgress)
+        ]
+
+        deleted_at = datetime.now(timezone.utc)
+        patient.deleted_at = deleted_at
+        await session.execute(
+            update(GaitSession)
+            .where(GaitSession.patient_id == id, GaitSession.deleted_at.is_(None))
+            .values(deleted_at=deleted_at)
         )
-        medical_conditions_result = await session.exec(medical_conditions_stmt)
-        medical_conditions = medical_conditions_result.all()
-        for condition in medical_conditions:
-            await session.delete(condition)
-
-        injuries_stmt = select(PatientInjury).where(PatientInjury.patient_id == id)
-        injuries_result = await session.exec(injuries_stmt)
-        injuries = injuries_result.all()
-        for injury in injuries:
-            await session.delete(injury)
-
-        prosthetics_stmt = select(Prosthetic).where(Prosthetic.patient_id == id)
-        prosthetics_result = await session.exec(prosthetics_stmt)
-        prosthetics = prosthetics_result.all()
-        for prosthetic in prosthetics:
-            await session.delete(prosthetic)
-
-        await session.delete(patient)
         await session.commit()
 
+        await cancel_prefetch(*(row.id for row in sessions))
+        for session_id in running_session_ids:
+            await stop_analysis(session_id)
+        await job_runner.enqueue(purge_deleted_task.name)
+
         return None
@@ -0,0 +1,51 @@
+from src.db.model.enum import JobStatus
+from src.gait_sessions.celery_jobs import celery_app
+from src.gait_sessions.job_runner import execute_job
+
+calls = []
+
+
+@celery_app.task(bind=True, max_retries=2)
+def flaky_task(self):
+    calls.append(self.request.retries)
+    raise self.retry(exc=RuntimeError("storage unavailable"), countdown=300)
+
+
+@celery_app.task(
+    autoretry_for=(RuntimeError,), retry_backoff=30, retry_jitter=False, max_retries=5
+)
+def flaky_report_task():
+    raise RuntimeError("LLM unavailable")
+
+
+def test_retries_are_queued_after_their_countdown():
+    calls.clear()
+
+    outcome = execute_job(flaky_task.name, [], "job-1")
+
+    # Ran once, rather than retrying in place
+    assert calls == [0]
+    assert outcome["status"] == JobStatus.Queued
+    assert outcome["retried"]
+    assert outcome["countdown"] == 300
+    assert "storage unavailable" in outcome["error"]
+
+
+def test_retry_count_is_carried_over_until_max_retries():
+    calls.clear()
+
+    assert execute_job(flaky_task.name, [], "job-2", retries=1)["retried"]
+    outcome = execute_job(flaky_task.name, [], "job-2", retries=2)
+
+    assert calls == [1, 2]
+    assert outcome["status"] == JobStatus.Failed
+    assert "storage unavailable" in outcome["error"]
+
+
+def test_autoretries_back_off():
+    first = execute_job(flaky_report_task.name, [], "job-3")
+    third = execute_job(flaky_report_task.name, [], "job-3", retries=2)
+
+    assert first["status"] == third["status"] == JobStatus.Queued
+    assert first["countdown"] == 30
+    assert third["countdown"] == 120
@@ -0,0 +1,36 @@
+import asyncio
+
+import fakeredis
+
+from src.gait_sessions.llm_cache import LLMResponseCache
+
+
+def test_redis_cache_evicts_least_recently_used():
+    async def main():
+        cache = LLMResponseCache(
+            max_entries=2,
+            redis_client=fakeredis.aioredis.FakeRedis(decode_responses=True),
+            enabled=True,
+        )
+        await cache.set("a", "1")
+        await cache.set("b", "2")
+        assert await cache.get("a") == "1"
+        await cache.set("c", "3")
+
+        assert await cache.get("b") is None
+        assert await cache.get("c") == "3"
+        assert await cache.stats() == {"hits": 2, "misses": 1, "entries": 2}
+
+    asyncio.run(main())
+
+
+def test_disk_cache_round_trip(tmp_path):
+    async def main():
+        cache = LLMResponseCache(cache_dir=str(tmp_path), enabled=True)
+        await cache.set("a", "1")
+
+        assert await cache.get("a") == "1"
+        assert await cache.get("missing") is None
+        assert await cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import fakeredis
+
+from src.gait_sessions.llm_limiter import LLMRateLimiter, _LocalTokenBuckets
+
+
+def make_limiter(**kwargs) -> LLMRateLimiter:
+    """A limiter on a fresh in-memory Redis, created inside the running loop."""
+    kwargs.setdefault("max_concurrent", 2)
+    kwargs.setdefault("requests_per_minute", 6000)
+    kwargs.setdefault("tokens_per_minute", 10**9)
+    return LLMRateLimiter(
+        redis_client=fakeredis.aioredis.FakeRedis(decode_responses=True), **kwargs
+    )
+
+
+async def take(limiter: LLMRateLimiter, now: float, tokens: int) -> int:
+    """Run the token bucket script at a given time, returning the wait in ms."""
+    return await limiter._bucket_script(
+        keys=[limiter.keys["requests"], limiter.keys["tokens"]],
+        args=[now, *limiter._bucket_args(tokens)],
+    )
+
+
+def test_concurrent_calls_are_capped():
+    async def main():
+        limiter = make_limiter(max_concurrent=2)
+        holding = 0
+        max_holding = 0
+
+        async def call():
+            nonlocal holding, max_holding
+            async with limiter.acquire(100):
+                holding += 1
+                max_holding = max(max_holding, holding)
+                await asyncio.sleep(0.05)
+                holding -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        assert max_holding == 2
+        # Every slot was given back
+        assert await limiter.redis.zcard(limiter.keys["queue"]) == 0
+        assert await limiter.redis.zcard(limiter.keys["heartbeats"]) == 0
+
+    asyncio.run(main())
+
+
+def test_waiting_calls_are_admitted_in_arrival_order():
+    async def main():
+        limiter = make_limiter(max_concurrent=1)
+        admitted = []
+
+        async def call(name: str):
+            async with limiter.acquire(100):
+                admitted.append(name)
+                await asyncio.sleep(0.05)
+
+        tasks = []
+        for name in ("first", "second", "third", "fourth"):
+            tasks.append(asyncio.create_task(call(name)))
+            # Let the call draw its ticket before the next one arrives
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+        assert admitted == ["first", "second", "third", "fourth"]
+
+    asyncio.run(main())
+
+
+def test_slots_of_dead_holders_are_reclaimed():
+    async def main():
+        limiter = make_limiter(max_concurrent=1, lease_seconds=10)
+        # A holder that stopped renewing its heartbeat a lease ago
+        await limiter._semaphore_script(
+            keys=[limiter.keys["queue"], limiter.keys["heartbeats"]],
+            args=["dead", time.time() - 11, 10, 1, 0],
+        )
+        async with limiter.acquire(100) as waited:
+            assert waited < 1
+
+    asyncio.run(main())
+
+
+def test_token_buckets_charge_requests_and_tokens():
+    async def main():
+        # 2 requests and 1000 tokens a minute
+        limiter = make_limiter(requests_per_minute=2, tokens_per_minute=1000)
+        assert await take(limiter, 100.0, 400) == 0
+        assert await take(limiter, 100.0, 400) == 0
+        # No request left, refilled at one every 30 s
+        assert await take(limiter, 100.0, 400) == 30000
+        # The request budget is back, but the 200 tokens left plus the 500
+        # refilled meanwhile are not enough
+        assert await take(limiter, 130.0, 800) == 6000
+        assert await take(limiter, 137.0, 800) == 0
+        # Requests larger than the bucket wait for a full one
+        assert await take(limiter, 1000.0, 5000) == 0
+
+    asyncio.run(main())
+
+
+def test_local_buckets_match_the_redis_script():
+    async def main():
+        limiter = make_limiter(requests_per_minute=2, tokens_per_minute=1000)
+        local = _LocalTokenBuckets()
+        local.ts = 100.0
+        for now, tokens in ((100.0, 400), (100.0, 400), (100.0, 400), (130.0, 800)):
+            expected = await take(limiter, now, tokens)
+            waited = local.take(now, *limiter._bucket_args(tokens))
+            assert round(waited) == expected
+
+    asyncio.run(main())
+
+
+def test_wait_times_are_recorded():
+    async def main():
+        limiter = make_limiter(max_concurrent=1)
+
+        async def call():
+            async with limiter.acquire(100):
+                await asyncio.sleep(0.2)
+
+        await asyncio.gather(call(), call(), call())
+        stats = await limiter.stats()
+        assert stats["acquired"] == 3
+        # The last call waited for the two before it
+        assert stats["wait_ms_max"] >= 350
+        assert 0 < stats["wait_ms_avg"] < stats["wait_ms_max"]
+
+    asyncio.run(main())
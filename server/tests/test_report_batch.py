@@ -0,0 +1,157 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from src.db.model.enum import AnalysisStatus
+from src.db.models import GaitMetric
+from src.gait_sessions import report_batch
+from src.gait_sessions.gait_analysis_pipeline import GaitAnalysisPipeline
+from src.gait_sessions.llm_limiter import LLMRateLimiter
+from src.gait_sessions.llm_providers import LocalGaitReportLLM
+
+
+class FakeSession:
+    """Records the bulk UPDATEs of `persist_reports` instead of running them."""
+
+    def __init__(self):
+        self.updated_rows: List[dict] = []
+        self.commits = 0
+
+    async def execute(self, statement, rows=None):
+        self.updated_rows.extend(rows or [])
+
+    async def commit(self):
+        self.commits += 1
+
+
+class StubPipeline(GaitAnalysisPipeline):
+    """Pipeline answered by the local LLM stand-in, counting reports in flight."""
+
+    def __init__(self):
+        super().__init__()
+        self.llm = LocalGaitReportLLM(latency_seconds=0.05)
+        self.llm_limiter = LLMRateLimiter(
+            max_concurrent=100, requests_per_minute=6000, tokens_per_minute=10**9
+        )
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate_report(self, gait_session, stream=None, use_cache=True):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().generate_report(gait_session, stream, use_cache)
+        finally:
+            self.in_flight -= 1
+
+
+def make_session(session_id: int, with_metrics: bool = True):
+    metrics = [
+        GaitMetric(
+            gait_session_id=session_id,
+            measurement_index=index,
+            stance_time_left=0.6 + index / 100,
+            stance_time_right=0.62,
+            swing_time_left=0.4,
+            swing_time_right=0.41,
+            step_time_left=0.5,
+            step_time_right=0.52,
+            double_support_time_left=0.1,
+            double_support_time_right=0.11,
+        )
+        for index in range(3)
+    ]
+    # The age makes the prompt, and so the stand-in's report, unique
+    patient = SimpleNamespace(
+        age=20 + session_id,
+        weight=70.0,
+        prosthetics=[],
+        medical_conditions=[],
+        injuries=[],
+    )
+    return SimpleNamespace(
+        id=session_id, patient=patient, gait_metrics=metrics if with_metrics else []
+    )
+
+
+@pytest.fixture
+def run_batch(monkeypatch):
+    """Run `generate_reports_batch` over the given sessions, without a database."""
+
+    def run(gait_sessions, concurrency: int = 4):
+        db_session = FakeSession()
+
+        async def get_session():
+            yield db_session
+
+        async def load_report_jobs(*args, **kwargs):
+            return gait_sessions
+
+        monkeypatch.setattr(report_batch, "get_session", get_session)
+        monkeypatch.setattr(report_batch, "load_report_jobs", load_report_jobs)
+        pipeline = StubPipeline()
+        summary = asyncio.run(
+            report_batch.generate_reports_batch(
+                pipeline, concurrency=concurrency, use_cache=False
+            )
+        )
+        return summary, db_session, pipeline
+
+    return run
+
+
+def test_reports_are_mapped_back_to_their_sessions(run_batch):
+    gait_sessions = [make_session(session_id) for session_id in range(1, 7)]
+
+    summary, db_session, pipeline = run_batch(gait_sessions, concurrency=3)
+
+    assert summary["requested"] == 6
+    assert summary["succeeded"] == 6
+    assert summary["failed"] == {}
+    assert summary["latency_seconds"]["count"] == 6
+    assert db_session.commits >= 1
+    persisted = {row["id"]: row for row in db_session.updated_rows}
+    assert sorted(persisted) == [1, 2, 3, 4, 5, 6]
+    for gait_session in gait_sessions:
+        expected = asyncio.run(
+            pipeline.ask_gait_analysis(
+                pipeline.build_patient_info(gait_session), use_cache=False
+            )
+        )
+        row = persisted[gait_session.id]
+        assert row["detailed_ai_analysis"] == expected.detailed_analysis
+        assert row["analysis_status"] == AnalysisStatus.Completed
+
+
+def test_failed_reports_are_not_persisted(run_batch):
+    gait_sessions = [
+        make_session(session_id, with_metrics=session_id not in (2, 5))
+        for session_id in range(1, 7)
+    ]
+
+    summary, db_session, _ = run_batch(gait_sessions)
+
+    assert summary["succeeded"] == 4
+    assert sorted(summary["failed"]) == [2, 5]
+    assert "no gait metrics" in summary["failed"][2]
+    assert sorted(row["id"] for row in db_session.updated_rows) == [1, 3, 4, 6]
+
+
+def test_nothing_is_persisted_when_every_report_fails(run_batch):
+    gait_sessions = [make_session(1, with_metrics=False), make_session(2, False)]
+
+    summary, db_session, _ = run_batch(gait_sessions)
+
+    assert summary["succeeded"] == 0
+    assert db_session.updated_rows == []
+
+
+def test_concurrency_is_bounded(run_batch):
+    gait_sessions = [make_session(session_id) for session_id in range(1, 11)]
+
+    summary, _, pipeline = run_batch(gait_sessions, concurrency=3)
+
+    assert summary["succeeded"] == 10
+    assert pipeline.max_in_flight == 3
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.config import Config
+from src.db import main as db
+from src.db.model.background_job import BackgroundJob
+from src.db.model.enum import AnalysisStatus
+from src.gait_sessions import celery_jobs
+from src.gait_sessions.worker_resources import (
+    init_worker_resources,
+    run_async,
+    shutdown_worker_resources,
+    warn_if_connections_held,
+)
+
+SESSION_ID = 1
+
+
+class StubPipeline:
+    """Compute stage that records the connections held while it runs."""
+
+    def __init__(self):
+        self.checked_out = None
+
+    async def run_compute_stages(self, checkpoints, progress=None, cancellation=None):
+        self.checked_out = db.async_engine.pool.checkedout()
+        assert self.checked_out == 0
+
+
+async def load_session(session_id, session):
+    """Stands in for the ORM query, whose Postgres arrays SQLite cannot map."""
+    await session.exec(text("SELECT 1"))
+    return SimpleNamespace(
+        id=session_id,
+        video_url="https://example.com/videos/gait.mp4",
+        analysis_status=AnalysisStatus.InProgress,
+        deleted_at=None,
+    )
+
+
+async def create_job_table():
+    async with db.async_engine.begin() as conn:
+        await conn.run_sync(BackgroundJob.__table__.create)
+
+
+async def queued_tasks():
+    async for session in db.get_session():
+        return (await session.exec(select(BackgroundJob.task_name))).all()
+
+
+@pytest.fixture
+def worker(worker_database, monkeypatch):
+    monkeypatch.setattr(Config, "ASSERT_NO_DB_CONNECTIONS_DURING_COMPUTE", True)
+    monkeypatch.setattr(celery_jobs, "get_gait_session_by_id", load_session)
+    resources = init_worker_resources()
+    run_async(create_job_table())
+    yield resources
+    shutdown_worker_resources()
+
+
+def test_no_connection_held_during_compute(worker):
+    pipeline = StubPipeline()
+
+    result = run_async(celery_jobs._extract_gait(SESSION_ID, pipeline))
+
+    assert result["status"] == "processed"
+    assert pipeline.checked_out == 0
+    assert worker.connections_checked_out() == 0
+    assert run_async(queued_tasks()) == [celery_jobs.persist_gait_analysis_task.name]
+
+
+def test_connection_held_during_compute_is_detected(worker):
+    async def hold_connection():
+        async with AsyncSession(db.async_engine) as session:
+            await session.exec(text("SELECT 1"))
+            assert db.async_engine.pool.checkedout() == 1
+            warn_if_connections_held("compute")
+
+    with pytest.raises(RuntimeError, match="held during compute stage"):
+        run_async(hold_connection())
+    assert worker.connections_checked_out() == 0
@@ -0,0 +1,66 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from celery.utils import uuid
+
+from src.db import main as db
+from src.db.model.background_job import JobStatus
+from src.gait_sessions.job_runner import execute_job
+from src.gait_sessions.queue_benchmark import benchmark_worker_resources_task
+from src.gait_sessions.worker_resources import (
+    init_worker_resources,
+    shutdown_worker_resources,
+)
+
+TASKS = 20
+
+
+def assert_resources_reused(probes):
+    """All tasks ran on one loop and one engine, releasing their connection."""
+    assert len({probe["pid"] for probe in probes}) == 1
+    assert len({probe["loop"] for probe in probes}) == 1
+    assert len({probe["engine"] for probe in probes}) == 1
+    assert sorted(probe["tasks_run"] for probe in probes) == list(range(1, TASKS + 1))
+    assert all(probe["connections_checked_out"] == 1 for probe in probes)
+    assert all(probe["connections_left_open"] == 0 for probe in probes)
+
+
+def test_tasks_of_a_forked_worker_share_its_loop_and_engine(worker_database):
+    name = benchmark_worker_resources_task.name
+    # One pool process set up like a prefork Celery worker, see `LocalJobRunner`
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=init_worker_resources,
+    ) as pool:
+        outcomes = [
+            pool.submit(execute_job, name, [], uuid()).result() for _ in range(TASKS)
+        ]
+
+    # A loop or connection shared across tasks fails them with "attached to
+    # a different loop" or "another operation is in progress"
+    assert [outcome.get("error") for outcome in outcomes] == [None] * TASKS
+    assert {outcome["status"] for outcome in outcomes} == {JobStatus.Succeeded}
+    probes = [outcome["result"] for outcome in outcomes]
+    assert_resources_reused(probes)
+    # The worker's engine is its own, not the parent's
+    assert probes[0]["engine"] != id(db.async_engine)
+
+
+def test_threads_of_a_worker_share_its_loop_and_engine(worker_database):
+    # Like `-P threads`, tasks of the process run concurrently on its loop
+    resources = init_worker_resources()
+    try:
+        with ThreadPoolExecutor(max_workers=4) as threads:
+            probes = list(
+                threads.map(lambda _: benchmark_worker_resources_task(), range(TASKS))
+            )
+        connections_left_open = resources.connections_checked_out()
+    finally:
+        shutdown_worker_resources()
+
+    assert len({probe["pid"] for probe in probes}) == 1
+    assert len({probe["loop"] for probe in probes}) == 1
+    assert len({probe["engine"] for probe in probes}) == 1
+    assert max(probe["tasks_run"] for probe in probes) == TASKS
+    assert connections_left_open == 0